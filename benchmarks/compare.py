@@ -0,0 +1,67 @@
+import argparse
+import json
+import sys
+
+# Metrics where a higher value is a regression
+METRICS = [
+    "train_seconds",
+    "train_peak_bytes",
+    "model_binary_bytes",
+    "load_json_seconds",
+    "load_binary_seconds",
+    "load_binary_peak_bytes",
+    "query_us_per_query",
+    "query_peak_bytes",
+    "query_binary_us_per_query",
+    "query_binary_peak_bytes",
+    "get_many_seconds",
+    "get_many_peak_bytes",
+    "assign_seconds",
+    "assign_peak_bytes",
+]
+
+def compare(baseline: dict, current: dict, threshold: float = 1.25):
+    """Compare two benchmark result files case by case
+
+    :param baseline: The baseline results
+    :param current: The current results
+    :param threshold: The ratio (current / baseline) above which a metric is a regression
+    :return: The (case, metric, baseline, current, ratio) of every regression
+    :rtype: List[tuple]
+    """
+    baseline_results = {json.dumps(result["case"], sort_keys=True): result for result in baseline["results"]}
+
+    regressions = []
+    for result in current["results"]:
+        case = json.dumps(result["case"], sort_keys=True)
+        if case not in baseline_results:
+            continue
+        for metric in METRICS:
+            before = baseline_results[case].get(metric, None)
+            after = result.get(metric, None)
+            if not before or after is None:
+                continue
+            ratio = after / before
+            if ratio > threshold:
+                regressions.append((case, metric, before, after, ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two NeuroBCL benchmark runs")
+    parser.add_argument("baseline", help="Baseline result JSON file")
+    parser.add_argument("current", help="Current result JSON file")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Ratio above which a metric is a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold)
+    for case, metric, before, after, ratio in regressions:
+        print("%s %s: %.6g -> %.6g (x%.2f)" % (case, metric, before, after, ratio))
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
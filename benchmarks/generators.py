@@ -0,0 +1,85 @@
+import numpy as np
+
+BUCKET_FEATURES = ["price", "score"]
+
+def keyword_feature_names(n_keywords: int):
+    """Names of the generated keyword features"""
+    return ["k" + str(i) for i in range(n_keywords)]
+
+def _weights(cardinality: int, skew: float):
+    """Zipf like value frequencies, 0 is uniform and higher values concentrate the rows on the first values"""
+    weights = 1.0 / np.arange(1, cardinality + 1) ** skew
+    return weights / weights.sum()
+
+def generate(n_rows: int, n_keywords: int = 3, cardinality: int = 10, skew: float = 0.0, list_valued: int = 0, seed: int = 0):
+    """Generate synthetic items with keyword features k0, k1, ... and the bucket features price (integer, log-normal)
+    and score (float, uniform). The same arguments always give the same items.
+
+    :param n_rows: The number of items
+    :param n_keywords: The number of keyword features
+    :param cardinality: The number of distinct values of every keyword feature
+    :param skew: Zipf exponent of the value frequencies, 0 for uniform
+    :param list_valued: The number of keyword features (the last ones) holding a list of 0 to 3 values
+    :param seed: The random seed
+    :type n_rows: int
+    :type n_keywords: int, optional
+    :type cardinality: int, optional
+    :type skew: float, optional
+    :type list_valued: int, optional
+    :type seed: int, optional
+    :return: The items
+    :rtype: List[Dict]
+    """
+    rng = np.random.default_rng(seed)
+    weights = _weights(cardinality, skew)
+    names = keyword_feature_names(n_keywords)
+
+    columns = {}
+    for position, name in enumerate(names):
+        values = [name + "_v" + str(value) for value in range(cardinality)]
+        if position >= n_keywords - list_valued:
+            lengths = rng.integers(0, 4, n_rows)
+            codes = rng.choice(cardinality, size=int(lengths.sum()), p=weights)
+            ends = np.cumsum(lengths)
+            columns[name] = [[values[code] for code in codes[end - length:end]] for end, length in zip(ends.tolist(), lengths.tolist())]
+        else:
+            columns[name] = [values[code] for code in rng.choice(cardinality, size=n_rows, p=weights).tolist()]
+
+    columns["price"] = np.round(rng.lognormal(4, 1, n_rows)).astype(np.int64).tolist()
+    columns["score"] = np.round(rng.uniform(0, 5, n_rows), 2).tolist()
+
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*[columns[key] for key in keys])]
+
+def generate_queries(items, n_queries: int, max_filters: int, seed: int = 0):
+    """Generate queries against the items, filters are taken from random items so most of them match some data
+
+    :param items: The generated items
+    :param n_queries: The number of queries
+    :param max_filters: The maximum number of filters per query
+    :param seed: The random seed
+    :type items: List[Dict]
+    :type n_queries: int
+    :type max_filters: int
+    :type seed: int, optional
+    :return: The (target key, bucket, operator, filters) of every query
+    :rtype: List[tuple]
+    """
+    rng = np.random.default_rng(seed)
+    names = [key for key in items[0] if key not in BUCKET_FEATURES]
+
+    queries = []
+    for _ in range(n_queries):
+        item = items[int(rng.integers(len(items)))]
+        n_filters = int(rng.integers(0, min(max_filters, len(names)) + 1))
+        filters = {}
+        for key in rng.choice(names, size=n_filters, replace=False).tolist():
+            value = item[key]
+            if type(value) == list:
+                if len(value) == 0:
+                    continue
+                value = value[0]
+            filters[key] = value
+        target_key = BUCKET_FEATURES[int(rng.integers(len(BUCKET_FEATURES)))]
+        queries.append((target_key, int(rng.integers(1, 5)), "<" if rng.random() < 0.5 else ">", filters))
+    return queries
@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.generators import BUCKET_FEATURES, generate, generate_queries, keyword_feature_names
+from neurobcl.base.model import NeuroBucketClassifier
+from neurobcl.main import train_from_dictionary
+
+BASE_CASE = {
+    "rows": 20000,
+    "keywords": 3,
+    "cardinality": 10,
+    "skew": 0.0,
+    "list_valued": 0,
+    "max_depth": 3,
+    "quantile_gap": 10,
+    "engine": "columnar",
+}
+
+# Every preset varies one dimension of the base case at a time so the scaling of each one can be read off
+PRESETS = {
+    "quick": {
+        "rows": [2000, 20000],
+        "engine": ["dictionary", "columnar"],
+        "list_valued": [1],
+        "skew": [1.2],
+    },
+    "full": {
+        "rows": [10000, 100000, 1000000],
+        "keywords": [2, 4, 6],
+        "cardinality": [5, 50, 500],
+        "skew": [0.8, 1.5],
+        "list_valued": [1, 2],
+        "max_depth": [1, 2, 4],
+        "quantile_gap": [1, 5, 25],
+        "engine": ["dictionary", "columnar"],
+    },
+}
+
+def preset_cases(name: str, base: dict = BASE_CASE):
+    """The base case followed by every single dimension variation of the preset"""
+    cases = [dict(base)]
+    for dimension, values in PRESETS[name].items():
+        for value in values:
+            case = dict(base, **{dimension: value})
+            if case not in cases:
+                cases.append(case)
+    return cases
+
+def measure(fn, memory: bool = True):
+    """Run a function, timing it and then (in a second run, tracing slows it down) measuring its peak memory
+
+    :return: The result, the wall time in seconds and the peak traced memory in bytes (None without memory)
+    :rtype: tuple
+    """
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+def run_case(case: dict, n_queries: int = 2000, memory: bool = True, seed: int = 0):
+    """Benchmark training, saving, loading and querying for a single case
+
+    :param case: The case, see BASE_CASE for the keys
+    :param n_queries: The number of queries
+    :param memory: Measure peak memory as well
+    :param seed: The random seed of the data and the queries
+    :return: The measurements
+    :rtype: dict
+    """
+    items = generate(case["rows"], case["keywords"], case["cardinality"], case["skew"], case["list_valued"], seed)
+    keyword_feats = keyword_feature_names(case["keywords"])
+    result = {"case": case}
+
+    classifier, result["train_seconds"], result["train_peak_bytes"] = measure(
+        lambda: train_from_dictionary(items, keyword_feats, BUCKET_FEATURES, case["quantile_gap"], case["max_depth"], case["engine"]),
+        memory,
+    )
+    result["model_keys"] = len(classifier.indexer_hash)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "model.json")
+        binary_path = os.path.join(tmp, "model.nbcl")
+        with open(json_path, "w") as f:
+            f.write(classifier.toJson())
+        classifier.toBinary(binary_path)
+        result["model_json_bytes"] = os.path.getsize(json_path)
+        result["model_binary_bytes"] = os.path.getsize(binary_path)
+
+        def load_json():
+            with open(json_path) as f:
+                return NeuroBucketClassifier.fromJson(f.read())
+
+        _, result["load_json_seconds"], result["load_json_peak_bytes"] = measure(load_json, memory)
+        loaded, result["load_binary_seconds"], result["load_binary_peak_bytes"] = measure(lambda: NeuroBucketClassifier.fromBinary(binary_path), memory)
+
+        queries = generate_queries(items, n_queries, case["max_depth"], seed)
+
+        def query(model):
+            # Every run starts from a cold lookup cache
+            model.clear_lookup_cache()
+            for target_key, bucket, operator, filters in queries:
+                model.get(target_key, bucket, operator, filters)
+
+        for name, model in [("query", classifier), ("query_binary", loaded)]:
+            _, result[name + "_seconds"], result[name + "_peak_bytes"] = measure(lambda: query(model), memory)
+            result[name + "_us_per_query"] = result[name + "_seconds"] / max(len(queries), 1) * 1e6
+
+        def get_many():
+            classifier.clear_lookup_cache()
+            for target_key in BUCKET_FEATURES:
+                batch = [query for query in queries if query[0] == target_key]
+                classifier.get_many(target_key, [query[1] for query in batch], [query[2] for query in batch], [query[3] for query in batch])
+
+        _, result["get_many_seconds"], result["get_many_peak_bytes"] = measure(get_many, memory)
+
+        filters = [{key: item[key] for key in keyword_feats if type(item[key]) != list} for item in items]
+        values = [item["price"] for item in items]
+
+        def assign():
+            classifier.clear_lookup_cache()
+            return classifier.assign_buckets("price", values, filters)
+
+        _, result["assign_seconds"], result["assign_peak_bytes"] = measure(assign, memory)
+    return result
+
+def environment():
+    """Describe where the benchmark ran"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark NeuroBCL training, loading and querying")
+    parser.add_argument("--preset", choices=list(PRESETS), default="quick", help="Set of cases to run")
+    parser.add_argument("--output", default="benchmark.json", help="Result JSON file")
+    parser.add_argument("--queries", type=int, default=2000, help="Queries per case")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slow) peak memory runs")
+    args = parser.parse_args(argv)
+
+    results = []
+    for case in preset_cases(args.preset):
+        result = run_case(case, args.queries, not args.no_memory, args.seed)
+        results.append(result)
+        print(json.dumps(case), "train %.3fs" % result["train_seconds"], "query %.1fus" % result["query_us_per_query"], file=sys.stderr)
+
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "preset": args.preset, "seed": args.seed, "results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
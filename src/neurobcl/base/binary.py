@@ -0,0 +1,235 @@
+import json
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+import numpy as np
+
+MAGIC = b"NBCL"
+VERSION = 2
+
+# magic, version, quantile gap, max depth, number of keys, values per key, ids per key, number of strings, then offset
+# and length of every section (metadata, string offsets, string blob, key ids, value kinds, values)
+_HEADER = struct.Struct("<4sIIIQIIQQQQQQQQQQQQQ")
+
+# Every percentile list is stored as 8 byte cells, either int64 or float64 (NaN = missing) depending on its kind
+_INT_KIND = 0
+_FLOAT_KIND = 1
+
+def _align(offset: int, alignment: int = 8):
+    return (offset + alignment - 1) // alignment * alignment
+
+def _list_kind(percentile_list):
+    """Integer lists stay int64 unless a value is missing or fractional, then the list is float64 (NaN = missing)"""
+    for value in percentile_list:
+        if type(value) != int or not -2**63 <= value < 2**63:
+            return _FLOAT_KIND
+    return _INT_KIND
+
+def _key_parts(key: str):
+    """The feature and the filter tokens ("keyword_=value") of an indexer hash key, joining them with "#" and "&"
+    gives the key back"""
+    feature, separator, rest = key.partition("#")
+    if not separator:
+        raise ValueError("Key " + repr(key) + " has no feature")
+    return [feature] + (rest.split("&") if rest else [])
+
+def write_binary(path: str, quantile_gap: int, max_depth: int, indexer_hash, metadata: dict, n_columns: int = None):
+    """Write the indexer hash to a binary file. The features and filter tokens are written once in a sorted string
+    table and every key is a row of string ids (1 based, 0 pads the shorter keys), rows are sorted so they can be
+    binary searched in place. The file is written next to the target and renamed over it so readers never see a
+    partial file.
+
+    :param path: The file path
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the filters
+    :param indexer_hash: The percentile list of every key
+    :param metadata: Extra JSON serializable model fields (eg the feature names)
+    :param n_columns: The number of cells per key, shorter lists (eg compressed CDF knots) are padded with None.
+        Defaults to exactly one cell per quantile.
+    :type path: str
+    :type quantile_gap: int
+    :type max_depth: int
+    :type indexer_hash: Mapping[str, List]
+    :type metadata: dict
+    :type n_columns: int, optional
+    """
+    parts = {key: _key_parts(key) for key in indexer_hash}
+    strings = sorted(set(part.encode("utf-8") for key_parts in parts.values() for part in key_parts))
+    string_ids = {string.decode("utf-8"): position + 1 for position, string in enumerate(strings)}
+
+    key_width = max([len(key_parts) for key_parts in parts.values()], default=0)
+    encoded = sorted(([string_ids[part] for part in key_parts] + [0] * (key_width - len(key_parts)), key) for key, key_parts in parts.items())
+    percentile_lists = [indexer_hash[key] for _, key in encoded]
+    if n_columns is None:
+        n_columns = int(100 / quantile_gap) + 1
+        for percentile_list in percentile_lists:
+            if len(percentile_list) != n_columns:
+                raise ValueError("Percentile lists should have " + str(n_columns) + " values")
+    else:
+        for percentile_list in percentile_lists:
+            if len(percentile_list) > n_columns:
+                raise ValueError("Lists should have at most " + str(n_columns) + " values")
+        percentile_lists = [list(percentile_list) + [None] * (n_columns - len(percentile_list)) for percentile_list in percentile_lists]
+
+    kinds = np.array([_list_kind(percentile_list) for percentile_list in percentile_lists], dtype="u1")
+    values = np.zeros((len(encoded), n_columns), dtype="<i8")
+    for position, percentile_list in enumerate(percentile_lists):
+        if kinds[position] == _INT_KIND:
+            values[position] = percentile_list
+        else:
+            values[position] = np.array([np.nan if value is None else value for value in percentile_list], dtype="<f8").view("<i8")
+
+    string_offsets = np.zeros(len(strings) + 1, dtype="<u8")
+    string_offsets[1:] = np.cumsum([len(string) for string in strings])
+    string_blob = b"".join(strings)
+    key_ids = np.array([ids for ids, _ in encoded], dtype="<u4").reshape(len(encoded), key_width)
+    meta = json.dumps(metadata).encode("utf-8")
+
+    meta_offset = _HEADER.size
+    string_offsets_offset = _align(meta_offset + len(meta))
+    string_blob_offset = string_offsets_offset + string_offsets.nbytes
+    key_ids_offset = _align(string_blob_offset + len(string_blob))
+    kinds_offset = key_ids_offset + key_ids.nbytes
+    values_offset = _align(kinds_offset + kinds.nbytes)
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, quantile_gap, max_depth, len(encoded), n_columns, key_width, len(strings),
+        meta_offset, len(meta), string_offsets_offset, string_offsets.nbytes, string_blob_offset, len(string_blob),
+        key_ids_offset, key_ids.nbytes, kinds_offset, kinds.nbytes, values_offset, values.nbytes,
+    )
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(meta)
+        f.write(b"\0" * (string_offsets_offset - meta_offset - len(meta)))
+        f.write(string_offsets.tobytes())
+        f.write(string_blob)
+        f.write(b"\0" * (key_ids_offset - string_blob_offset - len(string_blob)))
+        f.write(key_ids.tobytes())
+        f.write(kinds.tobytes())
+        f.write(b"\0" * (values_offset - kinds_offset - kinds.nbytes))
+        f.write(values.tobytes())
+    os.replace(tmp_path, path)
+
+class MappedIndex(Mapping):
+    """Read only indexer hash backed by a binary model file, a lookup binary searches the string table for the ids of
+    the key parts, then the sorted key rows for the ids, and reads the percentile list straight from the buffer. With
+    a memory mapped file nothing is parsed on load and the pages are shared by every process mapping the same file.
+
+    :param buffer: The file contents, eg a read only :class:`mmap.mmap`
+    :type buffer: buffer
+    """
+    def __init__(self, buffer):
+        self.buffer = buffer
+        (magic, version) = struct.unpack_from("<4sI", buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a NeuroBCL binary model")
+        if version != VERSION:
+            raise ValueError("Unsupported binary model version " + str(version) + ", write the model again")
+        (_, _, self.quantile_gap, self.max_depth, self.n_keys, self.n_columns, self.key_width, self.n_strings,
+         meta_offset, meta_len, string_offsets_offset, string_offsets_len, string_blob_offset, string_blob_len,
+         key_ids_offset, key_ids_len, kinds_offset, kinds_len, values_offset, values_len) = _HEADER.unpack_from(buffer, 0)
+
+        self.metadata = json.loads(bytes(buffer[meta_offset:meta_offset + meta_len]).decode("utf-8"))
+        self._string_offsets = np.frombuffer(buffer, dtype="<u8", count=self.n_strings + 1, offset=string_offsets_offset)
+        self._string_blob_offset = string_blob_offset
+        self._key_ids = np.frombuffer(buffer, dtype="<u4", count=self.n_keys * self.key_width, offset=key_ids_offset).reshape(self.n_keys, self.key_width)
+        self._kinds = np.frombuffer(buffer, dtype="u1", count=self.n_keys, offset=kinds_offset)
+        self._ints = np.frombuffer(buffer, dtype="<i8", count=self.n_keys * self.n_columns, offset=values_offset).reshape(self.n_keys, self.n_columns)
+        self._floats = self._ints.view("<f8")
+
+    @classmethod
+    def open(cls, path: str):
+        """Memory map a binary model file
+
+        :param path: The file path
+        :type path: str
+        :return: The mapped index
+        :rtype: :class:`MappedIndex`
+        """
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @property
+    def nbytes(self):
+        """Size of the model file, what the mapping can take in memory at most"""
+        return len(self.buffer)
+
+    def _string_at(self, position: int):
+        start = self._string_blob_offset + int(self._string_offsets[position])
+        end = self._string_blob_offset + int(self._string_offsets[position + 1])
+        return self.buffer[start:end]
+
+    def _string_id(self, string: str):
+        """Id of a string in the string table, 0 if missing"""
+        encoded = string.encode("utf-8")
+        low, high = 0, self.n_strings
+        while low < high:
+            middle = (low + high) // 2
+            if self._string_at(middle) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.n_strings and self._string_at(low) == encoded:
+            return low + 1
+        return 0
+
+    def _find(self, key: str):
+        """Position of the key in the sorted key rows, -1 if missing"""
+        try:
+            parts = _key_parts(key)
+        except ValueError:
+            return -1
+        if len(parts) > self.key_width:
+            return -1
+        ids = []
+        for part in parts:
+            string_id = self._string_id(part)
+            if string_id == 0:
+                # A feature or filter the model never saw
+                return -1
+            ids.append(string_id)
+        ids.extend([0] * (self.key_width - len(parts)))
+
+        low, high = 0, self.n_keys
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_ids[middle].tolist() < ids:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.n_keys and self._key_ids[low].tolist() == ids:
+            return low
+        return -1
+
+    def _row(self, position: int):
+        if self._kinds[position] == _INT_KIND:
+            return self._ints[position].tolist()
+        return [None if value != value else value for value in self._floats[position].tolist()]
+
+    def __getitem__(self, key):
+        position = self._find(key) if type(key) == str else -1
+        if position < 0:
+            raise KeyError(key)
+        return self._row(position)
+
+    def __contains__(self, key):
+        return type(key) == str and self._find(key) >= 0
+
+    def __iter__(self):
+        strings = {}
+        for ids in self._key_ids.tolist():
+            parts = []
+            for string_id in ids:
+                if string_id == 0:
+                    break
+                if string_id not in strings:
+                    strings[string_id] = bytes(self._string_at(string_id - 1)).decode("utf-8")
+                parts.append(strings[string_id])
+            yield parts[0] + "#" + "&".join(parts[1:])
+
+    def __len__(self):
+        return self.n_keys
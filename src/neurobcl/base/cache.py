@@ -0,0 +1,118 @@
+import sys
+import threading
+from collections import OrderedDict
+
+def sizeof(value):
+    """Approximate bytes held by a cached value, exact for NumPy arrays"""
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return sys.getsizeof(value)
+
+class LRUCache:
+    """A bounded least recently used cache, the oldest entries are evicted once more than maxsize entries or more than
+    max_bytes bytes (as measured by :func:`sizeof`) are held. Hits, misses, evictions and bytes are counted so the
+    budget can be tuned. It can be shared by threads, :meth:`get` takes no lock and writes are serialized.
+
+    :param maxsize: The maximum number of entries, None for unbounded
+    :param max_bytes: The maximum number of bytes, None for unbounded
+    :type maxsize: int, optional
+    :type max_bytes: int, optional
+
+    .. code-block:: python
+
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.get("a") # 1
+        cache.get("b", None) # None
+    """
+    def __init__(self, maxsize: int = 1024, max_bytes: int = None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Get the entry for the key and mark it as recently used
+
+        :param key: The key
+        :param default: Returned when the key is not cached
+        :return: The cached value or the default
+        """
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            # Evicted by a put from another thread in between, the value is still good
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Add or replace the entry for the key, evicting the least recently used entries if needed. A value larger
+        than the whole byte budget is not cached.
+
+        :param key: The key
+        :param value: The value
+        """
+        size = sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._data:
+                self.nbytes -= self._sizes[key]
+                self._data.move_to_end(key)
+            self._data[key] = value
+            self._sizes[key] = size
+            self.nbytes += size
+
+            while (self.maxsize is not None and len(self._data) > self.maxsize) or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                evicted, _ = self._data.popitem(last=False)
+                self.nbytes -= self._sizes.pop(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all the entries"""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """Get the cache counters
+
+        :return: Entries, bytes, hits, misses and evictions
+        :rtype: dict
+        """
+        return {
+            "entries": len(self._data),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
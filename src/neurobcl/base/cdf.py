@@ -0,0 +1,121 @@
+import heapq
+from bisect import bisect_left
+
+import numpy as np
+
+def compress(percentiles, values, max_knots: int = 32, max_error: float = 0.0):
+    """Compress a quantile function (value at every percentile) to a few knots joined by straight lines. Flat runs
+    are dropped first (a step function only needs the ends of its steps), then knots are added greedily where the
+    linear interpolation is the furthest off, until the error is within max_error (a fraction of the value range) or
+    max_knots are used.
+
+    :param percentiles: The percentiles, increasing from 0 to 100
+    :param values: The value at every percentile, non decreasing
+    :param max_knots: The maximum number of knots, at least 2
+    :param max_error: The acceptable interpolation error as a fraction of the value range, 0 keeps adding knots
+        until max_knots
+    :type percentiles: numpy.ndarray
+    :type values: List
+    :type max_knots: int, optional
+    :type max_error: float, optional
+    :return: The knots as a flat list [percentile, value, percentile, value, ...], empty if there are no values
+    :rtype: List
+    """
+    if len(values) == 0:
+        return []
+
+    values = values.tolist() if isinstance(values, np.ndarray) else list(values)
+    x = np.asarray(percentiles, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+
+    # Interior points of flat runs are exactly interpolated by their ends
+    keep = np.ones(len(y), dtype=bool)
+    keep[1:-1] = (y[1:-1] != y[:-2]) | (y[1:-1] != y[2:])
+    candidates = np.flatnonzero(keep)
+
+    if len(candidates) <= max_knots:
+        chosen = candidates
+    else:
+        tolerance = max_error * (y[-1] - y[0])
+
+        def worst(left, right):
+            """Point between two knots the furthest from their line, as a heap entry"""
+            if right - left < 2:
+                return None
+            inner = np.arange(left + 1, right)
+            line = y[left] + (y[right] - y[left]) * (x[inner] - x[left]) / (x[right] - x[left])
+            errors = np.abs(y[inner] - line)
+            position = int(np.argmax(errors))
+            return (-float(errors[position]), left, right, int(inner[position]))
+
+        chosen = {0, len(y) - 1}
+        heap = [worst(0, len(y) - 1)]
+        while heap and len(chosen) < max_knots:
+            error, left, right, split = heapq.heappop(heap)
+            if -error <= tolerance:
+                break
+            chosen.add(split)
+            for entry in (worst(left, split), worst(split, right)):
+                if entry is not None:
+                    heapq.heappush(heap, entry)
+        chosen = sorted(chosen)
+
+    knots = []
+    for position in chosen:
+        knots.append(round(float(x[position]), 6))
+        knots.append(values[position])
+    return knots
+
+def knot_arrays(knots):
+    """Split flat knots into percentile and value arrays, padding (None pairs) is ignored
+
+    :param knots: The flat knots from :func:`compress`
+    :type knots: List
+    :return: The percentiles and values
+    :rtype: Tuple[numpy.ndarray, numpy.ndarray]
+    """
+    pairs = [(knots[i], knots[i + 1]) for i in range(0, len(knots) - 1, 2) if knots[i] is not None]
+    percentiles = np.array([percentile for percentile, _ in pairs], dtype=np.float64)
+    values = np.array([np.nan if value is None else value for _, value in pairs], dtype=np.float64)
+    return percentiles, values
+
+def evaluate(knots, percentile: float):
+    """Value of the compressed quantile function at a percentile, the stored value on a knot and a linear
+    interpolation between knots
+
+    :param knots: The flat knots from :func:`compress`
+    :param percentile: The percentile, 0 to 100
+    :type knots: List
+    :type percentile: float
+    :return: The value, None if the knots are empty
+    """
+    percentiles = [knots[i] for i in range(0, len(knots) - 1, 2) if knots[i] is not None]
+    if len(percentiles) == 0:
+        return None
+
+    position = bisect_left(percentiles, percentile)
+    if position < len(percentiles) and percentiles[position] == percentile:
+        return knots[2 * position + 1]
+    if position == 0:
+        return knots[1]
+    if position == len(percentiles):
+        return knots[2 * position - 1]
+
+    left, right = percentiles[position - 1], percentiles[position]
+    low, high = knots[2 * position - 1], knots[2 * position + 1]
+    return low + (high - low) * (percentile - left) / (right - left)
+
+def evaluate_many(knots, percentiles):
+    """Vectorized :func:`evaluate`
+
+    :param knots: The flat knots from :func:`compress`
+    :param percentiles: The percentiles, 0 to 100
+    :type knots: List
+    :type percentiles: numpy.ndarray
+    :return: The values, NaN if the knots are empty
+    :rtype: numpy.ndarray
+    """
+    x, y = knot_arrays(knots)
+    if len(x) == 0:
+        return np.full(len(percentiles), np.nan)
+    return np.interp(percentiles, x, y)
@@ -0,0 +1,270 @@
+import numbers
+from array import array
+from typing import Dict, List
+
+import numpy as np
+
+def is_missing(value):
+    """Whether a record value is missing, None and NaN are
+
+    :param value: The value
+    :rtype: bool
+    """
+    return value is None or (isinstance(value, float) and value != value)
+
+class KeywordColumn:
+    """A dictionary encoded keyword (categorical) feature, every distinct value is mapped to an integer code and the
+    column is stored as (row, code) postings so that list valued features are supported natively
+
+    :param name: The keyword feature name
+    :param values: The distinct values, the position of a value is its code
+    :param codes: The code of every posting
+    :param rows: The row of every posting, None when every row has exactly one value (ie row i has posting i)
+    :type name: str
+    :type values: List
+    :type codes: numpy.ndarray
+    :type rows: numpy.ndarray, optional
+    """
+    def __init__(self, name: str, values: List, codes: np.ndarray, rows: np.ndarray = None):
+        self.name = name
+        self.values = values
+        self.codes = codes
+        self.rows = rows
+
+        # Reverse lookup from value to its code
+        self.lookup = {value: code for code, value in enumerate(values)}
+
+    @property
+    def multi_valued(self):
+        """True if any row holds more (or less) than a single value"""
+        return self.rows is not None
+
+    def posting_rows(self):
+        """Get the row of every posting
+
+        :return: The row of every posting
+        :rtype: numpy.ndarray
+        """
+        if self.rows is None:
+            return np.arange(len(self.codes), dtype=np.int64)
+        return self.rows
+
+    def row_offsets(self, n_rows: int):
+        """Number of postings of every row and where they start, postings are stored in row order
+
+        :param n_rows: The total number of rows
+        :type n_rows: int
+        :return: The counts and start offsets per row
+        :rtype: Tuple[numpy.ndarray, numpy.ndarray]
+        """
+        if self.rows is None:
+            return np.ones(n_rows, dtype=np.int64), np.arange(n_rows, dtype=np.int64)
+        if getattr(self, "_row_offsets", None) is None:
+            counts = np.bincount(self.rows, minlength=n_rows)
+            self._row_offsets = (counts, np.cumsum(counts) - counts)
+        return self._row_offsets
+
+    def codes_for_rows(self, rows: np.ndarray, n_rows: int):
+        """Get the value codes held by the given rows, one entry per (row, value) posting
+
+        :param rows: The row ids
+        :param n_rows: The total number of rows
+        :type rows: numpy.ndarray
+        :type n_rows: int
+        :return: The row and the code of every posting of the rows
+        :rtype: Tuple[numpy.ndarray, numpy.ndarray]
+        """
+        if self.rows is None:
+            return rows, self.codes[rows]
+
+        counts, starts = self.row_offsets(n_rows)
+        repeat = counts[rows]
+        pair_index = np.repeat(np.arange(len(rows)), repeat)
+        within = np.arange(len(pair_index)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+        posting_rows = rows[pair_index]
+        return posting_rows, self.codes[starts[posting_rows] + within]
+
+    def mask(self, value, n_rows: int):
+        """Get a boolean mask of the rows that contain the given value
+
+        :param value: The value to be matched
+        :param n_rows: The total number of rows
+        :type n_rows: int
+        :return: The boolean mask over all the rows
+        :rtype: numpy.ndarray
+        """
+        code = self.lookup.get(value, None)
+        if code is None:
+            return np.zeros(n_rows, dtype=bool)
+
+        if self.rows is None:
+            return self.codes == code
+
+        mask = np.zeros(n_rows, dtype=bool)
+        mask[self.rows[self.codes == code]] = True
+        return mask
+
+class ColumnStore:
+    """Column oriented storage of the training data, keyword features are dictionary encoded and bucket features
+    are kept as typed numeric arrays. A row missing a keyword value simply has no posting for it, a row missing a
+    bucket value is flagged in the missing mask of that feature.
+
+    :param n_rows: The total number of rows
+    :param keywords: The keyword columns
+    :param buckets: The bucket columns
+    :param missing: Boolean mask of the rows without a value, for the bucket columns that have missing values
+    :type n_rows: int
+    :type keywords: Dict[str, KeywordColumn]
+    :type buckets: Dict[str, numpy.ndarray]
+    :type missing: Dict[str, numpy.ndarray], optional
+    """
+    def __init__(self, n_rows: int, keywords: Dict[str, KeywordColumn], buckets: Dict[str, np.ndarray], missing: Dict[str, np.ndarray] = None):
+        self.n_rows = n_rows
+        self.keywords = keywords
+        self.buckets = buckets
+        self.missing = missing if missing is not None else {}
+
+    def mask(self, filters: dict = {}):
+        """Get the boolean mask of rows matching all the given filters
+
+        :param filters: The filters to be applied
+        :type filters: dict
+        :return: The boolean mask over all the rows, None if there are no filters
+        :rtype: numpy.ndarray
+        """
+        mask = None
+        for key in filters:
+            key_mask = self.keywords[key].mask(filters[key], self.n_rows)
+            mask = key_mask if mask is None else mask & key_mask
+        return mask
+
+    @property
+    def nbytes(self):
+        """Total bytes held by the column arrays"""
+        total = 0
+        for column in self.keywords.values():
+            total += column.codes.nbytes
+            if column.rows is not None:
+                total += column.rows.nbytes
+        for values in self.buckets.values():
+            total += values.nbytes
+        for mask in self.missing.values():
+            total += mask.nbytes
+        return total
+
+class ColumnStoreBuilder:
+    """Incrementally build a :class:`ColumnStore` from records, only the named keyword and bucket features are kept
+    and they are appended to compact typed buffers
+
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+
+    .. code-block:: python
+
+        builder = ColumnStoreBuilder(["company"], ["listPrice"])
+        builder.append({"company": "NIKE", "listPrice": 300})
+        store = builder.build()
+    """
+    def __init__(self, keyword_feats_name: List[str], bucket_feats_name: List[str]):
+        self.keyword_feats = list(keyword_feats_name)
+        self.bucket_feats = list(bucket_feats_name)
+        self.n_rows = 0
+
+        self._lookups = {key: {} for key in self.keyword_feats}
+        self._codes = {key: array('i') for key in self.keyword_feats}
+        self._rows = {key: array('q') for key in self.keyword_feats}
+        self._multi = {key: False for key in self.keyword_feats}
+
+        # Bucket buffers start as integers and are promoted to floats on the first non integer value
+        self._buckets = {key: array('q') for key in self.bucket_feats}
+        # Missing flags of a bucket feature, only allocated once one of its values is missing
+        self._missing = {key: None for key in self.bucket_feats}
+
+    def _add_keyword(self, key, value):
+        lookup = self._lookups[key]
+        code = lookup.get(value, None)
+        if code is None:
+            code = len(lookup)
+            lookup[value] = code
+        self._codes[key].append(code)
+        self._rows[key].append(self.n_rows)
+
+    def _add_bucket(self, key, value):
+        missing = self._missing[key]
+        if is_missing(value):
+            if missing is None:
+                missing = self._missing[key] = bytearray(self.n_rows)
+            missing.append(1)
+            # Placeholder, the row is left out of the percentiles of this feature
+            value = 0
+        else:
+            if not isinstance(value, numbers.Real):
+                raise TypeError("Bucket feature " + key + " of record " + str(self.n_rows + 1) + " should be a number, got " + repr(value))
+            if missing is not None:
+                missing.append(0)
+
+        buffer = self._buckets[key]
+        if buffer.typecode == 'q':
+            if isinstance(value, int) and -2**63 <= value < 2**63:
+                buffer.append(value)
+                return
+            buffer = array('d', buffer)
+            self._buckets[key] = buffer
+        buffer.append(value)
+
+    def append(self, item: dict):
+        """Append a single record
+
+        :param item: The record, it should contain all the keyword and bucket features. A None or NaN bucket value is
+            flagged as missing.
+        :type item: dict
+        """
+        for key in self.keyword_feats:
+            value = item[key]
+            if type(value) == list:
+                if len(value) != 1:
+                    self._multi[key] = True
+                # A repeated value in the same row is a single match
+                for v in dict.fromkeys(value):
+                    self._add_keyword(key, v)
+            else:
+                self._add_keyword(key, value)
+        for key in self.bucket_feats:
+            self._add_bucket(key, item[key])
+        self.n_rows += 1
+
+    def extend(self, items):
+        """Append all the records from an iterable
+
+        :param items: The records
+        :type items: Iterable[dict]
+        """
+        for item in items:
+            self.append(item)
+
+    def build(self):
+        """Build the column store from the appended records
+
+        :return: The column store
+        :rtype: :class:`ColumnStore`
+        """
+        keywords = {}
+        for key in self.keyword_feats:
+            codes = np.frombuffer(self._codes[key], dtype=np.int32).copy()
+            rows = None
+            if self._multi[key]:
+                rows = np.frombuffer(self._rows[key], dtype=np.int64).copy()
+            keywords[key] = KeywordColumn(key, list(self._lookups[key]), codes, rows)
+
+        buckets = {}
+        missing = {}
+        for key in self.bucket_feats:
+            buffer = self._buckets[key]
+            dtype = np.int64 if buffer.typecode == 'q' else np.float64
+            buckets[key] = np.frombuffer(buffer, dtype=dtype).copy()
+            if self._missing[key] is not None:
+                missing[key] = np.frombuffer(self._missing[key], dtype=np.uint8).astype(bool)
+
+        return ColumnStore(self.n_rows, keywords, buckets, missing)
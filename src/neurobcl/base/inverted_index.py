@@ -0,0 +1,90 @@
+import numpy as np
+
+class InvertedIndex:
+    """Inverted index from every (keyword feature, value) to the rows holding it, list valued features simply post
+    the row under each of their values. Sparse values keep a sorted row id array and dense values (more than
+    dense_ratio of the rows) a packed bitmap, like roaring bitmaps. A filter combination is answered by starting
+    from its rarest value and probing the others, so the cost follows the smallest posting instead of the data size.
+
+    :param store: The column store to index
+    :param dense_ratio: Fraction of the rows above which a value is stored as a bitmap
+    :type store: :class:`neurobcl.base.columns.ColumnStore`
+    :type dense_ratio: float, optional
+
+    .. code-block:: python
+
+        index = InvertedIndex(store)
+        rows = index.lookup({"company": "NIKE", "category": "Shoes"}) # sorted row ids
+    """
+    def __init__(self, store, dense_ratio: float = 1 / 32):
+        self.n_rows = store.n_rows
+        self.lookups = {}
+        self.counts = {}
+        self.postings = {}
+
+        row_dtype = np.int32 if store.n_rows < 2**31 else np.int64
+        for key, column in store.keywords.items():
+            n_values = len(column.values)
+            order = np.argsort(column.codes, kind='stable')
+            rows = column.posting_rows()[order].astype(row_dtype)
+            counts = np.bincount(column.codes, minlength=n_values)
+            ends = np.cumsum(counts)
+
+            postings = []
+            for code in range(n_values):
+                value_rows = rows[ends[code] - counts[code]:ends[code]]
+                if counts[code] > dense_ratio * self.n_rows:
+                    bitmap = np.zeros(self.n_rows, dtype=bool)
+                    bitmap[value_rows] = True
+                    postings.append(np.packbits(bitmap))
+                else:
+                    postings.append(value_rows)
+
+            self.lookups[key] = column.lookup
+            self.counts[key] = counts
+            self.postings[key] = postings
+
+    @staticmethod
+    def _is_bitmap(posting):
+        return posting.dtype == np.uint8
+
+    def lookup(self, filters: dict = {}):
+        """Get the rows matching all the filters
+
+        :param filters: The filters to be applied
+        :type filters: dict
+        :return: The sorted row ids, None if there are no filters (ie all the rows)
+        :rtype: numpy.ndarray
+        """
+        if len(filters) == 0:
+            return None
+
+        terms = []
+        for key in filters:
+            code = self.lookups[key].get(filters[key], None)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            terms.append((int(self.counts[key][code]), self.postings[key][code]))
+
+        # Rarest first, every further term can only shrink the candidates
+        terms.sort(key=lambda term: term[0])
+        posting = terms[0][1]
+        if self._is_bitmap(posting):
+            rows = np.flatnonzero(np.unpackbits(posting, count=self.n_rows))
+        else:
+            rows = posting.astype(np.int64)
+
+        for _, posting in terms[1:]:
+            if len(rows) == 0:
+                break
+            if self._is_bitmap(posting):
+                rows = rows[(posting[rows >> 3] >> (7 - (rows & 7))) & 1 == 1]
+            else:
+                positions = np.minimum(np.searchsorted(posting, rows), len(posting) - 1)
+                rows = rows[posting[positions] == rows]
+        return rows
+
+    @property
+    def nbytes(self):
+        """Total bytes held by the postings"""
+        return sum(posting.nbytes for postings in self.postings.values() for posting in postings)
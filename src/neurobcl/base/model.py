@@ -1,9 +1,44 @@
 import json
+import numbers
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, product
 from typing import Dict, List
 
+import numpy as np
+
+from neurobcl.base import cdf
+from neurobcl.base.binary import MappedIndex, write_binary
+from neurobcl.base.cache import LRUCache
+from neurobcl.base.stats import QueryStats, TrainingStats
+
+# Marks a filter value in a key that is not a string, strings starting with it get it doubled
+VALUE_TAG = "~"
+
+def encode_value(value):
+    """Encodes a filter value for an indexer hash key so that two values get the same code exactly when they are
+    equal in Python (1, 1.0 and True are one value, as in the dicts the trainers count with, while 1 and "1" are not).
+    Strings are kept as they are so the keys stay readable, other values are tagged.
+
+    :param value: The filter value, any hashable
+    :return: The code of the value
+    :rtype: str
+    """
+    if isinstance(value, str):
+        return VALUE_TAG + value if value.startswith(VALUE_TAG) else str(value)
+    if isinstance(value, numbers.Integral):
+        return VALUE_TAG + str(int(value))
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        return VALUE_TAG + (str(int(value)) if value.is_integer() else repr(value))
+    if value is None:
+        return VALUE_TAG + "None"
+    return VALUE_TAG + type(value).__name__ + ":" + repr(value)
+
 def order_invariant(feature: str, filters: dict = {}):
-    """Converts the filters to a string and joins with feature to make it order invariant (Helps in searching the same in the hash table)
+    """Converts the filters to a string and joins with feature to make it order invariant (Helps in searching the same in the hash table).
+    Values are encoded with :func:`encode_value` so values of different types do not share a key.
 
     :param feature: The feature name
     :param filters: The filters to be applied
@@ -14,7 +49,7 @@ def order_invariant(feature: str, filters: dict = {}):
     """
     list_filter_ops = []
     for key in filters:
-        list_filter_ops.append(key + "_=" + filters[key])
+        list_filter_ops.append(key + "_=" + encode_value(filters[key]))
 
     # Alphabetically sort the filter operations
     list_filter_ops.sort()
@@ -22,12 +57,102 @@ def order_invariant(feature: str, filters: dict = {}):
     # Convert to string and join with feature
     return feature + "#" + "&".join(list_filter_ops)
 
+def split_key(key: str, filter_features):
+    """Splits an indexer hash key back into its feature and filters, the reverse of :func:`order_invariant` except
+    that the values stay encoded. A "&" inside a value is told apart from a separator by the filter name following it.
+
+    :param key: The key from :func:`order_invariant`
+    :param filter_features: The keyword feature names
+    :type key: str
+    :type filter_features: Set[str]
+    :return: The feature and the (keyword, value code) pairs
+    :rtype: Tuple[str, List[tuple]]
+    """
+    feature, _, rest = key.partition("#")
+    filter_items = []
+    if rest:
+        for part in rest.split("&"):
+            name, separator, value = part.partition("_=")
+            if (separator and name in filter_features) or not filter_items:
+                filter_items.append((name, value))
+            else:
+                filter_items[-1] = (filter_items[-1][0], filter_items[-1][1] + "&" + part)
+    return feature, filter_items
+
+# Version of the key encoding, 1 wrote the values with str() (so 1 and "1" shared a key), 2 uses encode_value
+KEY_FORMAT = 2
+
+def _legacy_values(code: str):
+    """The values a value code written by key format 1 may stand for, the string and the number or constant"""
+    constants = {"None": None, "True": True, "False": False}
+    if code in constants:
+        return [code, constants[code]]
+    if any(character.isdigit() for character in code):
+        for parse in (int, float):
+            try:
+                return [code, parse(code)]
+            except ValueError:
+                pass
+    return [code]
+
+def migrate_keys(indexer_hash, filter_features: List[str]):
+    """Re-encodes the keys of an indexer hash written with key format 1. The old keys did not keep the type of the
+    values, so a value that reads as a number (or None, True, False) gets a key for the string and one for the typed
+    value and queries with either keep finding it.
+
+    :param indexer_hash: The indexer hash with format 1 keys
+    :param filter_features: The keyword feature names
+    :type indexer_hash: Mapping
+    :type filter_features: List[str]
+    :return: The indexer hash with format 2 keys
+    :rtype: dict
+    """
+    names = set(filter_features)
+    migrated = {}
+    for key, percentile_list in indexer_hash.items():
+        feature, filter_items = split_key(key, names)
+        for values in product(*[_legacy_values(code) for _, code in filter_items]):
+            migrated.setdefault(order_invariant(feature, dict(zip([name for name, _ in filter_items], values))), percentile_list)
+    return migrated
+
+def filter_combinations(item: dict, keyword_feats: List[str], max_depth: int):
+    """Every filter combination (up to max_depth - 1 filters) an item belongs to, a list valued keyword feature
+    belongs to a combination for each of its values
+
+    :param item: The item
+    :param keyword_feats: The keyword feature names, combinations follow this order
+    :param max_depth: The maximum depth of the filters
+    :type item: dict
+    :type keyword_feats: List[str]
+    :type max_depth: int
+    :return: The combinations as tuples of (keyword, value) pairs
+    :rtype: Iterator[tuple]
+    """
+    values = []
+    for key in keyword_feats:
+        value = item[key]
+        values.append(list(dict.fromkeys(value)) if type(value) == list else [value])
+
+    for depth in range(min(max_depth, len(keyword_feats) + 1)):
+        for positions in combinations(range(len(keyword_feats)), depth):
+            for combination in product(*[values[position] for position in positions]):
+                yield tuple(zip([keyword_feats[position] for position in positions], combination))
+
+STORAGE_MODES = ["grid", "cdf"]
+
 class NeuroBucketClassifier(ABC):
     """The NeuroBucketClassifier class is used to classify the data into buckets based on the given filters and percentiles
+
+    .. note:: With the "grid" storage every key holds the value at each multiple of quantile_gap and other percentiles
+        are truncated to the grid. With the "cdf" storage every key holds compressed knots of its quantile function
+        (see :meth:`NeuroBucketTrainer.enable_cdf`) and any percentile is interpolated.
     """
-    def __init__(self, quantile_gap: int, max_depth: int, indexer_hash: dict = {}, filter_features: Dict[str, List] = [], bucket_features: List = []):
+    def __init__(self, quantile_gap: int, max_depth: int, indexer_hash: dict = {}, filter_features: Dict[str, List] = [], bucket_features: List = [], lookup_cache_size: int = 4096, storage: str = "grid"):
+        if storage not in STORAGE_MODES:
+            raise ValueError("Storage should be one of " + ", ".join(STORAGE_MODES))
         self.quantile_gap = quantile_gap
         self.max_depth = max_depth
+        self.storage = storage
 
         # Our datastore to save all the data
         self.indexer_hash = indexer_hash
@@ -42,8 +167,132 @@ class NeuroBucketClassifier(ABC):
         elif type(bucket_features) == list:
             self.bucket_features = bucket_features
 
+        # Trainer that keeps the indexer hash up to date on add_items / remove_items (see IncrementalBucketTrainer)
+        self.updater = None
+
+        # Resolved (target key, filters) -> (percentile list, filters dropped) lookups
+        self._lookup_cache = LRUCache(lookup_cache_size)
+
+        # Filter name sets of the keys by bucket feature, see _key_shapes
+        self._shapes = {}
+        self._shapes_complete = False
+
+        # Query statistics, only recorded once enabled
+        self.stats = None
+
+    def _lookup(self, key: str, target_key: str = None, filter_items: List = None):
+        """Get the percentile list stored under an indexer hash key, None if there is none
+
+        :param key: The key from :func:`order_invariant`
+        :param target_key: The target key the key was built from, for classifiers that compute lists on demand
+        :param filter_items: The (key, value) pairs of the filters the key was built from
+        :type key: str
+        :type target_key: str, optional
+        :type filter_items: List[tuple], optional
+        :return: The percentile list
+        :rtype: List
+        """
+        return self.indexer_hash.get(key, None)
+
+    def _index_key_shapes(self):
+        """Read the filter name set of every key of the indexer hash in one pass, fromJson and fromBinary do it at load
+        so no query pays for it"""
+        names = set(self.filter_features)
+        shapes = {feature: set() for feature in self.bucket_features}
+        for key in self.indexer_hash:
+            feature, filter_items = split_key(key, names)
+            shapes.setdefault(feature, set()).add(frozenset([name for name, _ in filter_items]))
+        self._shapes = shapes
+        self._shapes_complete = True
+
+    def _key_shapes(self, target_key: str):
+        """The filter name sets the keys of a target key are made of, eg {frozenset(), frozenset({"company"})}. They are
+        read once and kept until :meth:`clear_lookup_cache`. An indexer hash with a feature_keys method (like the
+        sharded index of the registry) is only read for the target key, the other indexer hashes all at once.
+
+        :param target_key: The target key
+        :type target_key: str
+        :return: The filter name sets, None if unknown and every filter subset has to be looked up
+        :rtype: Set[frozenset]
+        """
+        shapes = self._shapes.get(target_key, None)
+        if shapes is not None:
+            return shapes
+
+        feature_keys = getattr(self.indexer_hash, "feature_keys", None)
+        if feature_keys is None:
+            if not self._shapes_complete:
+                self._index_key_shapes()
+            return self._shapes.get(target_key, set())
+
+        names = set(self.filter_features)
+        shapes = set([frozenset([name for name, _ in split_key(key, names)[1]]) for key in feature_keys(target_key)])
+        # Replaced rather than updated so concurrent queries never see a partial dict
+        self._shapes = {**self._shapes, target_key: shapes}
+        return shapes
+
+    def _resolve_percentile_list(self, target_key: str, filter_items: List):
+        """Walk the filter subsets in the same order as dropping the filters one by one recursively, subsets are
+        integer bitmasks over the filters so every subset is looked up at most once and no dict is copied. Only the
+        subsets whose filter names make up a key of the target key (see :meth:`_key_shapes`) are looked up, and the
+        walk does not go below a subset that holds none of them, so a query with k filters against keys of at most
+        max_depth - 1 filters does not try all 2^k subsets.
+
+        :param target_key: The target key
+        :param filter_items: The (key, value) pairs of the filters, in query order
+        :type target_key: str
+        :type filter_items: List[tuple]
+        :return: The first percentile list found (None if there is none) and the number of filters dropped
+        :rtype: Tuple[List, int]
+        """
+        # Masks of the key shapes made of query filters only, the others can not match
+        shape_masks = None
+        shapes = self._key_shapes(target_key)
+        if shapes is not None:
+            positions = {key: i for i, (key, _) in enumerate(filter_items)}
+            shape_masks = set()
+            for shape in shapes:
+                if all([name in positions for name in shape]):
+                    shape_masks.add(sum([1 << positions[name] for name in shape]))
+            if not shape_masks:
+                return None, None
+
+        # Precompute the key part of every filter, positions sorted by it give the alphabetical order of order_invariant
+        tokens = [key + "_=" + encode_value(value) for key, value in filter_items]
+        sorted_positions = sorted(range(len(tokens)), key=tokens.__getitem__)
+        prefix = target_key + "#"
+
+        # Trained models never hold more than max_depth - 1 filters
+        max_filters = max(self.max_depth - 1, 0)
+        failed = set()
+
+        def visit(mask):
+            if mask in failed:
+                return None
+            if shape_masks is not None and not any([shape & ~mask == 0 for shape in shape_masks]):
+                failed.add(mask)
+                return None
+            n_filters = bin(mask).count("1")
+            if n_filters <= max_filters and (shape_masks is None or mask in shape_masks):
+                key = prefix + "&".join([tokens[i] for i in sorted_positions if mask >> i & 1])
+                percentile_list = self._lookup(key, target_key, [filter_items[i] for i in range(len(tokens)) if mask >> i & 1])
+                if percentile_list is not None:
+                    return percentile_list, len(tokens) - n_filters
+            for i in range(len(tokens)):
+                if mask >> i & 1:
+                    found = visit(mask & ~(1 << i))
+                    if found is not None:
+                        return found
+            failed.add(mask)
+            return None
+
+        found = visit((1 << len(tokens)) - 1)
+        return found if found is not None else (None, None)
+
     def _get_best_percentile_list(self, target_key: str, filters: dict = {}):
-        """Get the best percentile list for the given target key and filters, brute force approach to find the best percentile list
+        """Get the best percentile list for the given target key and filters, if the exact filters are not indexed the
+        filters are dropped one by one (first given first dropped) until a percentile list is found. Resolved lookups
+        are kept in a bounded LRU cache.
         
         :param target_key: The target key for which the percentile list is to be found
         :param filters: The filters to be applied
@@ -52,21 +301,56 @@ class NeuroBucketClassifier(ABC):
         :return: The best percentile list for the given target key and filters
         :rtype: List
         """
-        # Try to find all combination of filters and if there exist percentile list for the same
-        percentile_list = self.indexer_hash.get(order_invariant(target_key, filters), None)
-        if percentile_list is not None:
-            return percentile_list
+        filter_items = list(filters.items())
+        cache_key = (target_key, tuple(filter_items))
+        try:
+            found = self._lookup_cache.get(cache_key, None)
+        except TypeError:
+            # Unhashable filter values can not be cached
+            cache_key = None
+            found = None
 
-        # If not found then try to find the best percentile list by removing the filters one by one
-        for key in filters:
-            new_filters = filters.copy()
-            del new_filters[key]
-            percentile_list = self._get_best_percentile_list(target_key, new_filters)
-            if percentile_list is not None:
-                return percentile_list
+        if found is None:
+            found = self._resolve_percentile_list(target_key, filter_items)
+            if found[0] is not None and cache_key is not None:
+                self._lookup_cache.put(cache_key, found)
 
-        # If nothing is found then return None
-        return None
+        if self.stats is not None:
+            self.stats.record_lookup(found[1])
+        return found[0]
+
+    def clear_lookup_cache(self):
+        """Drop the cached lookups and key shapes, needed after the indexer hash is changed in place"""
+        self._lookup_cache.clear()
+        self._shapes = {}
+        self._shapes_complete = False
+
+    def enable_stats(self):
+        """Start recording query latencies, fallback depths and cache counters
+
+        :return: The statistics, updated by every following query
+        :rtype: :class:`neurobcl.base.stats.QueryStats`
+
+        .. code-block:: python
+
+            stats = classifier.enable_stats()
+            classifier.get("price", 1, '>', filters={"color": "blue"})
+            stats.to_dict() # {"latency": {"get": {...}}, "fallback_depth": {0: 1}, ...}
+        """
+        self.stats = QueryStats(self.cache_stats)
+        return self.stats
+
+    def disable_stats(self):
+        """Stop recording query statistics"""
+        self.stats = None
+
+    def cache_stats(self):
+        """Get the counters of the lookup caches
+
+        :return: Entries, bytes, hits, misses and evictions of every cache
+        :rtype: dict
+        """
+        return {"lookup_cache": self._lookup_cache.stats()}
 
     def get(self, target_key: str, target_key_bucket: int, operator: str = '<', filters: dict = {}, buckets: List[int] = [25, 25, 25, 25], debug: bool = False):
         """Get the value for the given target key and target key bucket based on the given filters and buckets
@@ -103,6 +387,7 @@ class NeuroBucketClassifier(ABC):
     
         :note: The operator can be either '<' or '>', if '<' then the upper bound of the bucket is returned, if '>' then the lower bound of the bucket is returned
         """
+        start = time.perf_counter() if self.stats is not None else None
         if target_key not in self.bucket_features:
             raise ValueError("Feature not found in bucket features")
         if target_key_bucket < 1 or target_key_bucket > len(buckets):
@@ -130,24 +415,251 @@ class NeuroBucketClassifier(ABC):
         if debug:
             print("Percentile to follow", percentile)
 
+        value = self._value_at(percentile_list, percentile, debug)
+        if start is not None:
+            self.stats.record_query("get", time.perf_counter() - start)
+        return value
+
+    def _value_at(self, percentile_list: List, percentile: float, debug: bool = False):
+        """Value of a stored percentile list at a percentile, truncated to the quantile grid or interpolated from the
+        CDF knots depending on the storage
+
+        :param percentile_list: The stored list of a key
+        :param percentile: The percentile, 0 to 100
+        :param debug: The debug flag, outputs verbose data
+        :type percentile_list: List
+        :type percentile: float
+        :type debug: bool, optional
+        :return: The value at the percentile
+        """
+        if self.storage == "cdf":
+            return cdf.evaluate(percentile_list, percentile)
+
         # Calculate index required for the given percentile
         index = int(percentile / self.quantile_gap)
         if debug:
             print("Index to follow", index)
-
         return percentile_list[index]
 
+    def _values_at(self, percentile_lists: List, rows: np.ndarray, percentiles: np.ndarray):
+        """Vectorized :meth:`_value_at`, row i is evaluated at percentiles[i] with the list percentile_lists[rows[i]]
+
+        :param percentile_lists: The distinct stored lists
+        :param rows: The list of every query
+        :param percentiles: The percentile of every query
+        :type percentile_lists: List[List]
+        :type rows: numpy.ndarray
+        :type percentiles: numpy.ndarray
+        :return: The values, NaN where the list has no value
+        :rtype: numpy.ndarray
+        """
+        if self.storage == "cdf":
+            values = np.full(len(rows), np.nan)
+            order = np.argsort(rows, kind='stable')
+            distinct, starts = np.unique(rows[order], return_index=True)
+            ends = np.append(starts[1:], len(rows))
+            for row, begin, end in zip(distinct.tolist(), starts.tolist(), ends.tolist()):
+                queries = order[begin:end]
+                values[queries] = cdf.evaluate_many(percentile_lists[row], percentiles[queries])
+            return values
+
+        table = np.array([[np.nan if value is None else value for value in percentile_list] for percentile_list in percentile_lists], dtype=np.float64)
+        return table.reshape(len(percentile_lists), -1)[rows, (np.asarray(percentiles) / self.quantile_gap).astype(np.int64)]
+
+    def get_many(self, target_keys, target_key_buckets, operators = '<', filters = None, buckets: List[int] = [25, 25, 25, 25]):
+        """Vectorized :meth:`get` for a batch of queries, every argument is either a single value shared by the whole
+        batch or one value per query. Percentile lists are resolved once per distinct (target key, filters) pair and
+        the bucket to percentile index conversion is done on whole arrays.
+
+        :param target_keys: The target key(s) for which the values are to be found
+        :param target_key_buckets: The target key bucket(s)
+        :param operators: The operator(s) to be used, defaults to '<'
+        :param filters: The filters to be applied (a dict or one dict per query), defaults to no filters
+        :param buckets: The buckets to be used for all the queries, defaults to [25, 25, 25, 25]
+        :type target_keys: str or List[str]
+        :type target_key_buckets: int or List[int] or numpy.ndarray
+        :type operators: str or List[str], optional
+        :type filters: dict or List[dict], optional
+        :type buckets: List[int], optional
+        :return: The value of every query, NaN where the percentile list has no value
+        :rtype: numpy.ndarray
+
+        :raises ValueError: If a feature is not found in bucket features
+        :raises ValueError: If a bucket is out of range
+        :raises ValueError: If the sum of all buckets is not 100
+        :raises ValueError: If no percentile list found for some filters
+        :raises ValueError: If the per query arguments have different lengths
+
+        .. code-block:: python
+
+            classifier.get_many("price", [1, 4], ['>', '<'], filters=[{}, {"color": "blue"}]) # array([100., 400.])
+        """
+        start = time.perf_counter() if self.stats is not None else None
+        if sum(buckets) != 100:
+            raise ValueError("Sum of all buckets should be 100")
+
+        # Work out the batch size from the per query arguments
+        per_query = [arg for arg in [target_keys, operators, filters] if not isinstance(arg, (str, dict)) and arg is not None]
+        target_key_buckets = np.asarray(target_key_buckets)
+        if target_key_buckets.ndim > 0:
+            per_query.append(target_key_buckets)
+        lengths = set(len(arg) for arg in per_query)
+        if len(lengths) > 1:
+            raise ValueError("All per query arguments should have the same length")
+        n = lengths.pop() if lengths else 1
+        if n == 0:
+            return np.empty(0, dtype=np.float64)
+
+        # Bucket to percentile index, for all the queries at once
+        target_key_buckets = np.broadcast_to(target_key_buckets, (n,)).astype(np.int64)
+        if np.any((target_key_buckets < 1) | (target_key_buckets > len(buckets))):
+            raise ValueError("Bucket out of range")
+        if isinstance(operators, str):
+            steps = target_key_buckets - (1 if operators == '>' else 0)
+        else:
+            steps = target_key_buckets - (np.asarray(operators, dtype=object) == '>')
+        percentiles = np.concatenate([[0], np.cumsum(buckets)])[steps]
+
+        percentile_lists, rows = self._resolve_many(target_keys, filters, n)
+        values = self._values_at(percentile_lists, rows, percentiles)
+        if start is not None:
+            self.stats.record_query("get_many", time.perf_counter() - start)
+        return values
+
+    def _resolve_many(self, target_keys, filters, n: int):
+        """Resolve the percentile lists of a batch of queries, every distinct (target key, filters) pair is resolved
+        once through the fallback lookup
+
+        :param target_keys: The target key, or one per query
+        :param filters: The filters, or one dict per query, None for no filters
+        :param n: The number of queries
+        :type target_keys: str or List[str]
+        :type filters: dict or List[dict]
+        :type n: int
+        :return: The distinct percentile lists and the position of every query in them
+        :rtype: Tuple[List[List], numpy.ndarray]
+        """
+        target_keys = [target_keys] * n if isinstance(target_keys, str) else list(target_keys)
+        if filters is None or isinstance(filters, dict):
+            filters = [filters or {}] * n
+
+        resolved = {}
+        rows = np.empty(n, dtype=np.int64)
+        lists = []
+        for i in range(n):
+            lookup_key = (target_keys[i], tuple(filters[i].items()))
+            row = resolved.get(lookup_key, None)
+            if row is None:
+                if target_keys[i] not in self.bucket_features:
+                    raise ValueError("Feature not found in bucket features")
+                percentile_list = self._get_best_percentile_list(target_keys[i], filters[i])
+                if percentile_list is None:
+                    raise ValueError("No percentile list found for the given filters")
+                row = resolved[lookup_key] = len(lists)
+                lists.append(percentile_list)
+            rows[i] = row
+
+        return lists, rows
+
+    def assign_buckets(self, target_key: str, values, filters = None, buckets: List[int] = [25, 25, 25, 25]):
+        """Find the bucket every value falls into, given the filters of its own item. This is the inverse of
+        :meth:`get`: a value v is in bucket b when get(target_key, b - 1, '<') < v <= get(target_key, b, '<'), values
+        below the first bound are in bucket 1 and values above the last one in the last bucket. Percentile lists are
+        resolved once per distinct filters and the bounds are searched for all the values at once.
+
+        :param target_key: The bucket feature the values belong to
+        :param values: The value of every item
+        :param filters: The filters of every item (one dict per item) or of all of them (a dict), defaults to no filters
+        :param buckets: The buckets to be used, defaults to [25, 25, 25, 25]
+        :type target_key: str
+        :type values: List or numpy.ndarray
+        :type filters: dict or List[dict], optional
+        :type buckets: List[int], optional
+        :return: The bucket of every value (1 to len(buckets)), 0 for a missing value or a filter without data
+        :rtype: numpy.ndarray
+
+        :raises ValueError: If the feature is not found in bucket features
+        :raises ValueError: If the sum of all buckets is not 100
+        :raises ValueError: If no percentile list found for some filters
+        :raises ValueError: If there is not one filters dict per value
+
+        .. code-block:: python
+
+            classifier.assign_buckets("price", [150, 250]) # array([1, 2])
+            classifier.assign_buckets("price", [150, 250], filters=[{"color": "red"}, {"color": "blue"}])
+        """
+        start = time.perf_counter() if self.stats is not None else None
+        if sum(buckets) != 100:
+            raise ValueError("Sum of all buckets should be 100")
+
+        values = np.array([np.nan if value is None else value for value in values], dtype=np.float64) if isinstance(values, list) else np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if not (filters is None or isinstance(filters, dict)) and len(filters) != n:
+            raise ValueError("There should be one filters dict per value")
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+
+        percentile_lists, rows = self._resolve_many(target_key, filters, n)
+
+        # Upper bound of every bucket but the last
+        inner = np.cumsum(buckets)[:-1]
+        bounds = self._values_at(percentile_lists, np.repeat(rows, len(inner)), np.tile(inner, n)).reshape(n, len(inner))
+
+        # Same as a left searchsorted of every value in its own bounds, done for all the rows at once
+        assigned = (bounds < values[:, None]).sum(axis=1) + 1
+        missing = np.isnan(values)
+        if len(inner) > 0:
+            missing |= np.isnan(bounds[:, 0])
+        assigned[missing] = 0
+        if start is not None:
+            self.stats.record_query("assign_buckets", time.perf_counter() - start)
+        return assigned
+
+    def add_items(self, items: List[Dict]):
+        """Add items to the model without a full re-index, only the filter combinations of the items are refreshed
+
+        :param items: The items to be added
+        :type items: List[Dict]
+
+        :raises ValueError: If the classifier was not trained by an incremental trainer
+        """
+        if self.updater is None:
+            raise ValueError("Classifier is not attached to an incremental trainer")
+        self.updater.add_items(items)
+        self.clear_lookup_cache()
+
+    def remove_items(self, items: List[Dict]):
+        """Remove previously added items from the model without a full re-index
+
+        :param items: The items to be removed
+        :type items: List[Dict]
+
+        :raises ValueError: If the classifier was not trained by an incremental trainer
+        """
+        if self.updater is None:
+            raise ValueError("Classifier is not attached to an incremental trainer")
+        self.updater.remove_items(items)
+        self.clear_lookup_cache()
+
     def toJson(self):
         """Converts the classifier to a JSON string
         
         :return: The JSON string representation of the classifier
         :rtype: str
         """
-        return json.dumps(self.__dict__)
+        return json.dumps({
+            "quantile_gap": self.quantile_gap,
+            "max_depth": self.max_depth,
+            "indexer_hash": self.indexer_hash if type(self.indexer_hash) == dict else dict(self.indexer_hash),
+            "filter_features": self.filter_features,
+            "bucket_features": self.bucket_features,
+            "storage": self.storage,
+            "key_format": KEY_FORMAT,
+        })
 
     @classmethod
     def fromJson(cls, json_str):
-        """Converts the JSON string to a classifier
+        """Converts the JSON string to a classifier, keys of older key formats are migrated (see :func:`migrate_keys`)
 
         :param json_str: The JSON string to be converted
         :type json_str: str
@@ -155,23 +667,257 @@ class NeuroBucketClassifier(ABC):
         :rtype: :class:`NeuroBucketClassifier`
         """
         data = json.loads(json_str)
-        return cls(**data)
+        if data.pop("key_format", 1) < KEY_FORMAT:
+            data["indexer_hash"] = migrate_keys(data["indexer_hash"], data.get("filter_features", []))
+        classifier = cls(**data)
+        classifier._index_key_shapes()
+        return classifier
+
+    def toBinary(self, path: str):
+        """Writes the classifier to a compact binary file that can be memory mapped by :meth:`fromBinary`
+
+        :param path: The file path
+        :type path: str
+        """
+        metadata = {
+            "filter_features": self.filter_features,
+            "bucket_features": self.bucket_features,
+            "storage": self.storage,
+            "key_format": KEY_FORMAT,
+        }
+        if self.storage == "cdf":
+            # Knot lists have different lengths, the shorter ones are padded
+            write_binary(path, self.quantile_gap, self.max_depth, self.indexer_hash, metadata, max([len(knots) for knots in self.indexer_hash.values()], default=0))
+        else:
+            write_binary(path, self.quantile_gap, self.max_depth, self.indexer_hash, metadata)
+
+    @classmethod
+    def fromBinary(cls, path: str):
+        """Loads a classifier written by :meth:`toBinary`, the file is memory mapped so loading is near instant, the
+        pages are shared between processes and lookups read straight from the mapped file. A file of an older key format
+        is migrated (see :func:`migrate_keys`) into an in memory indexer hash, write it again to map it.
+
+        :param path: The file path
+        :type path: str
+        :return: The classifier backed by the mapped file
+        :rtype: :class:`NeuroBucketClassifier`
+
+        .. code-block:: python
+
+            classifier.toBinary("model.nbcl")
+            classifier = NeuroBucketClassifier.fromBinary("model.nbcl")
+        """
+        indexer_hash = MappedIndex.open(path)
+        metadata = indexer_hash.metadata
+        quantile_gap, max_depth = indexer_hash.quantile_gap, indexer_hash.max_depth
+        if metadata.get("key_format", 1) < KEY_FORMAT:
+            indexer_hash = migrate_keys(indexer_hash, metadata["filter_features"])
+        classifier = cls(quantile_gap, max_depth, indexer_hash, metadata["filter_features"], metadata["bucket_features"], storage=metadata.get("storage", "grid"))
+        classifier._index_key_shapes()
+        return classifier
 
     def __str__(self):
         return self.toJson()
 
+# Trainer shared with the index worker processes, set once per process by the pool initializer
+_worker_trainer = None
+
+class LazyBucketClassifier(NeuroBucketClassifier):
+    """A classifier that indexes on demand, it keeps a reference to the trainer (and so to its training data) and
+    computes the percentile list of a filter combination the first time a query needs it. Computed lists are kept in
+    a bounded LRU cache, so startup costs nothing and memory follows the working set. Answers are the same as the
+    ones of the eagerly indexed classifier from :meth:`NeuroBucketTrainer.index`.
+
+    :param trainer: The trainer holding the data, eg a :class:`neurobcl.trainers.columnar_trainer.ColumnarBucketTrainer`
+    :param cache_size: The maximum number of cached percentile lists
+    :param cache_bytes: The maximum number of bytes of cached percentile lists, None for no byte budget
+    :type trainer: :class:`NeuroBucketTrainer`
+    :type cache_size: int, optional
+    :type cache_bytes: int, optional
+
+    .. code-block:: python
+
+        classifier = ColumnarBucketTrainer(data, ["company", "category"], ["listPrice"], max_depth=3).index_lazy()
+        classifier.warm(query_log) # [("listPrice", {"company": "NIKE"}), ...]
+        classifier.get("listPrice", 2, filters={"company": "NIKE"})
+    """
+    def __init__(self, trainer, cache_size: int = 65536, cache_bytes: int = None):
+        NeuroBucketClassifier.__init__(self, trainer.quantile_gap, trainer.max_depth, {}, trainer.get_non_bucket_features(), trainer.get_bucket_features(), storage=trainer.storage)
+        self.trainer = trainer
+        self.percentile_cache = LRUCache(cache_size, cache_bytes)
+
+        # Known values per keyword feature, combinations of unknown values are never indexed
+        self._known_values = {key: set(values) for key, values in trainer.get_non_bucket_features().items()}
+
+    def _indexed(self, target_key: str, filter_items: List):
+        """True if the eager index would hold a percentile list for these filters"""
+        if target_key not in self.bucket_features:
+            return False
+        for key, value in filter_items:
+            try:
+                if value not in self._known_values.get(key, ()):
+                    return False
+            except TypeError:
+                return False
+        if self.trainer.min_support > 0 and len(filter_items) > 0:
+            return self.trainer.total_items(dict(filter_items)) >= self.trainer.min_support
+        return True
+
+    def _key_shapes(self, target_key: str):
+        # Nothing is indexed ahead, every filter subset may be computed
+        return None
+
+    def _lookup(self, key: str, target_key: str = None, filter_items: List = None):
+        percentile_list = self.percentile_cache.get(key, None)
+        if percentile_list is not None or target_key is None:
+            return percentile_list
+
+        if not self._indexed(target_key, filter_items):
+            return None
+        percentile_list = self.trainer._index_list(target_key, dict(filter_items))
+        self.percentile_cache.put(key, percentile_list)
+        return percentile_list
+
+    def warm(self, queries, limit: int = None):
+        """Compute the percentile lists of past queries ahead of time, the most frequent queries first
+
+        :param queries: The (target key, filters) pair of every logged query
+        :param limit: The number of distinct queries to warm, defaults to all of them
+        :type queries: Iterable[tuple]
+        :type limit: int, optional
+        :return: The number of distinct queries warmed
+        :rtype: int
+        """
+        frequency = {}
+        for target_key, filters in queries:
+            query = (target_key, tuple(filters.items()))
+            frequency[query] = frequency.get(query, 0) + 1
+
+        ordered = sorted(frequency, key=frequency.get, reverse=True)[:limit]
+        # Least frequent first so the most frequent end up as the most recently used
+        for target_key, filter_items in reversed(ordered):
+            self._get_best_percentile_list(target_key, dict(filter_items))
+        return len(ordered)
+
+    def cache_stats(self):
+        stats = NeuroBucketClassifier.cache_stats(self)
+        stats["percentile_cache"] = self.percentile_cache.stats()
+        return stats
+
+    def clear_lookup_cache(self):
+        """Drop the cached lookups and the computed percentile lists"""
+        NeuroBucketClassifier.clear_lookup_cache(self)
+        self.percentile_cache.clear()
+
+    def toJson(self):
+        raise ValueError("A lazy classifier has no complete indexer hash, export the model from the trainer's index()")
+
+    def toBinary(self, path: str):
+        raise ValueError("A lazy classifier has no complete indexer hash, export the model from the trainer's index()")
+
+    def __str__(self):
+        return "LazyBucketClassifier(" + json.dumps({
+            "quantile_gap": self.quantile_gap,
+            "max_depth": self.max_depth,
+            "filter_features": self.filter_features,
+            "bucket_features": self.bucket_features,
+            "cached": len(self.percentile_cache),
+        }) + ")"
+
+def _init_index_worker(trainer):
+    global _worker_trainer
+    _worker_trainer = trainer
+
+def _run_index_worker_task(task):
+    if _worker_trainer.stats is None:
+        return _worker_trainer._run_index_task(task)
+
+    # Fresh statistics per task, they are sent back with the result and merged by the parent
+    _worker_trainer.stats = TrainingStats()
+    return _worker_trainer._run_index_task(task), _worker_trainer.stats
+
 class NeuroBucketTrainer(ABC):
-    """The NeuroBucketTrainer class is used to train the classifier based on the given data and features (template only)"""
-    def __init__(self, quantile_gap: int = 10, max_depth: int = 2):
+    """The NeuroBucketTrainer class is used to train the classifier based on the given data and features (template only)
+
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the filters
+    :param min_support: Filter combinations matching fewer items are not indexed and left to the fallback lookup of
+        the classifier, 0 indexes every combination of values even if it never occurs in the data
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+    """
+    def __init__(self, quantile_gap: int = 10, max_depth: int = 2, min_support: int = 1):
         if 100 % quantile_gap != 0:
             raise ValueError("Quantile gap should be a factor of 100")
+        if min_support < 0:
+            raise ValueError("Minimum support should not be negative")
 
         self.quantile_gap = quantile_gap
         self.max_depth = max_depth
+        self.min_support = min_support
 
         # Our datastore to save all the data
         self.indexer_hash = {}
 
+        # Indexing statistics, only recorded once enabled
+        self.stats = None
+
+        # Compressed CDF settings, None for the quantile grid
+        self.cdf = None
+
+    @property
+    def storage(self):
+        """The storage of the indexed lists, "grid" or "cdf" """
+        return "grid" if self.cdf is None else "cdf"
+
+    def enable_cdf(self, max_knots: int = 32, max_error: float = 0.0, steps: int = 1000):
+        """Index compressed quantile functions instead of the quantile grid, so the classifier can answer any
+        percentile (eg buckets [33, 33, 34]) whatever the quantile gap. The quantile function of every combination is
+        sampled at steps + 1 evenly spaced percentiles and compressed to at most max_knots knots, see
+        :func:`neurobcl.base.cdf.compress`.
+
+        :param max_knots: The maximum number of knots per key, at least 2
+        :param max_error: The acceptable interpolation error as a fraction of the value range of a key, 0 uses all
+            the knots a key needs up to max_knots
+        :param steps: The number of percentile steps sampled, 1000 samples every 0.1%
+        :type max_knots: int, optional
+        :type max_error: float, optional
+        :type steps: int, optional
+        :return: The trainer
+        :rtype: :class:`NeuroBucketTrainer`
+
+        .. code-block:: python
+
+            classifier = trainer.enable_cdf(max_knots=24).index()
+            classifier.get("price", 1, '<', buckets=[33, 33, 34])
+        """
+        if max_knots < 2:
+            raise ValueError("A CDF needs at least 2 knots")
+        if steps < 1:
+            raise ValueError("Steps should be positive")
+        self.cdf = {"max_knots": max_knots, "max_error": max_error, "steps": steps}
+        return self
+
+    def enable_stats(self):
+        """Start recording indexing statistics, timings and counts per bucket feature and depth
+
+        :return: The statistics, filled by the following :meth:`index` calls
+        :rtype: :class:`neurobcl.base.stats.TrainingStats`
+        """
+        self.stats = TrainingStats()
+        return self.stats
+
+    def cache_stats(self):
+        """Get the counters and bytes of the caches and indexes held by the trainer, trainers with caches override this.
+        Every cache is reported under its name with the counters of :meth:`neurobcl.base.cache.LRUCache.stats` and
+        every other structure as a "<name>_bytes" size, eg {"filter_cache": {...}, "sort_bytes": 4096}.
+
+        :return: The cache counters and sizes
+        :rtype: dict
+        """
+        return {}
+
     @abstractmethod
     def total_items(self, filters: dict = {}):
         """Get the total items for the given filters
@@ -216,6 +962,102 @@ class NeuroBucketTrainer(ABC):
         """
         raise NotImplementedError("NeuroBucketClassifier():: get_bucket_features is not implemented")
 
+    def _observed_values(self, key: str, current_filters: dict):
+        """Get the values of a keyword feature that occur together with the current filters and their item counts,
+        trainers that can count all the values in one scan should override this
+
+        :param key: The keyword feature name
+        :param current_filters: The current filters
+        :type key: str
+        :type current_filters: dict
+        :return: The number of items for every co-occurring value
+        :rtype: Dict
+        """
+        counts = {}
+        for value in self.get_non_bucket_features()[key]:
+            current_filters[key] = value
+            total = self.total_items(current_filters)
+            del current_filters[key]
+            if total > 0:
+                counts[value] = total
+        return counts
+
+    def _filter_values(self, key: str, current_filters: dict):
+        """Get the values of a keyword feature worth adding to the current filters
+
+        :param key: The keyword feature name
+        :param current_filters: The current filters
+        :type key: str
+        :type current_filters: dict
+        :return: The values to be indexed below the current filters
+        :rtype: List
+        """
+        if self.min_support == 0:
+            return list(self.get_non_bucket_features()[key])
+
+        # Only values occurring with the current filters, a combination can never have more support than its parent
+        return [value for value, total in self._observed_values(key, current_filters).items() if total >= self.min_support]
+
+    def _percentile_list(self, bucket_feat_name: str, current_filters: dict):
+        """Compute the percentile list of the bucket feature for the current filters, trainers that can answer all the
+        ranks at once should override this
+
+        :param bucket_feat_name: The bucket feature name
+        :param current_filters: The current filters
+        :type bucket_feat_name: str
+        :type current_filters: dict
+        :return: The value at every quantile step (0, quantile_gap, ..., 100)
+        :rtype: List
+        """
+        percentile_list = [0] * (int(100 / self.quantile_gap) + 1)
+        for percentile in range(0, 101, self.quantile_gap):
+            rank = min(int(percentile * self.total_items(current_filters) / 100), self.total_items(current_filters) - 1)
+            percentile_list[int(percentile / self.quantile_gap)] = self.get_at(bucket_feat_name, rank, current_filters)
+        return percentile_list
+
+    def _quantile_values(self, bucket_feat_name: str, current_filters: dict, steps: int):
+        """Get the value of the bucket feature at every step t = 0..steps, the one at rank min(t * total // steps,
+        total - 1), trainers that can answer all the ranks at once should override this
+
+        :param bucket_feat_name: The bucket feature name
+        :param current_filters: The current filters
+        :param steps: The number of steps
+        :type bucket_feat_name: str
+        :type current_filters: dict
+        :type steps: int
+        :return: The steps + 1 values, None if no item matches the filters
+        :rtype: List
+        """
+        total = self.total_items(current_filters)
+        if total == 0:
+            return None
+        return [self.get_at(bucket_feat_name, min(step * total // steps, total - 1), current_filters) for step in range(steps + 1)]
+
+    def _cdf_list(self, bucket_feat_name: str, current_filters: dict):
+        """Compute the compressed CDF knots of the bucket feature for the current filters
+
+        :return: The flat knots, empty if no item matches the filters
+        :rtype: List
+        """
+        steps = self.cdf["steps"]
+        values = self._quantile_values(bucket_feat_name, current_filters, steps)
+        if values is None:
+            return []
+        return cdf.compress(np.arange(steps + 1) * 100 / steps, values, self.cdf["max_knots"], self.cdf["max_error"])
+
+    def _index_list(self, bucket_feat_name: str, current_filters: dict):
+        """Compute what is stored for the bucket feature and the current filters, the percentile list or the CDF knots
+
+        :param bucket_feat_name: The bucket feature name
+        :param current_filters: The current filters
+        :type bucket_feat_name: str
+        :type current_filters: dict
+        :rtype: List
+        """
+        if self.cdf is None:
+            return self._percentile_list(bucket_feat_name, current_filters)
+        return self._cdf_list(bucket_feat_name, current_filters)
+
     def _add_to_indexer(self, bucket_feat_name: str, current_filters: dict, percentile_list: List):
         """Add the percentile list to the indexer hash
 
@@ -246,36 +1088,166 @@ class NeuroBucketTrainer(ABC):
         # It will terminate when either it reaches the lowest depth or all the features are exhausted
         if depth <= 0 or len(current_filters) == len(self.get_non_bucket_features()):
             # We reached the lowest low, finally find percentile for this one XD
-            percentile_list = [0] * (int(100 / self.quantile_gap) + 1)
-            for percentile in range(0, 101, self.quantile_gap):
-                rank = min(int(percentile * self.total_items(current_filters) / 100), self.total_items(current_filters) - 1)
-                percentile_list[int(percentile / self.quantile_gap)] = self.get_at(bucket_feat_name, rank, current_filters)
-
+            if self.stats is None:
+                percentile_list = self._index_list(bucket_feat_name, current_filters)
+            else:
+                start = time.perf_counter()
+                percentile_list = self._index_list(bucket_feat_name, current_filters)
+                self.stats.record_combinations(bucket_feat_name, len(current_filters), time.perf_counter() - start, 1, int(len(percentile_list) == 0 or percentile_list[0] is None))
             self._add_to_indexer(bucket_feat_name, current_filters, percentile_list)
             return
 
-        non_bucket_feats = self.get_non_bucket_features()
-        # Else add a filter and keep recursing, also dont add filter if it is already present
-        for key in non_bucket_feats:
-            if key in current_filters:
-                continue
-            for value in non_bucket_feats[key]:
+        keys = list(self.get_non_bucket_features())
+
+        # Else add a filter and keep recursing, filters are only added in feature order so every combination is visited once
+        start = max([keys.index(key) for key in current_filters], default=-1) + 1
+        for key in keys[start:]:
+            if self.stats is None:
+                values = self._filter_values(key, current_filters)
+            else:
+                search_start = time.perf_counter()
+                values = self._filter_values(key, current_filters)
+                self.stats.record_filter_search(len(current_filters) + 1, time.perf_counter() - search_start)
+            for value in values:
                 current_filters[key] = value
                 self.depth_features_index(bucket_feat_name, depth - 1, current_filters)
                 del current_filters[key]
 
-    def index(self):
+    def _index_tasks(self):
+        """Split the indexing into independent tasks, every task indexes the root of a bucket feature at a depth or
+        the subtree below a single top level filter
+
+        :return: The tasks in the order their results are added to the indexer hash
+        :rtype: List
+        """
+        keys = list(self.get_non_bucket_features())
+
+        tasks = []
+        for feature in self.get_bucket_features():
+            for depth in range(self.max_depth):
+                if depth == 0 or len(keys) == 0:
+                    tasks.append((feature, depth, {}))
+                    continue
+                for key in keys:
+                    for value in self._filter_values(key, {}):
+                        tasks.append((feature, depth, {key: value}))
+        return tasks
+
+    def _run_index_task(self, task):
+        """Run a single indexing task
+
+        :param task: The task from :meth:`_index_tasks`
+        :return: The part of the indexer hash computed by the task
+        :rtype: dict
+        """
+        feature, depth, current_filters = task
+
+        # Collect into a fresh hash so the task only returns its own keys
+        indexer_hash = self.indexer_hash
+        self.indexer_hash = {}
+        try:
+            if len(current_filters) == 0:
+                self.depth_features_index(feature, depth)
+            else:
+                self.depth_features_index(feature, depth - 1, dict(current_filters))
+            return self.indexer_hash
+        finally:
+            self.indexer_hash = indexer_hash
+
+    def _merge_index_results(self, results):
+        """Merge the results of all the tasks into the indexer hash, in task order so the model does not depend on
+        which worker finished first
+
+        :param results: The result of every task from :meth:`_index_tasks`, in task order
+        """
+        for result in results:
+            self.indexer_hash.update(result)
+
+    def index(self, workers: int = None, mp_context = None):
         """Index the classifier based on the given data and features
 
+        :param workers: The number of processes to index with, defaults to indexing in the current process
+        :param mp_context: The multiprocessing context of the workers (eg multiprocessing.get_context("spawn")),
+            defaults to the platform default
+        :type workers: int, optional
+        :type mp_context: multiprocessing.context.BaseContext, optional
         :return: The classifier model
         :rtype: :class:`NeuroBucketClassifier`
 
-        .. note:: This can take a while to index the data
+        .. note:: This can take a while to index the data, with workers the trainer is sent to every worker process
+            once and only the small task descriptions travel per task. The model is identical to the serial one.
         """
         # Lets try to find percentile for each feature at each interval
-        for feature in self.get_bucket_features():
-            for depth in range(self.max_depth):
-                self.depth_features_index(feature, depth)
+        start = time.perf_counter() if self.stats is not None else None
+        tasks = self._index_tasks()
+        parallel = workers is not None and workers > 1 and len(tasks) > 1
+        if parallel:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=_init_index_worker, initargs=(self,)) as executor:
+                results = list(executor.map(_run_index_worker_task, tasks))
+            if self.stats is not None:
+                for _, task_stats in results:
+                    self.stats.merge(task_stats)
+                results = [result for result, _ in results]
+        else:
+            results = [self._run_index_task(task) for task in tasks]
+        self._merge_index_results(results)
+
+        if start is not None:
+            self.stats.index_seconds += time.perf_counter() - start
+            self.stats.tasks += len(tasks)
+            self.stats.workers = workers if parallel else 1
+            self.stats.caches = self.cache_stats()
 
         # Finally return classifier model
-        return NeuroBucketClassifier(self.quantile_gap, self.max_depth, self.indexer_hash, self.get_non_bucket_features(), self.get_bucket_features())
\ No newline at end of file
+        return NeuroBucketClassifier(self.quantile_gap, self.max_depth, self.indexer_hash, self.get_non_bucket_features(), self.get_bucket_features(), storage=self.storage)
+
+    def index_lazy(self, cache_size: int = 65536, cache_bytes: int = None):
+        """Get a classifier that computes the percentile lists on demand instead of indexing everything up front, see
+        :class:`LazyBucketClassifier`
+
+        :param cache_size: The maximum number of cached percentile lists
+        :param cache_bytes: The maximum number of bytes of cached percentile lists, None for no byte budget
+        :type cache_size: int, optional
+        :type cache_bytes: int, optional
+        :return: The lazy classifier model
+        :rtype: :class:`LazyBucketClassifier`
+        """
+        return LazyBucketClassifier(self, cache_size, cache_bytes)
+
+class CountingBucketTrainer(NeuroBucketTrainer):
+    """Template of the trainers that keep an item count per filter combination instead of the records, in counts
+    (keyed by :meth:`_filters_key`) next to keywords, the values seen of every keyword feature in first seen order.
+    Totals and the values observed under a combination come straight from these counters, no data is scanned.
+
+    Subclasses set keyword_feats, bucket_feats, keywords and counts (or override :meth:`total_items`), and implement
+    :meth:`get_at` and the percentile lists of their value store.
+    """
+    def _filters_key(self, filters: dict):
+        """The counter key of a filter combination, its (keyword, value) pairs in keyword feature order
+
+        :param filters: The filters
+        :type filters: dict
+        :rtype: tuple
+        """
+        return tuple((key, filters[key]) for key in self.keyword_feats if key in filters)
+
+    def total_items(self, filters: dict = {}):
+        return self.counts.get(self._filters_key(filters), 0)
+
+    def _observed_values(self, key: str, current_filters: dict):
+        counts = {}
+        for value in self.keywords[key]:
+            current_filters[key] = value
+            total = self.total_items(current_filters)
+            del current_filters[key]
+            if total > 0:
+                counts[value] = total
+        return counts
+
+    def get_non_bucket_features(self):
+        """Get the non-bucket features of the counted records"""
+        return {key: list(values) for key, values in self.keywords.items()}
+
+    def get_bucket_features(self):
+        """Get the bucket features of the data"""
+        return self.bucket_feats
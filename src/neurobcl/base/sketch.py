@@ -0,0 +1,169 @@
+import math
+
+import numpy as np
+
+class KLLSketch:
+    """Mergeable quantile sketch (KLL), keeps a bounded number of items in levels of compactors where an item at
+    level h stands for 2^h original items. While fewer than about k items were added nothing is compacted and the
+    ranks are exact, after that the rank error is about 1.7 / k of the item count.
+
+    :param k: The size of the largest compactor, controls both the memory and the error
+    :type k: int, optional
+
+    .. code-block:: python
+
+        sketch = KLLSketch(k=200)
+        for value in [5, 1, 3]:
+            sketch.update(value)
+        sketch.rank_select(0) # 1
+    """
+    def __init__(self, k: int = 200):
+        if k < 2:
+            raise ValueError("Sketch size k should be at least 2")
+
+        self.k = k
+        self.count = 0
+        self.levels = [[]]
+
+        # Alternating coin per level decides which half survives a compaction, keeps the sketch deterministic
+        self.coins = [0]
+        self._size = 0
+
+    def _capacity(self, level: int):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def _compress(self):
+        """Compact levels until the sketch fits its capacity again"""
+        while self._size >= self._max_size():
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) < self._capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                    self.coins.append(0)
+
+                items = sorted(self.levels[level])
+                # An odd item out stays at this level, everything else is halved with double the weight
+                leftover = [items.pop()] if len(items) % 2 else []
+                offset = self.coins[level]
+                self.coins[level] ^= 1
+
+                promoted = items[offset::2]
+                self.levels[level + 1].extend(promoted)
+                self.levels[level] = leftover
+                self._size -= len(items) - len(promoted)
+                break
+
+    def update(self, value):
+        """Add a single value
+
+        :param value: The value to be added
+        """
+        self.levels[0].append(value)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._max_size():
+            self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        """Merge another sketch into this one, the other sketch is left untouched
+
+        :param other: The sketch to be merged
+        :type other: :class:`KLLSketch`
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+            self.coins.append(0)
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.count += other.count
+        self._size += other._size
+        self._compress()
+
+    @property
+    def exact(self):
+        """True if no item was compacted yet, ie ranks are exact"""
+        return len(self.levels) == 1
+
+    def weighted_items(self):
+        """Get every retained item with the number of original items it stands for
+
+        :return: The values and their weights
+        :rtype: Tuple[List, List[int]]
+        """
+        values = []
+        weights = []
+        for level, items in enumerate(self.levels):
+            values.extend(items)
+            weights.extend([2 ** level] * len(items))
+        return values, weights
+
+    def select(self, ranks):
+        """Get the values at the given ranks, a value is at rank r if r items are smaller than it
+
+        :param ranks: The ranks, between 0 and count - 1
+        :type ranks: List[int]
+        :return: The value at every rank, None if the sketch is empty
+        :rtype: List
+        """
+        values, weights = self.weighted_items()
+        return weighted_select(values, weights, ranks)
+
+    def rank_select(self, rank: int):
+        """Get the value at the given rank
+
+        :param rank: The rank, between 0 and count - 1
+        :type rank: int
+        :return: The value at the rank
+        """
+        return self.select([rank])[0]
+
+    def to_dict(self):
+        """Converts the sketch to a JSON serializable dictionary
+
+        :return: The sketch state
+        :rtype: dict
+        """
+        return {"k": self.k, "count": self.count, "levels": self.levels, "coins": self.coins}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Converts a dictionary from :meth:`to_dict` back to a sketch
+
+        :param data: The sketch state
+        :type data: dict
+        :return: The sketch
+        :rtype: :class:`KLLSketch`
+        """
+        sketch = cls(data["k"])
+        sketch.count = data["count"]
+        sketch.levels = [list(items) for items in data["levels"]]
+        sketch.coins = list(data["coins"])
+        sketch._size = sum(len(items) for items in sketch.levels)
+        return sketch
+
+def weighted_select(values, weights, ranks):
+    """Get the values at the given ranks of a weighted multiset, the value at rank r is the first one in sorted order
+    whose cumulative weight exceeds r
+
+    :param values: The values
+    :param weights: The weight of every value
+    :param ranks: The ranks
+    :type values: List
+    :type weights: List
+    :type ranks: List
+    :return: The value at every rank, None for all if there are no values
+    :rtype: List
+    """
+    if len(values) == 0:
+        return [None] * len(ranks)
+
+    order = sorted(range(len(values)), key=values.__getitem__)
+    cumulative = np.cumsum(np.asarray(weights, dtype=np.float64)[order])
+    positions = np.searchsorted(cumulative, np.asarray(ranks, dtype=np.float64), side='right')
+    positions = np.minimum(positions, len(order) - 1)
+    return [values[order[position]] for position in positions.tolist()]
@@ -0,0 +1,176 @@
+from bisect import bisect_left
+
+# Upper bounds (in microseconds) of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BOUNDS_US = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 100000, 1000000]
+
+class LatencyHistogram:
+    """Counts of latencies in fixed logarithmic buckets, cheap enough to record every call
+
+    .. code-block:: python
+
+        histogram = LatencyHistogram()
+        histogram.record(0.00003) # seconds
+        histogram.to_dict()["buckets"] # {"<=50us": 1, ...}
+    """
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BOUNDS_US) + 1)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float):
+        """Add a latency
+
+        :param seconds: The latency in seconds
+        :type seconds: float
+        """
+        self.counts[bisect_left(LATENCY_BOUNDS_US, seconds * 1e6)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def percentile(self, percentile: float):
+        """Upper bound (in microseconds) of the bucket holding the given percentile, None above the last bound
+
+        :param percentile: The percentile, 0 to 100
+        :type percentile: float
+        :rtype: float
+        """
+        if self.count == 0:
+            return None
+        target = percentile * self.count / 100
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count > 0:
+                return LATENCY_BOUNDS_US[position] if position < len(LATENCY_BOUNDS_US) else None
+        return None
+
+    def merge(self, other):
+        """Add the counts of another histogram"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total_seconds += other.total_seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+
+    def to_dict(self):
+        labels = ["<=" + str(bound) + "us" for bound in LATENCY_BOUNDS_US] + [">" + str(LATENCY_BOUNDS_US[-1]) + "us"]
+        return {
+            "count": self.count,
+            "mean_us": self.total_seconds / self.count * 1e6 if self.count else None,
+            "max_us": self.max_seconds * 1e6,
+            "p50_us": self.percentile(50),
+            "p99_us": self.percentile(99),
+            "buckets": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+class TrainingStats:
+    """Statistics of an :meth:`neurobcl.base.model.NeuroBucketTrainer.index` run, enabled with
+    :meth:`neurobcl.base.model.NeuroBucketTrainer.enable_stats`. Percentile lists are timed and counted per bucket
+    feature and depth (number of filters). The search for filter values (item counts, group joins) is timed per
+    depth, as it is shared by the bucket features in the columnar trainer. Nothing is recorded while the trainer
+    has no stats.
+
+    .. code-block:: python
+
+        stats = trainer.enable_stats()
+        trainer.index()
+        stats.to_dict()["features"]["listPrice"][1] # {"seconds": ..., "combinations": 40, "empty": 0}
+    """
+    def __init__(self):
+        self.features = {}
+        self.filter_seconds = {}
+        self.index_seconds = 0.0
+        self.tasks = 0
+        self.workers = 1
+        self.caches = {}
+
+    def record_combinations(self, feature: str, depth: int, seconds: float, combinations: int, empty: int):
+        """Add the percentile lists computed for a bucket feature at a depth
+
+        :param feature: The bucket feature
+        :param depth: The number of filters
+        :param seconds: The time spent computing the percentile lists
+        :param combinations: The number of filter combinations indexed
+        :param empty: How many of them matched no item
+        """
+        by_depth = self.features.setdefault(feature, {})
+        phase = by_depth.get(depth, None)
+        if phase is None:
+            phase = by_depth[depth] = {"seconds": 0.0, "combinations": 0, "empty": 0}
+        phase["seconds"] += seconds
+        phase["combinations"] += combinations
+        phase["empty"] += empty
+
+    def record_filter_search(self, depth: int, seconds: float):
+        """Add the time spent finding the filter values of a depth"""
+        self.filter_seconds[depth] = self.filter_seconds.get(depth, 0.0) + seconds
+
+    def merge(self, other):
+        """Add the statistics of another run, eg of an index worker"""
+        for feature, by_depth in other.features.items():
+            for depth, phase in by_depth.items():
+                self.record_combinations(feature, depth, phase["seconds"], phase["combinations"], phase["empty"])
+        for depth, seconds in other.filter_seconds.items():
+            self.record_filter_search(depth, seconds)
+
+    @property
+    def combinations(self):
+        """Total number of filter combinations indexed"""
+        return sum(phase["combinations"] for by_depth in self.features.values() for phase in by_depth.values())
+
+    def to_dict(self):
+        return {
+            "index_seconds": self.index_seconds,
+            "tasks": self.tasks,
+            "workers": self.workers,
+            "combinations": self.combinations,
+            "features": {feature: dict(sorted(by_depth.items())) for feature, by_depth in self.features.items()},
+            "filter_seconds": dict(sorted(self.filter_seconds.items())),
+            "caches": self.caches,
+        }
+
+class QueryStats:
+    """Statistics of the queries answered by a classifier, enabled with
+    :meth:`neurobcl.base.model.NeuroBucketClassifier.enable_stats`. Latencies are kept per method. The fallback
+    depth counts how many filters were dropped before a percentile list was found. Nothing is recorded while the
+    classifier has no stats.
+
+    :param cache_stats: Returns the cache counters of the classifier when the statistics are reported
+    :type cache_stats: Callable[[], dict], optional
+    """
+    def __init__(self, cache_stats=None):
+        self.latency = {}
+        self.fallback_depth = {}
+        self.not_found = 0
+        self.cache_stats = cache_stats
+
+    def record_query(self, method: str, seconds: float):
+        """Add the latency of a call
+
+        :param method: The method name, eg "get"
+        :param seconds: The latency in seconds
+        """
+        histogram = self.latency.get(method, None)
+        if histogram is None:
+            histogram = self.latency[method] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def record_lookup(self, dropped: int):
+        """Add a percentile list lookup
+
+        :param dropped: The number of filters dropped, None if no percentile list was found
+        """
+        if dropped is None:
+            self.not_found += 1
+        else:
+            self.fallback_depth[dropped] = self.fallback_depth.get(dropped, 0) + 1
+
+    def to_dict(self):
+        return {
+            "latency": {method: histogram.to_dict() for method, histogram in self.latency.items()},
+            "fallback_depth": dict(sorted(self.fallback_depth.items())),
+            "not_found": self.not_found,
+            "caches": self.cache_stats() if self.cache_stats is not None else {},
+        }
@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from neurobcl.base.binary import MAGIC
+from neurobcl.base.model import NeuroBucketClassifier
+from neurobcl.server import QueryServer
+
+def load_model(path: str):
+    """Load a classifier saved with toBinary or toJson, the format is detected from the file header
+
+    :param path: The model file path
+    :type path: str
+    :return: The classifier
+    :rtype: :class:`neurobcl.base.model.NeuroBucketClassifier`
+    """
+    with open(path, "rb") as f:
+        header = f.read(len(MAGIC))
+    if header == MAGIC:
+        return NeuroBucketClassifier.fromBinary(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return NeuroBucketClassifier.fromJson(f.read())
+
+def record_filters(classifier, record: dict):
+    """The filters of a record, its values for the filter features of the model. List values are not used as filters."""
+    return {key: record[key] for key in classifier.filter_features if key in record and not isinstance(record[key], (list, dict))}
+
+def assign_lines(classifier, lines, target_key: str, field: str, buckets):
+    """Label the JSON records of a chunk of lines with their bucket
+
+    :param classifier: The classifier
+    :param lines: The JSON lines
+    :param target_key: The bucket feature to assign
+    :param field: The field the bucket is written to
+    :param buckets: The buckets to be used
+    :type lines: List[str]
+    :type target_key: str
+    :type field: str
+    :type buckets: List[int]
+    :return: The labelled JSON lines, newline terminated
+    :rtype: str
+    """
+    records = [json.loads(line) for line in lines if line.strip()]
+    assigned = classifier.assign_buckets(
+        target_key,
+        [record.get(target_key, None) for record in records],
+        [record_filters(classifier, record) for record in records],
+        buckets,
+    )
+    for record, bucket in zip(records, assigned.tolist()):
+        record[field] = bucket
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+# Model and assignment settings of a worker process, set once by the pool initializer
+_worker_args = None
+
+def _init_assign_worker(model_path, target_key, field, buckets):
+    global _worker_args
+    _worker_args = (load_model(model_path), target_key, field, buckets)
+
+def _assign_worker_chunk(lines):
+    classifier, target_key, field, buckets = _worker_args
+    return assign_lines(classifier, lines, target_key, field, buckets)
+
+def _chunks(lines, chunk_size: int):
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def assign_jsonl(model_path: str, source, destination, target_key: str, field: str = None, buckets = [25, 25, 25, 25], workers: int = None, chunk_size: int = 10000):
+    """Stream JSON lines records, label each one with the bucket of its target key value and write them out in the
+    same order. With workers the chunks are labelled in parallel processes, each loading the model once, and only a
+    few chunks are in flight so memory does not grow with the file.
+
+    :param model_path: The model file path
+    :param source: The input lines, eg an open file
+    :param destination: The output file
+    :param target_key: The bucket feature to assign
+    :param field: The field the bucket is written to, defaults to target_key + "_bucket"
+    :param buckets: The buckets to be used
+    :param workers: The number of processes, defaults to the current process only
+    :param chunk_size: The number of records per chunk
+    :type model_path: str
+    :type source: Iterable[str]
+    :type destination: file
+    :type target_key: str
+    :type field: str, optional
+    :type buckets: List[int], optional
+    :type workers: int, optional
+    :type chunk_size: int, optional
+    """
+    field = field or target_key + "_bucket"
+    if workers is None or workers <= 1:
+        classifier = load_model(model_path)
+        for chunk in _chunks(source, chunk_size):
+            destination.write(assign_lines(classifier, chunk, target_key, field, buckets))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_assign_worker, initargs=(model_path, target_key, field, buckets)) as executor:
+        pending = deque()
+        for chunk in _chunks(source, chunk_size):
+            pending.append(executor.submit(_assign_worker_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                destination.write(pending.popleft().result())
+        while pending:
+            destination.write(pending.popleft().result())
+
+async def serve(model_path: str, path: str = None, host: str = "127.0.0.1", port: int = 0, max_batch: int = 1024, max_delay: float = 0.001):
+    """Load a model once and answer queries over a socket until cancelled, see :class:`neurobcl.server.QueryServer`
+
+    :param model_path: The model file path
+    :param path: The Unix domain socket path, defaults to TCP
+    :param host: The TCP host
+    :param port: The TCP port
+    :param max_batch: Evaluate as soon as this many requests are waiting
+    :param max_delay: The longest a request waits for others, in seconds
+    :type model_path: str
+    :type path: str, optional
+    :type host: str, optional
+    :type port: int, optional
+    :type max_batch: int, optional
+    :type max_delay: float, optional
+    """
+    server = QueryServer(load_model(model_path), max_batch, max_delay)
+    address = await server.start(path, host, port)
+    print("Listening on", address if isinstance(address, str) else "%s:%d" % address, file=sys.stderr, flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+def _buckets(text: str):
+    return [int(bucket) for bucket in text.split(",")]
+
+def main(argv=None):
+    """Command line entry point
+
+    .. code-block:: console
+
+        $ neurobcl assign --model model.nbcl --target listPrice --input items.jsonl --output labelled.jsonl --workers 8
+        $ neurobcl serve --model model.nbcl --socket /tmp/neurobcl.sock
+    """
+    parser = argparse.ArgumentParser(prog="neurobcl", description="NeuroBCL command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    assign = commands.add_parser("assign", help="Label JSON lines records with their bucket")
+    assign.add_argument("--model", required=True, help="Model file written by toBinary or toJson")
+    assign.add_argument("--target", required=True, help="Bucket feature to assign")
+    assign.add_argument("--input", default="-", help="Input JSON lines file, defaults to stdin")
+    assign.add_argument("--output", default="-", help="Output JSON lines file, defaults to stdout")
+    assign.add_argument("--field", default=None, help="Output field, defaults to <target>_bucket")
+    assign.add_argument("--buckets", type=_buckets, default=[25, 25, 25, 25], help="Bucket sizes, defaults to 25,25,25,25")
+    assign.add_argument("--workers", type=int, default=None, help="Number of processes")
+    assign.add_argument("--chunk-size", type=int, default=10000, help="Records per chunk")
+
+    server = commands.add_parser("serve", help="Answer queries over a Unix domain socket or TCP")
+    server.add_argument("--model", required=True, help="Model file written by toBinary or toJson")
+    server.add_argument("--socket", default=None, help="Unix domain socket path, defaults to TCP")
+    server.add_argument("--host", default="127.0.0.1", help="TCP host, defaults to 127.0.0.1")
+    server.add_argument("--port", type=int, default=7878, help="TCP port, defaults to 7878")
+    server.add_argument("--max-batch", type=int, default=1024, help="Requests per micro-batch")
+    server.add_argument("--max-delay", type=float, default=0.001, help="Seconds a request waits for others")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.model, args.socket, args.host, args.port, args.max_batch, args.max_delay))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    destination = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        assign_jsonl(args.model, source, destination, args.target, args.field, args.buckets, args.workers, args.chunk_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if destination is not sys.stdout:
+            destination.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,17 @@
-from typing import List, Dict
+from typing import Iterable, List, Dict
 
 from neurobcl.base.model import NeuroBucketClassifier
 from neurobcl.trainers.dictionary_trainer import DictionaryBucketTrainer
+from neurobcl.trainers.columnar_trainer import ColumnarBucketTrainer
+from neurobcl.trainers.frame_trainer import FrameBucketTrainer
+from neurobcl.trainers.streaming import build_store, iter_csv, iter_jsonl
 
-def train_from_dictionary(data: List[Dict], keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2) -> NeuroBucketClassifier:
+TRAINER_ENGINES = {
+    "dictionary": DictionaryBucketTrainer,
+    "columnar": ColumnarBucketTrainer,
+}
+
+def train_from_dictionary(data: List[Dict], keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, engine="dictionary", min_support=1, workers=None) -> NeuroBucketClassifier:
     """Train using dictionary/json data, the format of the data should be a list of dictionaries where each dictionary represents 
     a single item and the keys of the dictionary represent the features of the item. (Should be uniform)
 
@@ -12,11 +20,17 @@ def train_from_dictionary(data: List[Dict], keyword_feats_name, bucket_feats_nam
     :param bucket_feats_name: The name of the bucket features (numerical features)
     :param quantile_gap: The gap between the quantiles
     :param max_depth: The maximum depth of the decision tree
+    :param engine: The trainer to use, either "dictionary" or "columnar" (NumPy arrays, much faster on large data)
+    :param min_support: Filter combinations with fewer items are not indexed, queries for them fall back to fewer filters
+    :param workers: The number of processes to index with, defaults to a single process
     :type data: List[Dict]
     :type keyword_feats_name: List[str]
     :type bucket_feats_name: List[str]
     :type quantile_gap: int, optional
     :type max_depth: int, optional
+    :type engine: str, optional
+    :type min_support: int, optional
+    :type workers: int, optional
     :return: The trained model
     :rtype: :class:`neurobcl.base.model.NeuroBucketClassifier`
 
@@ -40,5 +54,146 @@ def train_from_dictionary(data: List[Dict], keyword_feats_name, bucket_feats_nam
     
     .. note:: The keyword_feats_name and bucket_feats_name should be contained in the data for each item
     """
-    trainer = DictionaryBucketTrainer(data, keyword_feats_name, bucket_feats_name, quantile_gap, max_depth)
-    return trainer.index()
\ No newline at end of file
+    if engine not in TRAINER_ENGINES:
+        raise ValueError("Unknown engine " + str(engine) + ", should be one of " + ", ".join(TRAINER_ENGINES))
+
+    trainer = TRAINER_ENGINES[engine](data, keyword_feats_name, bucket_feats_name, quantile_gap, max_depth, min_support)
+    return trainer.index(workers)
+
+def train_from_records(records: Iterable[Dict], keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1, workers=None) -> NeuroBucketClassifier:
+    """Train from any iterable of records (eg a generator), the records are streamed once and only the keyword and
+    bucket features are kept, in compact typed columns. A None (or NaN) bucket value is missing and the record is left
+    out of that feature's percentiles.
+
+    :param records: The records to train on
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the decision tree
+    :param min_support: Filter combinations with fewer items are not indexed, queries for them fall back to fewer filters
+    :param workers: The number of processes to index with, defaults to a single process
+    :type records: Iterable[Dict]
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+    :type workers: int, optional
+    :return: The trained model
+    :rtype: :class:`neurobcl.base.model.NeuroBucketClassifier`
+    """
+    store = build_store(records, keyword_feats_name, bucket_feats_name)
+    trainer = ColumnarBucketTrainer(store, keyword_feats_name, bucket_feats_name, quantile_gap, max_depth, min_support)
+    return trainer.index(workers)
+
+def train_from_jsonl(path, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1, workers=None) -> NeuroBucketClassifier:
+    """Train from a JSON lines file (one record per line) without loading it as a list of dictionaries, the file is
+    read once. Produces the same model as :func:`train_from_dictionary` on the parsed records.
+
+    :param path: The file path or an open text file
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the decision tree
+    :param min_support: Filter combinations with fewer items are not indexed, queries for them fall back to fewer filters
+    :param workers: The number of processes to index with, defaults to a single process
+    :type path: str or file
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+    :type workers: int, optional
+    :return: The trained model
+    :rtype: :class:`neurobcl.base.model.NeuroBucketClassifier`
+
+    .. code-block:: python
+
+        model = train_from_jsonl("products.jsonl", ["company", "category"], ["listPrice"])
+    """
+    return train_from_records(iter_jsonl(path), keyword_feats_name, bucket_feats_name, quantile_gap, max_depth, min_support, workers)
+
+def train_from_csv(path, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1, workers=None, delimiter=",", list_separator=None) -> NeuroBucketClassifier:
+    """Train from a CSV file with a header row, the file is read once and only the named columns are kept. Bucket
+    columns are parsed as numbers, an empty bucket cell is a missing value.
+
+    :param path: The file path or an open text file
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the decision tree
+    :param min_support: Filter combinations with fewer items are not indexed, queries for them fall back to fewer filters
+    :param workers: The number of processes to index with, defaults to a single process
+    :param delimiter: The CSV delimiter, defaults to ","
+    :param list_separator: Separator of list valued keyword cells (eg "|"), defaults to single values
+    :type path: str or file
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+    :type workers: int, optional
+    :type delimiter: str, optional
+    :type list_separator: str, optional
+    :return: The trained model
+    :rtype: :class:`neurobcl.base.model.NeuroBucketClassifier`
+
+    .. code-block:: python
+
+        model = train_from_csv("products.csv", ["company", "tags"], ["listPrice"], list_separator="|")
+    """
+    records = iter_csv(path, keyword_feats_name, bucket_feats_name, delimiter, list_separator)
+    return train_from_records(records, keyword_feats_name, bucket_feats_name, quantile_gap, max_depth, min_support, workers)
+
+def train_from_dataframe(frame, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1, workers=None) -> NeuroBucketClassifier:
+    """Train from a pandas DataFrame (or a NumPy structured array, or a mapping of NumPy arrays) by reading the
+    columns as arrays, no record dictionaries are created. Categorical columns keep their codes. Missing keyword
+    values give the row no value for that feature and missing bucket values are left out of that feature's percentiles.
+
+    :param frame: The data to train on
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the decision tree
+    :param min_support: Filter combinations with fewer items are not indexed, queries for them fall back to fewer filters
+    :param workers: The number of processes to index with, defaults to a single process
+    :type frame: pandas.DataFrame or numpy.ndarray or Mapping[str, numpy.ndarray]
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+    :type workers: int, optional
+    :return: The trained model
+    :rtype: :class:`neurobcl.base.model.NeuroBucketClassifier`
+
+    .. code-block:: python
+
+        model = train_from_dataframe(df, ["company", "category"], ["listPrice"])
+    """
+    trainer = FrameBucketTrainer(frame, keyword_feats_name, bucket_feats_name, quantile_gap, max_depth, min_support)
+    return trainer.index(workers)
+
+def train_from_arrow(table, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1, workers=None) -> NeuroBucketClassifier:
+    """Train from an Arrow table or record batch, dictionary encoded columns keep their codes and list columns are
+    read from their offsets. Missing values are handled like in :func:`train_from_dataframe`.
+
+    :param table: The data to train on
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the decision tree
+    :param min_support: Filter combinations with fewer items are not indexed, queries for them fall back to fewer filters
+    :param workers: The number of processes to index with, defaults to a single process
+    :type table: pyarrow.Table or pyarrow.RecordBatch
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+    :type workers: int, optional
+    :return: The trained model
+    :rtype: :class:`neurobcl.base.model.NeuroBucketClassifier`
+    """
+    trainer = FrameBucketTrainer(table, keyword_feats_name, bucket_feats_name, quantile_gap, max_depth, min_support)
+    return trainer.index(workers)
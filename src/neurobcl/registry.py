@@ -0,0 +1,301 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections.abc import Mapping
+from typing import List
+
+from neurobcl.base.binary import MappedIndex
+from neurobcl.base.cache import LRUCache
+from neurobcl.base.model import KEY_FORMAT, LazyBucketClassifier, NeuroBucketClassifier
+
+CURRENT = "CURRENT"
+MANIFEST = "manifest.json"
+
+def _feature_of(key: str):
+    """The bucket feature of an indexer hash key, see :func:`neurobcl.base.model.order_invariant`"""
+    return key.partition("#")[0]
+
+class ShardedIndex(Mapping):
+    """Read only indexer hash of a registered model version, every bucket feature is a separate binary shard that is
+    only mapped when a key of that feature is first looked up. Mapped shards are held by the shard cache of the
+    registry, a shard evicted from it stays usable by the queries still holding it.
+
+    :param registry: The registry holding the shard cache
+    :param tenant: The tenant of the model
+    :param version: The version of the model
+    :param shards: The shard file name of every bucket feature
+    :type registry: :class:`ModelRegistry`
+    :type tenant: str
+    :type version: str
+    :type shards: Dict[str, str]
+    """
+    def __init__(self, registry, tenant: str, version: str, shards: dict):
+        self.registry = registry
+        self.tenant = tenant
+        self.version = version
+        self.shards = shards
+
+    def shard(self, feature: str):
+        """Get the mapped shard of a bucket feature, mapping it if needed
+
+        :param feature: The bucket feature
+        :type feature: str
+        :rtype: :class:`neurobcl.base.binary.MappedIndex`
+        """
+        return self.registry._load_shard(self.tenant, self.version, feature, self.shards[feature])
+
+    def feature_keys(self, feature: str):
+        """The keys of one bucket feature, only its shard is mapped
+
+        :param feature: The bucket feature
+        :type feature: str
+        :rtype: Iterable[str]
+        """
+        return iter(self.shard(feature)) if feature in self.shards else iter(())
+
+    def __getitem__(self, key):
+        feature = _feature_of(key) if type(key) == str else None
+        if feature not in self.shards:
+            raise KeyError(key)
+        return self.shard(feature)[key]
+
+    def __contains__(self, key):
+        feature = _feature_of(key) if type(key) == str else None
+        return feature in self.shards and key in self.shard(feature)
+
+    def __iter__(self):
+        for feature in self.shards:
+            yield from self.shard(feature)
+
+    def __len__(self):
+        return sum(len(self.shard(feature)) for feature in self.shards)
+
+class ModelRegistry:
+    """Versioned models of many tenants in a directory, every version is stored as one binary shard per bucket feature
+    so a service only maps the features it queries. Shards are mapped lazily on the first lookup and kept in one LRU
+    cache shared by all the tenants. Publishing a version writes it aside and then atomically replaces the CURRENT
+    pointer of the tenant, queries read the active classifier without taking a registry lock (only the short write
+    lock of a cache on a miss) and the ones already running on the previous version finish on it.
+
+    Layout: root/<tenant>/<version>/manifest.json, root/<tenant>/<version>/<shard>.nbcl and root/<tenant>/CURRENT.
+
+    :param root: The registry directory
+    :param max_shards: The maximum number of mapped shards across all the tenants
+    :param max_bytes: The maximum size (of the shard files) of the mapped shards, None for no byte budget
+    :type root: str
+    :type max_shards: int, optional
+    :type max_bytes: int, optional
+
+    .. code-block:: python
+
+        registry = ModelRegistry("models")
+        registry.publish("shop-a", classifier)
+        registry.get("shop-a", "listPrice", 1, '<', {"company": "NIKE"})
+
+        # Another process published a new version
+        registry.refresh("shop-a")
+    """
+    def __init__(self, root: str, max_shards: int = 64, max_bytes: int = None):
+        self.root = root
+        self.shards = LRUCache(max_shards, max_bytes)
+
+        # Active classifier of every tenant, replaced as a whole on a swap
+        self._models = {}
+
+        # Only shard loads and swaps are serialized, lookups in mapped shards never wait for them
+        self._load_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+
+    def _tenant_path(self, tenant: str):
+        if tenant in ("", ".", "..") or "/" in tenant or os.sep in tenant:
+            raise ValueError("Invalid tenant name " + repr(tenant))
+        return os.path.join(self.root, tenant)
+
+    def _version_path(self, tenant: str, version: str):
+        if version in ("", ".", "..") or version.startswith(".") or "/" in version or os.sep in version:
+            raise ValueError("Invalid version name " + repr(version))
+        return os.path.join(self._tenant_path(tenant), version)
+
+    def _load_shard(self, tenant: str, version: str, feature: str, file_name: str):
+        key = (tenant, version, feature)
+        shard = self.shards.get(key, None)
+        if shard is not None:
+            return shard
+
+        with self._load_lock:
+            # Another thread may have mapped it while this one waited
+            shard = self.shards.get(key, None)
+            if shard is not None:
+                return shard
+            shard = MappedIndex.open(os.path.join(self._version_path(tenant, version), file_name))
+            self.shards.put(key, shard)
+        return shard
+
+    def publish(self, tenant: str, classifier: NeuroBucketClassifier, version: str = None, activate: bool = True):
+        """Store a classifier as a new version of the tenant's model, one shard per bucket feature
+
+        :param tenant: The tenant
+        :param classifier: The classifier, eg from a trainer's index()
+        :param version: The version name, defaults to the current time in nanoseconds so versions sort by age
+        :param activate: Make it the active version
+        :type tenant: str
+        :type classifier: :class:`neurobcl.base.model.NeuroBucketClassifier`
+        :type version: str, optional
+        :type activate: bool, optional
+        :return: The version name
+        :rtype: str
+        """
+        if isinstance(classifier, LazyBucketClassifier):
+            raise ValueError("A lazy classifier has no complete indexer hash, publish the model from the trainer's index()")
+        if version is None:
+            version = str(time.time_ns())
+
+        path = self._version_path(tenant, version)
+        if os.path.exists(path):
+            raise ValueError("Version " + version + " of " + tenant + " already exists")
+
+        by_feature = {feature: {} for feature in classifier.bucket_features}
+        for key, percentile_list in classifier.indexer_hash.items():
+            feature = _feature_of(key)
+            if feature in by_feature:
+                by_feature[feature][key] = percentile_list
+
+        # Written next to the final directory and renamed, readers never see a partial version
+        tmp_path = os.path.join(self._tenant_path(tenant), "." + version + ".tmp")
+        os.makedirs(tmp_path)
+        try:
+            shards = {}
+            for position, (feature, indexer_hash) in enumerate(by_feature.items()):
+                shards[feature] = "shard-" + str(position) + ".nbcl"
+                shard = NeuroBucketClassifier(classifier.quantile_gap, classifier.max_depth, indexer_hash, classifier.filter_features, [feature], storage=classifier.storage)
+                shard.toBinary(os.path.join(tmp_path, shards[feature]))
+
+            with open(os.path.join(tmp_path, MANIFEST), "w") as f:
+                json.dump({
+                    "quantile_gap": classifier.quantile_gap,
+                    "max_depth": classifier.max_depth,
+                    "filter_features": classifier.filter_features,
+                    "bucket_features": classifier.bucket_features,
+                    "storage": classifier.storage,
+                    "key_format": KEY_FORMAT,
+                    "shards": shards,
+                }, f)
+            os.rename(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(tenant, version)
+        return version
+
+    def _open(self, tenant: str, version: str):
+        """Classifier of a stored version, no shard is mapped yet"""
+        with open(os.path.join(self._version_path(tenant, version), MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest.get("key_format", 1) < KEY_FORMAT:
+            raise ValueError("Version " + version + " of " + tenant + " uses an older key format, publish it again")
+        indexer_hash = ShardedIndex(self, tenant, version, manifest["shards"])
+        return NeuroBucketClassifier(manifest["quantile_gap"], manifest["max_depth"], indexer_hash, manifest["filter_features"], manifest["bucket_features"], storage=manifest["storage"])
+
+    def activate(self, tenant: str, version: str):
+        """Make a stored version the active one, eg to roll back. The CURRENT pointer is replaced atomically so other
+        processes see either the old or the new version.
+
+        :param tenant: The tenant
+        :param version: The version name
+        :type tenant: str
+        :type version: str
+        """
+        if not os.path.exists(os.path.join(self._version_path(tenant, version), MANIFEST)):
+            raise ValueError("Version " + version + " of " + tenant + " does not exist")
+
+        with self._swap_lock:
+            pointer = os.path.join(self._tenant_path(tenant), CURRENT)
+            with open(pointer + ".tmp", "w") as f:
+                f.write(version)
+            os.replace(pointer + ".tmp", pointer)
+            self._models[tenant] = self._open(tenant, version)
+
+    def current_version(self, tenant: str):
+        """Get the active version of the tenant as stored in the registry directory
+
+        :param tenant: The tenant
+        :type tenant: str
+        :return: The version name, None if nothing was published
+        :rtype: str
+        """
+        try:
+            with open(os.path.join(self._tenant_path(tenant), CURRENT)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def versions(self, tenant: str):
+        """Get the stored versions of the tenant, oldest first for the default version names
+
+        :param tenant: The tenant
+        :type tenant: str
+        :rtype: List[str]
+        """
+        path = self._tenant_path(tenant)
+        if not os.path.isdir(path):
+            return []
+        return sorted(name for name in os.listdir(path) if os.path.exists(os.path.join(path, name, MANIFEST)))
+
+    def refresh(self, tenant: str):
+        """Switch to the active version of the registry directory if another process changed it
+
+        :param tenant: The tenant
+        :type tenant: str
+        :return: True if the tenant switched version
+        :rtype: bool
+        """
+        version = self.current_version(tenant)
+        model = self._models.get(tenant, None)
+        if version is None or (model is not None and model.indexer_hash.version == version):
+            return False
+
+        with self._swap_lock:
+            self._models[tenant] = self._open(tenant, version)
+        return True
+
+    def model(self, tenant: str):
+        """Get the active classifier of the tenant, keeping it for a batch of queries pins them to one version
+
+        :param tenant: The tenant
+        :type tenant: str
+        :rtype: :class:`neurobcl.base.model.NeuroBucketClassifier`
+
+        :raises KeyError: If nothing was published for the tenant
+        """
+        model = self._models.get(tenant, None)
+        if model is not None:
+            return model
+
+        with self._swap_lock:
+            model = self._models.get(tenant, None)
+            if model is None:
+                version = self.current_version(tenant)
+                if version is None:
+                    raise KeyError(tenant)
+                model = self._models[tenant] = self._open(tenant, version)
+        return model
+
+    def get(self, tenant: str, target_key: str, target_key_bucket: int, operator: str = '<', filters: dict = {}, buckets: List[int] = [25, 25, 25, 25], debug: bool = False):
+        """Query the active classifier of the tenant, see :meth:`neurobcl.base.model.NeuroBucketClassifier.get`
+
+        :param tenant: The tenant
+        :type tenant: str
+        """
+        return self.model(tenant).get(target_key, target_key_bucket, operator, filters, buckets, debug)
+
+    def cache_stats(self):
+        """Get the counters of the shard cache
+
+        :return: The cache counters
+        :rtype: dict
+        """
+        return {"shards": self.shards.stats()}
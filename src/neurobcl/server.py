@@ -0,0 +1,441 @@
+import asyncio
+import json
+import math
+import os
+import socket
+import threading
+from typing import List
+
+import numpy as np
+
+DEFAULT_BUCKETS = [25, 25, 25, 25]
+
+# Write buffer size above which a connection waits for the client to read its answers
+_HIGH_WATER = 1 << 20
+
+def _json_value(value):
+    """Plain JSON value of a query result, NaN (no value) becomes null"""
+    value = value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def parse_request(request: dict):
+    """Check a request and get the key of the batch it can be evaluated with
+
+    :param request: The decoded request, {"op": "get", "target": ..., "bucket": ..., "operator": ..., "filters": ...,
+        "buckets": ...} or {"op": "assign", "target": ..., "value": ..., "filters": ..., "buckets": ...}
+    :type request: dict
+    :return: The batch key (op, target, buckets)
+    :rtype: tuple
+
+    :raises ValueError: If the request is malformed
+    """
+    op = request.get("op", None)
+    if op not in ("get", "assign"):
+        raise ValueError("Unknown op " + repr(op))
+    if not isinstance(request.get("target", None), str):
+        raise ValueError("A request needs a target")
+    if not isinstance(request.get("filters", {}), dict):
+        raise ValueError("Filters should be an object")
+    buckets = request.get("buckets", DEFAULT_BUCKETS)
+    if not isinstance(buckets, list) or not all(type(bucket) == int and -2**63 <= bucket < 2**63 for bucket in buckets):
+        raise ValueError("Buckets should be a list of 64 bit integers")
+    if op == "get":
+        if type(request.get("bucket", None)) != int:
+            raise ValueError("A get request needs an integer bucket")
+        if not 1 <= request["bucket"] <= len(buckets):
+            raise ValueError("Bucket out of range")
+        if request.get("operator", "<") not in ("<", ">"):
+            raise ValueError("Operator should be < or >")
+    elif "value" not in request:
+        raise ValueError("An assign request needs a value")
+    return op, request["target"], tuple(buckets)
+
+def evaluate_batch(classifier, key: tuple, requests: List[dict]):
+    """Evaluate requests sharing a batch key with a single vectorized call
+
+    :param classifier: The classifier
+    :param key: The batch key from :func:`parse_request`
+    :param requests: The requests
+    :type classifier: :class:`neurobcl.base.model.NeuroBucketClassifier`
+    :type key: tuple
+    :type requests: List[dict]
+    :return: The result of every request
+    :rtype: List
+    """
+    op, target_key, buckets = key
+    filters = [request.get("filters", {}) for request in requests]
+    if op == "get":
+        results = classifier.get_many(target_key, [request["bucket"] for request in requests], [request.get("operator", "<") for request in requests], filters, list(buckets))
+    else:
+        results = classifier.assign_buckets(target_key, [request["value"] for request in requests], filters, list(buckets))
+    return [_json_value(result) for result in results.tolist()]
+
+class QueryBatcher:
+    """Collects the requests arriving within max_delay seconds (or until max_batch are waiting) and evaluates them
+    together, one :meth:`neurobcl.base.model.NeuroBucketClassifier.get_many` or
+    :meth:`neurobcl.base.model.NeuroBucketClassifier.assign_buckets` call per (op, target, buckets). A batch that fails
+    is evaluated request by request so only the bad requests get an error. Batches are evaluated in the default executor
+    of the event loop, the classifier is shared by its threads.
+
+    :param classifier: The classifier
+    :param max_batch: Evaluate as soon as this many requests are waiting
+    :param max_delay: The longest a request waits for others, in seconds
+    :type classifier: :class:`neurobcl.base.model.NeuroBucketClassifier`
+    :type max_batch: int, optional
+    :type max_delay: float, optional
+    """
+    def __init__(self, classifier, max_batch: int = 1024, max_delay: float = 0.001):
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = []
+        self._timer = None
+        # Evaluations in flight, referenced so they are not collected before they finish
+        self._running = set()
+
+        # Counters, eg to check how well the requests are coalesced
+        self.requests = 0
+        self.batches = 0
+
+    def submit(self, request: dict):
+        """Queue a request, must be called from the event loop
+
+        :param request: The decoded request
+        :type request: dict
+        :return: The future of its result
+        :rtype: asyncio.Future
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            key = parse_request(request)
+        except ValueError as e:
+            future.set_exception(e)
+            return future
+
+        self.pending.append((key, request, future))
+        self.requests += 1
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self):
+        """Evaluate every waiting request in a worker thread so the event loop keeps serving the other connections
+        meanwhile, must be called from the event loop
+
+        :return: The evaluation, done once the futures of all the waiting requests are resolved
+        :rtype: asyncio.Future
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self.pending = self.pending, []
+
+        groups = {}
+        for key, request, future in pending:
+            groups.setdefault(key, []).append((request, future))
+        self.batches += len(groups)
+        loop = asyncio.get_running_loop()
+        evaluation = asyncio.ensure_future(self._resolve(loop.run_in_executor(None, self._evaluate, groups)))
+        self._running.add(evaluation)
+        evaluation.add_done_callback(self._running.discard)
+        return evaluation
+
+    def _evaluate(self, groups: dict):
+        """Evaluate the batches, runs in a worker thread
+
+        :return: The (future, error, result) of every request
+        :rtype: List[tuple]
+        """
+        outcomes = []
+        for key, group in groups.items():
+            try:
+                results = evaluate_batch(self.classifier, key, [request for request, _ in group])
+            except Exception:
+                # Evaluate one by one so only the bad requests get an error
+                for request, future in group:
+                    try:
+                        outcomes.append((future, None, evaluate_batch(self.classifier, key, [request])[0]))
+                    except Exception as e:
+                        outcomes.append((future, e, None))
+                continue
+            outcomes.extend((future, None, result) for (_, future), result in zip(group, results))
+        return outcomes
+
+    async def _resolve(self, evaluation):
+        """Resolve the futures from the outcomes of a worker thread, futures are only touched on the event loop"""
+        for future, error, result in await evaluation:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+class QueryServer:
+    """Answers newline delimited JSON requests over a Unix domain socket or TCP, every line is a request object with an
+    "id" that is echoed in its answer, {"id": ..., "result": ...} or {"id": ..., "error": "..."}. A client can send
+    many requests without waiting, answers may come back in any order and requests from all the connections are
+    micro-batched by a :class:`QueryBatcher`.
+
+    :param classifier: The classifier, loaded once and shared by all the connections
+    :param max_batch: Evaluate as soon as this many requests are waiting
+    :param max_delay: The longest a request waits for others, in seconds
+    :type classifier: :class:`neurobcl.base.model.NeuroBucketClassifier`
+    :type max_batch: int, optional
+    :type max_delay: float, optional
+
+    .. code-block:: python
+
+        server = QueryServer(NeuroBucketClassifier.fromBinary("model.nbcl"))
+        await server.start(path="/tmp/neurobcl.sock")
+        await server.serve_forever()
+    """
+    def __init__(self, classifier, max_batch: int = 1024, max_delay: float = 0.001):
+        self.classifier = classifier
+        self.batcher = QueryBatcher(classifier, max_batch, max_delay)
+        self.server = None
+        self.address = None
+
+    async def start(self, path: str = None, host: str = "127.0.0.1", port: int = 0):
+        """Start listening, on the Unix socket path if given else on host and port (0 picks a free port)
+
+        :param path: The Unix domain socket path
+        :param host: The TCP host
+        :param port: The TCP port
+        :type path: str, optional
+        :type host: str, optional
+        :type port: int, optional
+        :return: The address listened on, the socket path or (host, port)
+        """
+        if path is not None:
+            if os.path.exists(path):
+                os.unlink(path)
+            self.server = await asyncio.start_unix_server(self._handle, path)
+            self.address = path
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+            self.address = self.server.sockets[0].getsockname()[:2]
+        return self.address
+
+    async def serve_forever(self):
+        """Answer requests until cancelled"""
+        await self.server.serve_forever()
+
+    async def close(self):
+        """Stop listening and close the connections"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def _answer(self, writer, request_id, future):
+        """Write the answer of a request once its batch was evaluated"""
+        if writer.is_closing():
+            return
+        if future.exception() is not None:
+            answer = {"id": request_id, "error": str(future.exception())}
+        else:
+            answer = {"id": request_id, "result": future.result()}
+        writer.write(json.dumps(answer).encode("utf-8") + b"\n")
+
+    async def _handle(self, reader, writer):
+        # Request id of every future of this connection not answered yet
+        unanswered = {}
+
+        def answer(future):
+            if future in unanswered:
+                self._answer(writer, unanswered.pop(future), future)
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("A request should be an object")
+                except ValueError as e:
+                    writer.write(json.dumps({"id": None, "error": str(e)}).encode("utf-8") + b"\n")
+                    continue
+
+                future = self.batcher.submit(request)
+                unanswered[future] = request.get("id", None)
+                future.add_done_callback(answer)
+                if writer.transport.get_write_buffer_size() > _HIGH_WATER:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # A client that half closed its side still reads the answers of its last requests
+            if self.batcher.pending:
+                self.batcher.flush()
+            if unanswered:
+                await asyncio.gather(*unanswered, return_exceptions=True)
+                for future in list(unanswered):
+                    answer(future)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+
+class QueryClient:
+    """Blocking client of a :class:`QueryServer`, connections are pooled and reused so a web worker can share it
+    between its threads. A batch call sends all its requests on one connection before reading the answers, so they
+    are evaluated together by the server.
+
+    :param path: The Unix domain socket path
+    :param host: The TCP host, used when there is no path
+    :param port: The TCP port
+    :param pool_size: The maximum number of open connections
+    :param timeout: The socket timeout in seconds, None to wait forever
+    :type path: str, optional
+    :type host: str, optional
+    :type port: int, optional
+    :type pool_size: int, optional
+    :type timeout: float, optional
+
+    .. code-block:: python
+
+        with QueryClient(path="/tmp/neurobcl.sock") as client:
+            client.get("listPrice", 1, '<', {"company": "NIKE"})
+            client.assign_buckets("listPrice", [120, 300])
+    """
+    def __init__(self, path: str = None, host: str = "127.0.0.1", port: int = None, pool_size: int = 8, timeout: float = None):
+        if path is None and port is None:
+            raise ValueError("A socket path or a port is needed")
+        self.path = path
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._next_id = 0
+
+    def _connect(self):
+        if self.path is not None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = self.path
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            address = (self.host, self.port)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        return sock, sock.makefile("rb")
+
+    def request(self, requests: List[dict]):
+        """Send requests on one pooled connection and wait for all their answers
+
+        :param requests: The request objects, their ids are assigned here
+        :type requests: List[dict]
+        :return: The answer of every request, in request order
+        :rtype: List[dict]
+        """
+        with self._lock:
+            first = self._next_id
+            self._next_id += len(requests)
+        payload = b"".join(json.dumps(dict(request, id=first + i)).encode("utf-8") + b"\n" for i, request in enumerate(requests))
+
+        self._slots.acquire()
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = self._connect()
+            sock, stream = connection
+
+            try:
+                sock.sendall(payload)
+                answers = [None] * len(requests)
+                for _ in range(len(requests)):
+                    line = stream.readline()
+                    if not line:
+                        raise ConnectionError("Server closed the connection")
+                    answer = json.loads(line)
+                    answers[answer["id"] - first] = answer
+            except BaseException:
+                # A connection in an unknown state is never reused
+                stream.close()
+                sock.close()
+                raise
+
+            with self._lock:
+                self._idle.append(connection)
+            return answers
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _results(answers):
+        for answer in answers:
+            if "error" in answer:
+                raise ValueError(answer["error"])
+        return [answer["result"] for answer in answers]
+
+    def get(self, target_key: str, target_key_bucket: int, operator: str = '<', filters: dict = {}, buckets: List[int] = DEFAULT_BUCKETS):
+        """Remote :meth:`neurobcl.base.model.NeuroBucketClassifier.get`, answered like get_many so the value is a float
+
+        :return: The value, None where the percentile list has no value
+        """
+        return self._results(self.request([{"op": "get", "target": target_key, "bucket": target_key_bucket, "operator": operator, "filters": filters, "buckets": buckets}]))[0]
+
+    def get_many(self, target_key: str, target_key_buckets, operators = '<', filters = None, buckets: List[int] = DEFAULT_BUCKETS):
+        """Remote :meth:`neurobcl.base.model.NeuroBucketClassifier.get_many` for a single target key
+
+        :return: The value of every query, None where the percentile list has no value
+        :rtype: List
+        """
+        n = len(target_key_buckets)
+        operators = [operators] * n if isinstance(operators, str) else operators
+        filters = [filters or {}] * n if filters is None or isinstance(filters, dict) else filters
+        if len(operators) != n or len(filters) != n:
+            raise ValueError("All per query arguments should have the same length")
+        return self._results(self.request([
+            {"op": "get", "target": target_key, "bucket": int(bucket), "operator": operator, "filters": f, "buckets": buckets}
+            for bucket, operator, f in zip(target_key_buckets, operators, filters)
+        ]))
+
+    def assign_buckets(self, target_key: str, values, filters = None, buckets: List[int] = DEFAULT_BUCKETS):
+        """Remote :meth:`neurobcl.base.model.NeuroBucketClassifier.assign_buckets`
+
+        :return: The bucket of every value, 0 for a missing value or a filter without data
+        :rtype: List[int]
+        """
+        filters = [filters or {}] * len(values) if filters is None or isinstance(filters, dict) else filters
+        if len(filters) != len(values):
+            raise ValueError("There should be one filters dict per value")
+        return self._results(self.request([
+            {"op": "assign", "target": target_key, "value": _json_value(value), "filters": f, "buckets": buckets}
+            for value, f in zip(values, filters)
+        ]))
+
+    def close(self):
+        """Close the idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock, stream in idle:
+            stream.close()
+            sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,392 @@
+import time
+from itertools import combinations, product
+
+import numpy as np
+
+from neurobcl.base import cdf
+from neurobcl.base.model import NeuroBucketTrainer, order_invariant
+from neurobcl.base.columns import ColumnStore, ColumnStoreBuilder
+from neurobcl.base.inverted_index import InvertedIndex
+
+INDEX_MODES = ["groupby", "recursive"]
+
+class _Groups:
+    """Rows grouped by the value combination of a set of keyword features, a row holding several values of a list
+    valued feature appears once per combination
+
+    :param rows: The row of every (row, group) pair
+    :param group: The dense group id of every pair
+    :param codes: The value codes of every group, one column per keyword feature
+    """
+    def __init__(self, rows: np.ndarray, group: np.ndarray, codes: np.ndarray):
+        self.rows = rows
+        self.group = group
+        self.codes = codes
+
+    @classmethod
+    def root(cls, n_rows: int):
+        """All the rows in a single group (no filters)"""
+        return cls(np.arange(n_rows, dtype=np.int64), np.zeros(n_rows, dtype=np.int64), np.zeros((1, 0), dtype=np.int64))
+
+    def join(self, column, n_rows: int):
+        """Split every group further by the values of another keyword column
+
+        :param column: The keyword column to group by
+        :param n_rows: The total number of rows
+        :type column: :class:`neurobcl.base.columns.KeywordColumn`
+        :type n_rows: int
+        :return: The finer groups
+        :rtype: :class:`_Groups`
+        """
+        if column.rows is None:
+            rows = self.rows
+            group = self.group
+            codes = column.codes[rows]
+        else:
+            # Every pair is repeated once per value its row holds
+            counts, _ = column.row_offsets(n_rows)
+            group = np.repeat(self.group, counts[self.rows])
+            rows, codes = column.codes_for_rows(self.rows, n_rows)
+
+        # Re-number the groups densely so the combined key never overflows
+        cardinality = max(len(column.values), 1)
+        combined, group = np.unique(group * cardinality + codes, return_inverse=True)
+        group_codes = np.column_stack([self.codes[combined // cardinality], combined % cardinality])
+        return _Groups(rows, group.reshape(-1), group_codes)
+
+    def counts(self):
+        """Number of rows in every group"""
+        return np.bincount(self.group, minlength=len(self.codes))
+
+    def prune(self, min_support: int):
+        """Drop the groups with fewer rows than the minimum support
+
+        :param min_support: The minimum number of rows of a group
+        :type min_support: int
+        :return: The remaining groups
+        :rtype: :class:`_Groups`
+        """
+        keep_group = self.counts() >= min_support
+        if keep_group.all():
+            return self
+
+        new_id = np.cumsum(keep_group) - 1
+        keep = keep_group[self.group]
+        return _Groups(self.rows[keep], new_id[self.group[keep]], self.codes[keep_group])
+
+class ColumnarBucketTrainer(NeuroBucketTrainer):
+    """Train using NumPy column arrays instead of a list of dictionaries, keyword values are dictionary encoded to
+    integer codes and bucket features are stored as typed arrays. Filtering and rank lookups are vectorized, the
+    resulting classifier is identical to the one from :class:`neurobcl.trainers.dictionary_trainer.DictionaryBucketTrainer`
+
+    :param dict_data: The data to train on, either a list of dictionaries or a prebuilt column store
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the filters
+    :param min_support: The minimum number of items for a filter combination to be indexed
+    :param index_mode: "groupby" computes every filter combination of a depth in a single sort and group-by pass,
+        "recursive" walks the combinations one by one like the base trainer
+    :type dict_data: List[Dict] or :class:`neurobcl.base.columns.ColumnStore`
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+    :type index_mode: str, optional
+
+    .. note:: Integer bucket features stay integers, a feature mixing integers and floats is stored as floats
+    """
+    def __init__(self, dict_data, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1, index_mode="groupby"):
+        NeuroBucketTrainer.__init__(self, quantile_gap, max_depth, min_support)
+
+        if index_mode not in INDEX_MODES:
+            raise ValueError("Index mode should be one of " + ", ".join(INDEX_MODES))
+        self.index_mode = index_mode
+
+        if isinstance(dict_data, ColumnStore):
+            self.store = dict_data
+        else:
+            builder = ColumnStoreBuilder(keyword_feats_name, bucket_feats_name)
+            builder.extend(dict_data)
+            self.store = builder.build()
+
+        self.keyword_feats = list(keyword_feats_name)
+        self.bucket_feats = list(bucket_feats_name)
+        self.keywords = {key: self.store.keywords[key].values for key in self.keyword_feats}
+
+        # Sort every bucket feature once, a stable sort keeps the same order as python's sorted
+        self._order = {}
+        self._sorted = {}
+        self._rank = {}
+        self._n_valid = {}
+        for key in self.bucket_feats:
+            values = self.store.buckets[key]
+            missing = self.store.missing.get(key, None)
+            if missing is None:
+                self._order[key] = np.argsort(values, kind='stable')
+                self._n_valid[key] = len(values)
+            else:
+                # Missing values are ranked last and left out of the percentiles of this feature
+                self._order[key] = np.lexsort((values, missing))
+                self._n_valid[key] = len(values) - int(np.count_nonzero(missing))
+            self._sorted[key] = values[self._order[key]]
+
+            # Position of every row in the sorted order
+            self._rank[key] = np.empty(len(values), dtype=np.int64)
+            self._rank[key][self._order[key]] = np.arange(len(values))
+
+        # Keyword filters are answered from an inverted index, leaf computations ask for the same filters repeatedly
+        self.inverted_index = InvertedIndex(self.store)
+        self._last_filters = None
+        self._last_rows = None
+
+    def _rows(self, filters: dict):
+        """Sorted row ids matching the filters, None if there are no filters"""
+        if len(filters) == 0:
+            return None
+
+        filters_key = tuple(sorted(filters.items()))
+        if filters_key != self._last_filters:
+            self._last_rows = self.inverted_index.lookup(filters)
+            self._last_filters = filters_key
+        return self._last_rows
+
+    def _selected_sorted(self, target_feature: str, filters: dict):
+        """Sorted values of the target feature for the rows matching the filters, costs the size of the result"""
+        rows = self._rows(filters)
+        n_valid = self._n_valid[target_feature]
+        if rows is None:
+            return self._sorted[target_feature][:n_valid]
+
+        ranks = np.sort(self._rank[target_feature][rows])
+        if n_valid < self.store.n_rows:
+            ranks = ranks[:np.searchsorted(ranks, n_valid)]
+        return self._sorted[target_feature][ranks]
+
+    def total_items(self, filters = {}):
+        rows = self._rows(filters)
+        if rows is None:
+            return self.store.n_rows
+        return len(rows)
+
+    def get_at(self, target_feature, rank, filters = {}):
+        """Get the value of the target_feature at the given rank
+
+        :param target_feature: The feature to get the value from
+        :param rank: The rank of the value to get
+        :param filters: The filters to apply to the data
+        :type target_feature: str
+        :type rank: int
+        :type filters: dict
+        :return: The value of the target_feature at the given rank
+        :rtype: int"""
+        selected = self._selected_sorted(target_feature, filters)
+        if len(selected) == 0:
+            return None
+        return selected[rank].item()
+
+    def _percentile_list(self, bucket_feat_name, current_filters):
+        selected = self._selected_sorted(bucket_feat_name, current_filters)
+        total = len(selected)
+        if total == 0:
+            return [None] * (int(100 / self.quantile_gap) + 1)
+
+        ranks = np.minimum(np.arange(0, 101, self.quantile_gap) * total // 100, total - 1)
+        return selected[ranks].tolist()
+
+    def _quantile_values(self, bucket_feat_name, current_filters, steps):
+        selected = self._selected_sorted(bucket_feat_name, current_filters)
+        total = len(selected)
+        if total == 0:
+            return None
+        return selected[np.minimum(np.arange(steps + 1) * total // steps, total - 1)].tolist()
+
+    def _observed_values(self, key, current_filters):
+        """Count the values of the keyword feature for the filtered rows with a single bincount"""
+        column = self.store.keywords[key]
+        codes = column.codes
+        rows = self._rows(current_filters)
+        if rows is not None:
+            _, codes = column.codes_for_rows(rows, self.store.n_rows)
+
+        counts = np.bincount(codes, minlength=len(column.values))
+        return {column.values[code]: int(counts[code]) for code in np.flatnonzero(counts)}
+
+    def get_non_bucket_features(self):
+        """Get the non-bucket features of the data"""
+        return self.keywords
+
+    def cache_stats(self):
+        """Get the bytes held by the column store, the inverted index and the per feature sort orders
+
+        :return: The bytes of every structure
+        :rtype: dict
+        """
+        return {
+            "store_bytes": self.store.nbytes,
+            "inverted_index_bytes": self.inverted_index.nbytes,
+            "sort_bytes": sum(self._order[key].nbytes + self._sorted[key].nbytes + self._rank[key].nbytes for key in self.bucket_feats),
+        }
+
+    def get_bucket_features(self):
+        """Get the bucket features of the data"""
+        return self.bucket_feats
+
+    def _group_percentile_lists(self, bucket_feat_name: str, all_groups):
+        """Compute the percentile list (or the CDF knots) of every group of all the given combinations in one pass, the
+        groups are numbered across the combinations, pairs are sorted once on (group, rank) and the quantile ranks are
+        found with offset arithmetic on the group boundaries
+
+        :param all_groups: The groups of every combination, eg all the combinations of a depth
+        :type all_groups: List[_Groups]
+        :return: One percentile list per group, per combination
+        :rtype: List[List[List]]
+        """
+        group_offsets = np.cumsum([0] + [len(groups.codes) for groups in all_groups])
+        n_groups = int(group_offsets[-1])
+        empty_list = [None] * (int(100 / self.quantile_gap) + 1) if self.cdf is None else []
+
+        rank = np.concatenate([self._rank[bucket_feat_name][groups.rows] for groups in all_groups] + [np.zeros(0, dtype=np.int64)])
+        group = np.concatenate([groups.group + offset for groups, offset in zip(all_groups, group_offsets.tolist())] + [np.zeros(0, dtype=np.int64)])
+        n_valid = self._n_valid[bucket_feat_name]
+        if n_valid < self.store.n_rows:
+            valid = rank < n_valid
+            rank = rank[valid]
+            group = group[valid]
+
+        if len(rank) == 0:
+            # The root of an empty store, or a feature missing from every row
+            percentile_lists = [list(empty_list) for _ in range(n_groups)]
+        else:
+            percentile_lists = self._sorted_group_lists(bucket_feat_name, rank, group, n_groups, empty_list)
+        return [percentile_lists[begin:end] for begin, end in zip(group_offsets[:-1].tolist(), group_offsets[1:].tolist())]
+
+    def _sorted_group_lists(self, bucket_feat_name: str, rank: np.ndarray, group: np.ndarray, n_groups: int, empty_list: list):
+        """The percentile lists of the groups of (rank, group) pairs, see :meth:`_group_percentile_lists`"""
+        order = np.lexsort((rank, group))
+        sorted_rank = rank[order]
+
+        counts = np.bincount(group, minlength=n_groups)
+        starts = np.cumsum(counts) - counts
+
+        # The grid is the value at every multiple of the quantile gap, the same rank rule with steps of quantile_gap%
+        steps = int(100 / self.quantile_gap) if self.cdf is None else self.cdf["steps"]
+        step_range = np.arange(steps + 1)
+
+        def group_values(begin, end):
+            offsets = np.minimum(step_range[None, :] * counts[begin:end, None] // steps, counts[begin:end, None] - 1)
+            positions = np.clip(starts[begin:end, None] + offsets, 0, len(sorted_rank) - 1)
+            return self._sorted[bucket_feat_name][sorted_rank[positions]].tolist()
+
+        if self.cdf is None:
+            percentile_lists = group_values(0, n_groups)
+        else:
+            # The fine grid of a few groups at a time, each is compressed right away
+            percentiles = step_range * 100 / steps
+            percentile_lists = []
+            for begin in range(0, n_groups, 1024):
+                for values in group_values(begin, min(begin + 1024, n_groups)):
+                    percentile_lists.append(cdf.compress(percentiles, values, self.cdf["max_knots"], self.cdf["max_error"]))
+
+        # Groups whose rows all miss the feature
+        for empty in np.flatnonzero(counts == 0).tolist():
+            percentile_lists[empty] = list(empty_list)
+        return percentile_lists
+
+    def _index_groups(self, indexed):
+        """Index every value combination of the given keyword feature combinations (all of one depth) for all the
+        bucket features, the groups of all the combinations are sorted together once per bucket feature
+
+        :param indexed: The (keyword feature names, groups) of every combination
+        :type indexed: List[tuple]
+        :return: The percentile lists keyed like the indexer hash, per combination and bucket feature
+        :rtype: Dict[tuple, Dict[str, Dict[str, List]]]
+        """
+        empty_list = [None] * (int(100 / self.quantile_gap) + 1) if self.cdf is None else []
+
+        result = {feature_names: {} for feature_names, _ in indexed}
+        for bucket_feat_name in self.bucket_feats:
+            start = time.perf_counter() if self.stats is not None else None
+            all_percentile_lists = self._group_percentile_lists(bucket_feat_name, [groups for _, groups in indexed])
+            for (feature_names, groups), percentile_lists in zip(indexed, all_percentile_lists):
+                values = [self.store.keywords[key].values for key in feature_names]
+                lists = result[feature_names][bucket_feat_name] = {}
+                seen = set()
+                for group_codes, percentile_list in zip(groups.codes.tolist(), percentile_lists):
+                    seen.add(tuple(group_codes))
+                    filters = {key: values[i][code] for i, (key, code) in enumerate(zip(feature_names, group_codes))}
+                    lists[order_invariant(bucket_feat_name, filters)] = percentile_list
+
+                if self.min_support == 0:
+                    # Combinations that never occur are indexed empty when asked for every combination
+                    for group_codes in product(*[range(len(v)) for v in values]):
+                        if group_codes in seen:
+                            continue
+                        filters = {key: values[i][code] for i, (key, code) in enumerate(zip(feature_names, group_codes))}
+                        lists[order_invariant(bucket_feat_name, filters)] = list(empty_list)
+
+            if start is not None and len(indexed) > 0:
+                lists = [percentile_list for feature_names, _ in indexed for percentile_list in result[feature_names][bucket_feat_name].values()]
+                self.stats.record_combinations(bucket_feat_name, len(indexed[0][0]), time.perf_counter() - start, len(lists), sum(1 for percentile_list in lists if len(percentile_list) == 0 or percentile_list[0] is None))
+        return result
+
+    def _index_tasks(self):
+        """In "groupby" mode there is one task for the root and one per leading keyword feature, a task indexes every
+        feature combination starting with its feature"""
+        if self.index_mode == "recursive":
+            return NeuroBucketTrainer._index_tasks(self)
+
+        # Same depths as the recursive walk, which stops once all the keyword features are used
+        depths = set(min(depth, len(self.keyword_feats)) for depth in range(self.max_depth))
+
+        tasks = []
+        if 0 in depths:
+            tasks.append(())
+        if max(depths, default=0) > 0:
+            tasks.extend((key,) for key in self.keyword_feats)
+        return tasks
+
+    def _run_index_task(self, task):
+        if self.index_mode == "recursive":
+            return NeuroBucketTrainer._run_index_task(self, task)
+
+        root = _Groups.root(self.store.n_rows)
+        if len(task) == 0:
+            return self._index_groups([((), root)])
+
+        depths = set(min(depth, len(self.keyword_feats)) for depth in range(self.max_depth))
+        start = self.keyword_feats.index(task[0])
+
+        # Groups of a depth are derived from the groups of their prefix at the previous depth
+        results = {}
+        previous = {(): root}
+        for depth in range(1, max(depths) + 1):
+            current = {}
+            for rest in combinations(self.keyword_feats[start + 1:], depth - 1):
+                feature_names = task + rest
+                join_start = time.perf_counter() if self.stats is not None else None
+                groups = previous[feature_names[:-1]].join(self.store.keywords[feature_names[-1]], self.store.n_rows)
+                # Groups below the support are dropped before they are split any further
+                current[feature_names] = groups.prune(self.min_support) if self.min_support > 0 else groups
+                if join_start is not None:
+                    self.stats.record_filter_search(depth, time.perf_counter() - join_start)
+            if depth in depths:
+                # All the combinations of the depth are sorted together
+                results.update(self._index_groups(list(current.items())))
+            previous = current
+        return results
+
+    def _merge_index_results(self, results):
+        if self.index_mode == "recursive":
+            return NeuroBucketTrainer._merge_index_results(self, results)
+
+        merged = {}
+        for result in results:
+            merged.update(result)
+
+        # Bucket feature first, then depth and combination order, the same layout as the recursive walk
+        ordered = sorted(merged, key=lambda feature_names: (len(feature_names), [self.keyword_feats.index(key) for key in feature_names]))
+        for bucket_feat_name in self.bucket_feats:
+            for feature_names in ordered:
+                self.indexer_hash.update(merged[feature_names][bucket_feat_name])
@@ -1,20 +1,22 @@
 import json
-from functools import cache
 
+import numpy as np
+
+from neurobcl.base.cache import LRUCache
+from neurobcl.base.columns import ColumnStoreBuilder, is_missing
+from neurobcl.base.inverted_index import InvertedIndex
 from neurobcl.base.model import NeuroBucketTrainer
 from neurobcl.base.model import NeuroBucketClassifier
 
-def _filter_invariant(item, filter_value):
-    if type(item) == list:
-        return filter_value in item
-    else:
-        return item == filter_value
 class DictionaryBucketTrainer(NeuroBucketTrainer):
     """Train using dictionary/json data, the format of the data should be a list of dictionaries where each dictionary
     represents a single item and the keys of the dictionary represent the features of the item. (Should be uniform)
+
+    Filtered subsets are kept as integer row id arrays in a cache bounded by cache_bytes (64 MiB by default), see
+    :meth:`cache_stats` for its hit, miss and byte counters.
     """
-    def __init__(self, dict_data, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2):
-        NeuroBucketTrainer.__init__(self, quantile_gap, max_depth)
+    def __init__(self, dict_data, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1, cache_bytes=64 * 2**20):
+        NeuroBucketTrainer.__init__(self, quantile_gap, max_depth, min_support)
 
         self.data = dict_data
         # Iterate over the data and create a list of unique values for each feature
@@ -23,22 +25,24 @@ class DictionaryBucketTrainer(NeuroBucketTrainer):
         self.keywords = {}
         self.buckets = {}
 
-        def set_add_item(s, item):
+        def add_item(values, item):
+            # Dicts keep the first seen order, unlike sets whose order depends on the string hash seed
             if type(item) == list: # List add
                 for i in item:
-                    s.add(i)
+                    values[i] = None
             else:
-                s.add(item)
+                values[item] = None
 
         for item in self.data:
             for key in self.keyword_feats:
                 if key not in self.keywords:
-                    self.keywords[key] = set()
-                set_add_item(self.keywords[key], item[key])
+                    self.keywords[key] = {}
+                add_item(self.keywords[key], item[key])
             for key in self.bucket_feats:
                 if key not in self.buckets:
-                    self.buckets[key] = set()
-                set_add_item(self.buckets[key], item[key])
+                    self.buckets[key] = {}
+                if not is_missing(item[key]):
+                    add_item(self.buckets[key], item[key])
 
         # Convert to list (making it easy serializable)
         for key in self.keywords:
@@ -47,24 +51,64 @@ class DictionaryBucketTrainer(NeuroBucketTrainer):
         for key in self.buckets:
             self.buckets[key] = list(self.buckets[key])
 
-    @cache
-    def _get_filtered_data(self, filters: str = "{}"):
-        """Filter the data based on the given filters, cache the result to avoid recomputation."""
-        filters = json.loads(filters)
+        # Inverted index from every keyword value to its rows, list valued features post a row under each value
+        builder = ColumnStoreBuilder(self.keyword_feats, [])
+        builder.extend(self.data)
+        self.inverted_index = InvertedIndex(builder.build())
+
+        # Filtered subsets are row id arrays over self.data, held in a cache with a byte budget
+        self._row_dtype = np.int32 if len(self.data) < 2**31 else np.int64
+        self._all_rows = np.arange(len(self.data), dtype=self._row_dtype)
+        self.filter_cache = LRUCache(maxsize=None, max_bytes=cache_bytes)
+
+        # Sort order of every bucket feature (stable, like sorted) and the position of every row in it. Missing values
+        # are ranked last and left out of the percentiles of this feature.
+        self._order = {}
+        self._rank = {}
+        self._n_valid = {}
+        for key in self.bucket_feats:
+            valid = [i for i, item in enumerate(self.data) if not is_missing(item[key])]
+            missing = [i for i, item in enumerate(self.data) if is_missing(item[key])]
+            self._order[key] = np.array(sorted(valid, key=lambda i: self.data[i][key]) + missing, dtype=self._row_dtype)
+            self._n_valid[key] = len(valid)
+            self._rank[key] = np.empty(len(self.data), dtype=self._row_dtype)
+            self._rank[key][self._order[key]] = self._all_rows
+
+    def _filtered_rows(self, filters: dict):
+        """Row ids of the items matching the filters as a compact integer array, kept in the bounded filter cache.
+        Views are intersected from the inverted index, so a miss costs the size of the rarest filter value."""
+        if len(filters) == 0:
+            return self._all_rows
+
+        cache_key = json.dumps(filters, sort_keys=True)
+        rows = self.filter_cache.get(cache_key, None)
+        if rows is not None:
+            return rows
+
+        rows = self.inverted_index.lookup(filters).astype(self._row_dtype)
+        self.filter_cache.put(cache_key, rows)
+        return rows
 
-        filtered_data = self.data
-        for key in filters:
-            filtered_data = [item for item in filtered_data if _filter_invariant(item[key], filters[key])]
-        return filtered_data
+    def _sorted_ranks(self, target_feature: str, filters: dict):
+        """Positions in the target_feature sort order of the items matching the filters that have a value, sorted"""
+        n_valid = self._n_valid[target_feature]
+        if len(filters) == 0:
+            return self._all_rows[:n_valid]
+        ranks = np.sort(self._rank[target_feature][self._filtered_rows(filters)])
+        return ranks[:np.searchsorted(ranks, n_valid)]
 
-    @cache
-    def _sort_data(self, target_feature: str):
-        """Sort the data based on the given target_feature, cache the result to avoid recomputation."""
-        return sorted(self.data, key=lambda k: k[target_feature])
+    def _observed_values(self, key, current_filters):
+        """Count the values of the keyword feature in a single scan of the filtered data"""
+        counts = {}
+        for row in self._filtered_rows(current_filters).tolist():
+            item = self.data[row]
+            values = item[key] if type(item[key]) == list else [item[key]]
+            for value in dict.fromkeys(values):
+                counts[value] = counts.get(value, 0) + 1
+        return counts
 
     def total_items(self, filters = {}):
-        filtered_data = self._get_filtered_data(json.dumps(filters, sort_keys=True))
-        return len(filtered_data)
+        return len(self._filtered_rows(filters))
     
     def get_at(self, target_feature, rank, filters = {}):
         """Get the value of the target_feature at the given rank, Use cache precomputations at sorting
@@ -77,17 +121,43 @@ class DictionaryBucketTrainer(NeuroBucketTrainer):
         :type filters: dict
         :return: The value of the target_feature at the given rank
         :rtype: int"""
-        # First sort the data
-        sorted_data = self._sort_data(target_feature)
-    
-        filtered_data = sorted_data
-        for key in filters:
-            filtered_data = [item for item in filtered_data if _filter_invariant(item[key], filters[key])]
+        ranks = self._rank[target_feature][self._filtered_rows(filters)]
+        ranks = ranks[ranks < self._n_valid[target_feature]]
+        if len(ranks) == 0:
+            return None
 
-        if len(filtered_data) == 0:
+        # Only the rank-th smallest position is needed, no full sort of the filtered rows
+        position = np.partition(ranks, rank)[rank]
+        return self.data[int(self._order[target_feature][position])][target_feature]
+
+    def _quantile_values(self, bucket_feat_name, current_filters, steps):
+        ranks = self._sorted_ranks(bucket_feat_name, current_filters)
+        total = len(ranks)
+        if total == 0:
             return None
 
-        return filtered_data[rank][target_feature]
+        order = self._order[bucket_feat_name]
+        return [self.data[int(order[ranks[min(step * total // steps, total - 1)]])][bucket_feat_name] for step in range(steps + 1)]
+
+    def _percentile_list(self, bucket_feat_name, current_filters):
+        ranks = self._sorted_ranks(bucket_feat_name, current_filters)
+        total = len(ranks)
+        if total == 0:
+            return [None] * (int(100 / self.quantile_gap) + 1)
+
+        order = self._order[bucket_feat_name]
+        return [self.data[int(order[ranks[min(percentile * total // 100, total - 1)]])][bucket_feat_name] for percentile in range(0, 101, self.quantile_gap)]
+
+    def cache_stats(self):
+        """Get the counters of the filtered view cache, plus the bytes held by the per feature sort orders
+
+        :return: The filter_cache counters (entries, bytes, hits, misses and evictions) and the sort_bytes size
+        :rtype: dict
+        """
+        return {
+            "filter_cache": self.filter_cache.stats(),
+            "sort_bytes": sum(order.nbytes + self._rank[key].nbytes for key, order in self._order.items()),
+        }
     
     def get_non_bucket_features(self):
         """Get the non-bucket features of the data"""
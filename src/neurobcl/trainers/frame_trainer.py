@@ -0,0 +1,209 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+from neurobcl.base.columns import ColumnStore, ColumnStoreBuilder, KeywordColumn, is_missing
+from neurobcl.trainers.columnar_trainer import ColumnarBucketTrainer
+
+def _keyword_from_codes(name: str, codes: np.ndarray, values: list, rows: np.ndarray = None):
+    """Build a keyword column from dictionary codes, negative codes are missing values and get no posting. Values
+    that are never used (eg unused categories) are dropped so the column matches what the records would give."""
+    codes = np.asarray(codes).astype(np.int64, copy=False)
+    valid = codes >= 0
+    if not valid.all():
+        rows = np.flatnonzero(valid) if rows is None else rows[valid]
+        codes = codes[valid]
+
+    used = np.bincount(codes, minlength=len(values)) > 0
+    if not used.all():
+        codes = (np.cumsum(used) - 1)[codes]
+        values = [value for value, is_used in zip(values, used.tolist()) if is_used]
+    return KeywordColumn(name, list(values), codes.astype(np.int32), rows)
+
+def _keyword_from_objects(name: str, objects):
+    """Encode a column of python objects one row at a time, needed for list valued cells. None and NaN are missing."""
+    builder = ColumnStoreBuilder([name], [])
+    for value in objects:
+        builder.append({name: [] if is_missing(value) else value})
+    return builder.build().keywords[name]
+
+def _keyword_from_array(name: str, array: np.ndarray):
+    """Encode a NumPy column, NaN is missing"""
+    array = np.asarray(array)
+    if array.dtype.kind == 'O':
+        return _keyword_from_objects(name, array)
+
+    values, codes = np.unique(array, return_inverse=True)
+    codes = codes.reshape(-1)
+    if array.dtype.kind == 'f':
+        codes[np.isnan(array)] = -1
+    return _keyword_from_codes(name, codes, values.tolist())
+
+def _bucket_from_array(name: str, array: np.ndarray, missing: np.ndarray = None):
+    """Integer columns are kept as int64 and the others as float64, NaN is missing
+
+    :return: The values and the missing mask, None if no value is missing
+    :rtype: Tuple[numpy.ndarray, numpy.ndarray]
+    """
+    array = np.asarray(array)
+    if array.dtype.kind in 'biu':
+        array = array.astype(np.int64, copy=False)
+    elif array.dtype.kind == 'f':
+        array = array.astype(np.float64, copy=False)
+        nan = np.isnan(array)
+        missing = nan if missing is None else missing | nan
+    else:
+        raise TypeError("Bucket feature " + name + " should be numeric, got " + str(array.dtype))
+
+    if missing is not None and not missing.any():
+        missing = None
+    return array, missing
+
+def _pandas_keyword(name: str, series):
+    import pandas as pd
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return _keyword_from_codes(name, series.cat.codes.to_numpy(), series.cat.categories.tolist())
+    try:
+        codes, values = pd.factorize(series)
+    except TypeError:
+        # Unhashable cells, ie list valued features
+        return _keyword_from_objects(name, series.to_numpy(dtype=object))
+    return _keyword_from_codes(name, codes, values.tolist())
+
+def _pandas_bucket(name: str, series):
+    import pandas as pd
+
+    missing = series.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_integer_dtype(series.dtype):
+        array = series.to_numpy(dtype=np.int64, na_value=0)
+    elif pd.api.types.is_float_dtype(series.dtype):
+        array = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        raise TypeError("Bucket feature " + name + " should be numeric, got " + str(series.dtype))
+    return _bucket_from_array(name, array, missing)
+
+def _arrow_keyword(name: str, column, n_rows: int):
+    import pyarrow as pa
+
+    if isinstance(column, pa.ChunkedArray):
+        if pa.types.is_dictionary(column.type):
+            column = column.unify_dictionaries()
+        column = column.combine_chunks()
+
+    if pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+        # Rows come straight from the list offsets, null lists have no values
+        offsets = column.offsets.to_numpy()
+        offsets = offsets - offsets[0]
+        rows = np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(offsets))
+        inner = _arrow_keyword(name, column.flatten(), len(rows))
+
+        # Values missing inside a list or repeated in the same row are dropped
+        cardinality = max(len(inner.values), 1)
+        pairs = np.unique(rows[inner.posting_rows()] * cardinality + inner.codes)
+        return KeywordColumn(name, inner.values, (pairs % cardinality).astype(np.int32), pairs // cardinality)
+
+    if not pa.types.is_dictionary(column.type):
+        column = column.dictionary_encode()
+    codes = column.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+    return _keyword_from_codes(name, codes, column.dictionary.to_pylist())
+
+def _arrow_bucket(name: str, column):
+    import pyarrow as pa
+
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+
+    missing = column.is_null().to_numpy(zero_copy_only=False)
+    if pa.types.is_boolean(column.type) or pa.types.is_integer(column.type):
+        array = column.cast(pa.int64()).fill_null(0).to_numpy()
+    elif pa.types.is_floating(column.type):
+        array = column.cast(pa.float64()).to_numpy(zero_copy_only=False)
+    else:
+        raise TypeError("Bucket feature " + name + " should be numeric, got " + str(column.type))
+    return _bucket_from_array(name, array, missing)
+
+def _frame_kind(frame):
+    if hasattr(frame, "column_names") and hasattr(frame, "schema"):
+        return "arrow"
+    if hasattr(frame, "columns") and hasattr(frame, "iloc"):
+        return "pandas"
+    if (isinstance(frame, np.ndarray) and frame.dtype.names is not None) or isinstance(frame, Mapping):
+        return "numpy"
+    raise TypeError("Expected a pandas DataFrame, an Arrow table, a NumPy structured array or a mapping of arrays")
+
+def store_from_frame(frame, keyword_feats_name, bucket_feats_name):
+    """Build a column store straight from column buffers, numeric columns are used without copying where possible
+    and categorical columns keep their codes. Missing keyword values (None, NaN, null) give the row no value for that
+    feature, like an empty list, and missing bucket values are left out of the percentiles of that feature only.
+
+    :param frame: A pandas DataFrame, an Arrow table or record batch, a NumPy structured array or a mapping from the
+        feature names to NumPy arrays
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :return: The column store
+    :rtype: :class:`neurobcl.base.columns.ColumnStore`
+    """
+    kind = _frame_kind(frame)
+    if kind == "arrow":
+        n_rows = frame.num_rows
+    elif isinstance(frame, Mapping):
+        lengths = set(len(frame[key]) for key in list(keyword_feats_name) + list(bucket_feats_name))
+        if len(lengths) > 1:
+            raise ValueError("All the columns should have the same length")
+        n_rows = lengths.pop() if lengths else 0
+    else:
+        n_rows = len(frame)
+
+    keywords = {}
+    for key in keyword_feats_name:
+        if kind == "arrow":
+            keywords[key] = _arrow_keyword(key, frame.column(key), n_rows)
+        elif kind == "pandas":
+            keywords[key] = _pandas_keyword(key, frame[key])
+        else:
+            keywords[key] = _keyword_from_array(key, frame[key])
+
+    buckets = {}
+    missing = {}
+    for key in bucket_feats_name:
+        if kind == "arrow":
+            buckets[key], key_missing = _arrow_bucket(key, frame.column(key))
+        elif kind == "pandas":
+            buckets[key], key_missing = _pandas_bucket(key, frame[key])
+        else:
+            buckets[key], key_missing = _bucket_from_array(key, frame[key])
+        if key_missing is not None:
+            missing[key] = key_missing
+
+    return ColumnStore(n_rows, keywords, buckets, missing)
+
+class FrameBucketTrainer(ColumnarBucketTrainer):
+    """Train from columnar data (pandas, Arrow or NumPy) without creating a python object per row, see
+    :func:`store_from_frame` for the supported inputs and how missing values are handled
+
+    :param frame: The data to train on
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the filters
+    :param min_support: The minimum number of items for a filter combination to be indexed
+    :param index_mode: "groupby" or "recursive", see :class:`neurobcl.trainers.columnar_trainer.ColumnarBucketTrainer`
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+    :type index_mode: str, optional
+
+    .. code-block:: python
+
+        df["company"] = df["company"].astype("category")
+        trainer = FrameBucketTrainer(df, ["company", "category"], ["listPrice"])
+        classifier = trainer.index()
+    """
+    def __init__(self, frame, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1, index_mode="groupby"):
+        store = store_from_frame(frame, keyword_feats_name, bucket_feats_name)
+        ColumnarBucketTrainer.__init__(self, store, keyword_feats_name, bucket_feats_name, quantile_gap, max_depth, min_support, index_mode)
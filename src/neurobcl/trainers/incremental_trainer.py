@@ -0,0 +1,205 @@
+import weakref
+
+from sortedcontainers import SortedList
+
+from neurobcl.base.columns import is_missing
+from neurobcl.base.model import CountingBucketTrainer, filter_combinations, order_invariant
+
+class IncrementalBucketTrainer(CountingBucketTrainer):
+    """Train using dictionary/json data that keeps changing, every filter combination (up to max_depth - 1 filters)
+    keeps its bucket feature values in an order statistic structure. Once indexed, :meth:`add_items` and
+    :meth:`remove_items` only refresh the percentile lists of the combinations the items belong to, in logarithmic
+    time per item instead of a full re-index.
+
+    :param dict_data: The initial data, a list of dictionaries
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the filters
+    :param min_support: The minimum number of items for a filter combination to be indexed, at least 1
+    :type dict_data: List[Dict]
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+
+    .. code-block:: python
+
+        trainer = IncrementalBucketTrainer(data, ["company"], ["listPrice"])
+        classifier = trainer.index()
+        classifier.add_items([{"company": "NIKE", "listPrice": 120}])
+        classifier.remove_items([data[0]])
+    """
+    def __init__(self, dict_data, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1):
+        CountingBucketTrainer.__init__(self, quantile_gap, max_depth, min_support)
+        if min_support < 1:
+            raise ValueError("Incremental trainer needs a minimum support of at least 1")
+
+        self.keyword_feats = list(keyword_feats_name)
+        self.bucket_feats = list(bucket_feats_name)
+
+        # Item count of every keyword value and of every filter combination
+        self.keywords = {key: {} for key in self.keyword_feats}
+        self.counts = {}
+        self.sorted_values = {feature: {} for feature in self.bucket_feats}
+
+        # Set once indexed, from then on every change refreshes the indexer hash
+        self.indexed = False
+
+        # Classifiers returned by index() and index_lazy(), their lookup caches are cleared on every change
+        self._classifiers = weakref.WeakSet()
+        self.add_items(dict_data)
+
+    def _keyword_values(self, item: dict):
+        for key in self.keyword_feats:
+            value = item[key]
+            for v in (dict.fromkeys(value) if type(value) == list else [value]):
+                yield key, v
+
+    def __getstate__(self):
+        # Sent to the index workers, the classifiers stay in this process
+        state = dict(self.__dict__)
+        del state["_classifiers"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._classifiers = weakref.WeakSet()
+
+    def _refresh(self, filters_keys):
+        """Recompute the percentile lists of the changed combinations and drop the cached lookups of the classifiers"""
+        for classifier in list(self._classifiers):
+            classifier.clear_lookup_cache()
+        if not self.indexed:
+            return
+
+        for filters_key in filters_keys:
+            filters = dict(filters_key)
+            for feature in self.bucket_feats:
+                key = order_invariant(feature, filters)
+                if len(filters_key) == 0 or self.counts.get(filters_key, 0) >= self.min_support:
+                    self.indexer_hash[key] = self._index_list(feature, filters)
+                else:
+                    self.indexer_hash.pop(key, None)
+
+    def add_items(self, items):
+        """Add items and refresh the percentile lists they affect
+
+        :param items: The items, they should contain all the keyword and bucket features. A missing (None or NaN) bucket
+            value is left out of the percentiles of that feature.
+        :type items: List[Dict]
+        """
+        changed = {}
+        for item in items:
+            for key, value in self._keyword_values(item):
+                self.keywords[key][value] = self.keywords[key].get(value, 0) + 1
+
+            for filters_key in filter_combinations(item, self.keyword_feats, self.max_depth):
+                changed[filters_key] = None
+                self.counts[filters_key] = self.counts.get(filters_key, 0) + 1
+                for feature in self.bucket_feats:
+                    if is_missing(item[feature]):
+                        continue
+                    if filters_key not in self.sorted_values[feature]:
+                        self.sorted_values[feature][filters_key] = SortedList()
+                    self.sorted_values[feature][filters_key].add(item[feature])
+        self._refresh(changed)
+
+    def remove_items(self, items):
+        """Remove previously added items (matched by their feature values) and refresh the percentile lists they affect
+
+        :param items: The items to be removed
+        :type items: List[Dict]
+
+        :raises ValueError: If an item was never added
+        """
+        # Check the whole batch first so a bad item leaves the trainer unchanged
+        batch = [(item, list(filter_combinations(item, self.keyword_feats, self.max_depth))) for item in items]
+        needed = {}
+        for item, filters_keys in batch:
+            for filters_key in filters_keys:
+                for feature in self.bucket_feats:
+                    if is_missing(item[feature]):
+                        continue
+                    needed[feature, filters_key, item[feature]] = needed.get((feature, filters_key, item[feature]), 0) + 1
+        for (feature, filters_key, value), count in needed.items():
+            values = self.sorted_values[feature].get(filters_key, None)
+            if values is None or values.count(value) < count:
+                raise ValueError("Item to be removed was never added")
+
+        changed = {}
+        for item, filters_keys in batch:
+            for key, value in self._keyword_values(item):
+                self.keywords[key][value] -= 1
+                if self.keywords[key][value] == 0:
+                    del self.keywords[key][value]
+
+            for filters_key in filters_keys:
+                changed[filters_key] = None
+                self.counts[filters_key] -= 1
+                for feature in self.bucket_feats:
+                    if not is_missing(item[feature]):
+                        self.sorted_values[feature][filters_key].remove(item[feature])
+                if self.counts[filters_key] == 0 and len(filters_key) > 0:
+                    del self.counts[filters_key]
+                    for feature in self.bucket_feats:
+                        self.sorted_values[feature].pop(filters_key, None)
+        self._refresh(changed)
+
+    def get_at(self, target_feature, rank, filters = {}):
+        """Get the value of the target_feature at the given rank in logarithmic time
+
+        :param target_feature: The feature to get the value from
+        :param rank: The rank of the value to get
+        :param filters: The filters to apply to the data
+        :type target_feature: str
+        :type rank: int
+        :type filters: dict
+        :return: The value of the target_feature at the given rank
+        :rtype: int"""
+        values = self.sorted_values[target_feature].get(self._filters_key(filters), None)
+        if not values:
+            return None
+        return values[rank]
+
+    def _percentile_list(self, bucket_feat_name, current_filters):
+        values = self.sorted_values[bucket_feat_name].get(self._filters_key(current_filters), None)
+        if not values:
+            return [None] * (int(100 / self.quantile_gap) + 1)
+
+        total = len(values)
+        return [values[min(percentile * total // 100, total - 1)] for percentile in range(0, 101, self.quantile_gap)]
+
+    def _quantile_values(self, bucket_feat_name, current_filters, steps):
+        values = self.sorted_values[bucket_feat_name].get(self._filters_key(current_filters), None)
+        if not values:
+            return None
+
+        total = len(values)
+        return [values[min(step * total // steps, total - 1)] for step in range(steps + 1)]
+
+    def index(self, workers: int = None, mp_context = None):
+        """Index the classifier, the returned classifier shares its indexer hash with this trainer and stays attached
+        to it so that :meth:`neurobcl.base.model.NeuroBucketClassifier.add_items` keeps it up to date
+
+        :param workers: The number of processes to index with, defaults to indexing in the current process
+        :param mp_context: The multiprocessing context of the workers, defaults to the platform default
+        :type workers: int, optional
+        :type mp_context: multiprocessing.context.BaseContext, optional
+        :return: The classifier model
+        :rtype: :class:`neurobcl.base.model.NeuroBucketClassifier`
+        """
+        classifier = CountingBucketTrainer.index(self, workers, mp_context)
+        self.indexed = True
+        classifier.updater = self
+        self._classifiers.add(classifier)
+        return classifier
+
+    def index_lazy(self, cache_size: int = 65536, cache_bytes: int = None):
+        """Get a lazy classifier whose cached percentile lists are dropped whenever items are added or removed, see
+        :meth:`neurobcl.base.model.NeuroBucketTrainer.index_lazy`
+        """
+        classifier = CountingBucketTrainer.index_lazy(self, cache_size, cache_bytes)
+        self._classifiers.add(classifier)
+        return classifier
@@ -0,0 +1,168 @@
+import json
+
+from neurobcl.base.columns import is_missing
+from neurobcl.base.model import CountingBucketTrainer, filter_combinations
+from neurobcl.base.sketch import KLLSketch
+
+def _item_values(value):
+    """The distinct keyword values of a record, list valued features match any of their values"""
+    if type(value) == list:
+        return list(dict.fromkeys(value))
+    return [value]
+
+class SketchBucketTrainer(CountingBucketTrainer):
+    """Train from a stream of records without keeping them in memory, one mergeable :class:`neurobcl.base.sketch.KLLSketch`
+    is kept per bucket feature and filter combination (up to max_depth - 1 filters). Trainers built on separate shards
+    can be merged into one, percentile lists are exact while a combination holds fewer than about k items and
+    approximate (rank error about 1.7 / k) beyond that.
+
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the filters
+    :param min_support: The minimum number of items for a filter combination to be indexed
+    :param k: The sketch size, bounds the memory of every combination
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+    :type k: int, optional
+
+    .. code-block:: python
+
+        shard_a = SketchBucketTrainer(["company"], ["listPrice"])
+        shard_a.consume(first_chunk)
+        shard_b = SketchBucketTrainer(["company"], ["listPrice"])
+        shard_b.consume(second_chunk)
+
+        shard_a.merge(shard_b)
+        classifier = shard_a.index()
+    """
+    def __init__(self, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1, k=200):
+        CountingBucketTrainer.__init__(self, quantile_gap, max_depth, min_support)
+
+        self.keyword_feats = list(keyword_feats_name)
+        self.bucket_feats = list(bucket_feats_name)
+        self.k = k
+
+        # Filter combinations are tuples of (keyword, value) pairs in keyword feature order
+        self.keywords = {key: {} for key in self.keyword_feats}
+        self.counts = {}
+        self.sketches = {key: {} for key in self.bucket_feats}
+
+    def update(self, item: dict):
+        """Add a single record
+
+        :param item: The record, it should contain all the keyword and bucket features. A missing (None or NaN) bucket
+            value is left out of the percentiles of that feature.
+        :type item: dict
+        """
+        for key in self.keyword_feats:
+            for value in _item_values(item[key]):
+                self.keywords[key][value] = None
+
+        for filters_key in filter_combinations(item, self.keyword_feats, self.max_depth):
+            self.counts[filters_key] = self.counts.get(filters_key, 0) + 1
+            for feature in self.bucket_feats:
+                if is_missing(item[feature]):
+                    continue
+                sketch = self.sketches[feature].get(filters_key, None)
+                if sketch is None:
+                    sketch = self.sketches[feature][filters_key] = KLLSketch(self.k)
+                sketch.update(item[feature])
+
+    def consume(self, items):
+        """Add a chunk of records, any iterable works so a file can be streamed through
+
+        :param items: The records
+        :type items: Iterable[dict]
+        """
+        for item in items:
+            self.update(item)
+
+    def merge(self, other: "SketchBucketTrainer"):
+        """Merge the sketches of another trainer (eg built on a separate shard) into this one
+
+        :param other: The trainer to be merged, it should use the same features and depth
+        :type other: :class:`SketchBucketTrainer`
+        """
+        if other.keyword_feats != self.keyword_feats or other.bucket_feats != self.bucket_feats or other.max_depth != self.max_depth:
+            raise ValueError("Only trainers with the same features and max depth can be merged")
+
+        for key in self.keyword_feats:
+            self.keywords[key].update(other.keywords[key])
+        for filters_key, count in other.counts.items():
+            self.counts[filters_key] = self.counts.get(filters_key, 0) + count
+        for feature in self.bucket_feats:
+            for filters_key, sketch in other.sketches[feature].items():
+                if filters_key in self.sketches[feature]:
+                    self.sketches[feature][filters_key].merge(sketch)
+                else:
+                    self.sketches[feature][filters_key] = KLLSketch.from_dict(sketch.to_dict())
+
+    def get_at(self, target_feature, rank, filters = {}):
+        """Get the (approximate) value of the target_feature at the given rank
+
+        :param target_feature: The feature to get the value from
+        :param rank: The rank of the value to get
+        :param filters: The filters to apply to the data
+        :type target_feature: str
+        :type rank: int
+        :type filters: dict
+        :return: The value of the target_feature at the given rank, None if nothing was seen for the filters
+        :rtype: int"""
+        sketch = self.sketches[target_feature].get(self._filters_key(filters), None)
+        if sketch is None:
+            return None
+        return sketch.rank_select(rank)
+
+    def _percentile_list(self, bucket_feat_name, current_filters):
+        sketch = self.sketches[bucket_feat_name].get(self._filters_key(current_filters), None)
+        if sketch is None:
+            return [None] * (int(100 / self.quantile_gap) + 1)
+
+        total = sketch.count
+        return sketch.select([min(percentile * total // 100, total - 1) for percentile in range(0, 101, self.quantile_gap)])
+
+    def _quantile_values(self, bucket_feat_name, current_filters, steps):
+        sketch = self.sketches[bucket_feat_name].get(self._filters_key(current_filters), None)
+        if sketch is None:
+            return None
+
+        total = sketch.count
+        return sketch.select([min(step * total // steps, total - 1) for step in range(steps + 1)])
+
+    def toJson(self):
+        """Converts the trainer state (all the sketches) to a JSON string, eg to send a shard to another process
+
+        :return: The JSON string representation of the trainer
+        :rtype: str
+        """
+        return json.dumps({
+            "keyword_feats_name": self.keyword_feats,
+            "bucket_feats_name": self.bucket_feats,
+            "quantile_gap": self.quantile_gap,
+            "max_depth": self.max_depth,
+            "min_support": self.min_support,
+            "k": self.k,
+            "keywords": {key: list(values) for key, values in self.keywords.items()},
+            "counts": [[list(map(list, filters_key)), count] for filters_key, count in self.counts.items()],
+            "sketches": {feature: [[list(map(list, filters_key)), sketch.to_dict()] for filters_key, sketch in sketches.items()] for feature, sketches in self.sketches.items()},
+        })
+
+    @classmethod
+    def fromJson(cls, json_str):
+        """Converts the JSON string from :meth:`toJson` back to a trainer
+
+        :param json_str: The JSON string to be converted
+        :type json_str: str
+        :return: The trainer
+        :rtype: :class:`SketchBucketTrainer`
+        """
+        data = json.loads(json_str)
+        trainer = cls(data["keyword_feats_name"], data["bucket_feats_name"], data["quantile_gap"], data["max_depth"], data["min_support"], data["k"])
+        trainer.keywords = {key: dict.fromkeys(values) for key, values in data["keywords"].items()}
+        trainer.counts = {tuple(map(tuple, filters_key)): count for filters_key, count in data["counts"]}
+        trainer.sketches = {feature: {tuple(map(tuple, filters_key)): KLLSketch.from_dict(sketch) for filters_key, sketch in sketches} for feature, sketches in data["sketches"].items()}
+        return trainer
@@ -0,0 +1,101 @@
+import csv
+import json
+
+from neurobcl.base.columns import ColumnStoreBuilder
+
+def _open_text(source):
+    """Open a path for reading, file objects are used as they are"""
+    if isinstance(source, str):
+        return open(source, "r", encoding="utf-8", newline="")
+    return source
+
+def _parse_number(text: str):
+    """An empty cell is a missing value (None)"""
+    if not text.strip():
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def iter_jsonl(source):
+    """Stream the records of a JSON lines file, blank lines are skipped
+
+    :param source: The file path or an open text file
+    :type source: str or file
+    :return: The records one at a time
+    :rtype: Iterator[dict]
+    """
+    f = _open_text(source)
+    try:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if f is not source:
+            f.close()
+
+def iter_csv(source, keyword_feats_name, bucket_feats_name, delimiter=",", list_separator=None):
+    """Stream the records of a CSV file with a header row, only the named columns are kept. Bucket columns are parsed
+    as numbers (an empty cell is a missing value) and keyword columns can hold several values joined by list_separator
+    (an empty cell is an empty list).
+
+    :param source: The file path or an open text file
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param delimiter: The CSV delimiter, defaults to ","
+    :param list_separator: Separator of list valued keyword cells (eg "|"), defaults to single values
+    :type source: str or file
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type delimiter: str, optional
+    :type list_separator: str, optional
+    :return: The records one at a time
+    :rtype: Iterator[dict]
+    """
+    f = _open_text(source)
+    try:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        missing = [key for key in list(keyword_feats_name) + list(bucket_feats_name) if key not in header]
+        if missing:
+            raise ValueError("Columns not found in the CSV header: " + ", ".join(missing))
+
+        keyword_columns = [(key, header.index(key)) for key in keyword_feats_name]
+        bucket_columns = [(key, header.index(key)) for key in bucket_feats_name]
+        for row in reader:
+            if not row:
+                continue
+            item = {}
+            for key, column in keyword_columns:
+                if list_separator is None:
+                    item[key] = row[column]
+                else:
+                    item[key] = row[column].split(list_separator) if row[column] else []
+            for key, column in bucket_columns:
+                try:
+                    item[key] = _parse_number(row[column])
+                except ValueError:
+                    raise ValueError("Column " + key + " on line " + str(reader.line_num) + " is not a number: " + repr(row[column])) from None
+            yield item
+    finally:
+        if f is not source:
+            f.close()
+
+def build_store(records, keyword_feats_name, bucket_feats_name):
+    """Build a column store from a stream of records in a single pass, only the named features are kept
+
+    :param records: The records
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :type records: Iterable[dict]
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :return: The column store
+    :rtype: :class:`neurobcl.base.columns.ColumnStore`
+    """
+    builder = ColumnStoreBuilder(keyword_feats_name, bucket_feats_name)
+    builder.extend(records)
+    return builder.build()
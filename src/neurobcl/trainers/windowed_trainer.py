@@ -0,0 +1,216 @@
+import math
+
+from neurobcl.base.model import CountingBucketTrainer
+from neurobcl.base.sketch import weighted_select
+from neurobcl.trainers.sketch_trainer import SketchBucketTrainer
+
+class WindowedBucketTrainer(CountingBucketTrainer):
+    """Train from a stream of timestamped records over a sliding time window. Time is cut into panes of pane seconds,
+    every pane is a :class:`neurobcl.trainers.sketch_trainer.SketchBucketTrainer` so its memory is bounded by the
+    sketch size k, and a pane is simply dropped once it leaves the window. With a half life the panes are weighted by
+    their age instead (exponential decay), the window then only bounds how far back panes are kept. Snapshots are
+    indexed from the pane sketches, records are never scanned twice.
+
+    :param keyword_feats_name: The name of the keyword features (categorical features)
+    :param bucket_feats_name: The name of the bucket features (numerical features)
+    :param quantile_gap: The gap between the quantiles
+    :param max_depth: The maximum depth of the filters
+    :param min_support: The minimum (weighted) number of items for a filter combination to be indexed
+    :param window: The length of the window in seconds
+    :param pane: The length of a pane in seconds, the window slides by whole panes
+    :param half_life: The age in seconds at which a pane counts half, None to weigh every pane in the window equally
+    :param k: The sketch size of every pane, bounds the memory of every combination
+    :param publish_interval: Publish a snapshot every publish_interval seconds of event time, None to only publish
+        on :meth:`publish`
+    :param time_feat_name: The record field holding the timestamp in seconds
+    :type keyword_feats_name: List[str]
+    :type bucket_feats_name: List[str]
+    :type quantile_gap: int, optional
+    :type max_depth: int, optional
+    :type min_support: int, optional
+    :type window: float, optional
+    :type pane: float, optional
+    :type half_life: float, optional
+    :type k: int, optional
+    :type publish_interval: float, optional
+    :type time_feat_name: str, optional
+
+    .. code-block:: python
+
+        trainer = WindowedBucketTrainer(["company"], ["listPrice"], window=3600, pane=60, publish_interval=300)
+        trainer.on_publish = lambda classifier: print(classifier.get("listPrice", 1, '<'))
+        for event in events:
+            trainer.update(event)
+        trainer.snapshot # the latest classifier
+    """
+    def __init__(self, keyword_feats_name, bucket_feats_name, quantile_gap=10, max_depth=2, min_support=1, window=3600.0, pane=60.0, half_life=None, k=200, publish_interval=None, time_feat_name="timestamp"):
+        CountingBucketTrainer.__init__(self, quantile_gap, max_depth, min_support)
+        if pane <= 0 or window < pane:
+            raise ValueError("Pane length should be positive and at most the window length")
+        if half_life is not None and half_life <= 0:
+            raise ValueError("Half life should be positive")
+
+        self.keyword_feats = list(keyword_feats_name)
+        self.bucket_feats = list(bucket_feats_name)
+        self.window = window
+        self.pane = pane
+        self.half_life = half_life
+        self.k = k
+        self.publish_interval = publish_interval
+        self.time_feat = time_feat_name
+
+        # Live panes by pane number (timestamp // pane), oldest first
+        self.panes = {}
+        self.n_panes = int(math.ceil(window / pane))
+        self.now = None
+        self.late = 0
+
+        # Keyword values merged from the panes, rebuilt once the panes change
+        self._keywords = None
+
+        self.snapshot = None
+        self.published_at = None
+        self.on_publish = None
+
+    def _pane_weights(self):
+        """The weight of every live pane, 1 without a half life"""
+        current = int(self.now // self.pane)
+        if self.half_life is None:
+            return [(trainer, 1.0) for trainer in self.panes.values()]
+        return [(trainer, 0.5 ** ((current - number) * self.pane / self.half_life)) for number, trainer in self.panes.items()]
+
+    def advance(self, now: float):
+        """Move the clock forward, expiring the panes that left the window and publishing a snapshot if one is due
+
+        :param now: The current time in seconds, earlier times are ignored
+        :type now: float
+        """
+        if self.now is not None and now <= self.now:
+            return
+        self.now = now
+
+        oldest = int(now // self.pane) - self.n_panes + 1
+        for number in [number for number in self.panes if number < oldest]:
+            del self.panes[number]
+            self._keywords = None
+
+        if self.publish_interval is not None:
+            if self.published_at is None:
+                self.published_at = now
+            elif now - self.published_at >= self.publish_interval:
+                self.publish()
+
+    def update(self, item: dict, timestamp: float = None):
+        """Add a single record, records older than the window are counted in late and ignored
+
+        :param item: The record, it should contain all the keyword and bucket features
+        :param timestamp: The time of the record in seconds, defaults to the time_feat_name field of the record
+        :type item: dict
+        :type timestamp: float, optional
+        """
+        if timestamp is None:
+            timestamp = item[self.time_feat]
+
+        number = int(timestamp // self.pane)
+        if self.now is not None and number <= int(self.now // self.pane) - self.n_panes:
+            self.late += 1
+            return
+
+        trainer = self.panes.get(number, None)
+        if trainer is None:
+            trainer = self.panes[number] = SketchBucketTrainer(self.keyword_feats, self.bucket_feats, self.quantile_gap, self.max_depth, 1, self.k)
+            self.panes = dict(sorted(self.panes.items()))
+        trainer.update(item)
+        self._keywords = None
+        self.advance(timestamp)
+
+    def consume(self, items):
+        """Add a chunk of records in time order, any iterable works so a stream can be followed
+
+        :param items: The records
+        :type items: Iterable[dict]
+        """
+        for item in items:
+            self.update(item)
+
+    def publish(self):
+        """Index a snapshot of the current window, it is kept in snapshot and passed to on_publish
+
+        :return: The classifier model
+        :rtype: :class:`neurobcl.base.model.NeuroBucketClassifier`
+        """
+        # Every snapshot gets its own indexer hash, earlier snapshots stay as they were
+        self.indexer_hash = {}
+        self.snapshot = self.index()
+        self.published_at = self.now
+        if self.on_publish is not None:
+            self.on_publish(self.snapshot)
+        return self.snapshot
+
+    @property
+    def keywords(self):
+        """The keyword values of the records in the window, merged from the panes once until they change"""
+        if self._keywords is None:
+            keywords = {key: {} for key in self.keyword_feats}
+            for trainer in self.panes.values():
+                for key, values in trainer.keywords.items():
+                    keywords[key].update(values)
+            self._keywords = keywords
+        return self._keywords
+
+    def total_items(self, filters = {}):
+        """Get the number of items in the window for the given filters, weighted by the pane weights with a half life"""
+        if self.now is None:
+            return 0
+        filters_key = self._filters_key(filters)
+        total = sum(trainer.counts.get(filters_key, 0) * weight for trainer, weight in self._pane_weights())
+        return total if self.half_life is not None else int(total)
+
+    def _weighted_items(self, target_feature, filters_key):
+        """The retained values of every pane with their weights, scaled by the pane weights"""
+        values = []
+        weights = []
+        for trainer, weight in self._pane_weights():
+            sketch = trainer.sketches[target_feature].get(filters_key, None)
+            if sketch is None:
+                continue
+            pane_values, pane_weights = sketch.weighted_items()
+            values.extend(pane_values)
+            weights.extend([pane_weight * weight for pane_weight in pane_weights])
+        return values, weights
+
+    def _select(self, target_feature, filters, steps):
+        """Values at the ranks step * total / steps for step = 0..steps of the (weighted) items of the window, None if
+        there are none"""
+        if self.now is None:
+            return None
+        values, weights = self._weighted_items(target_feature, self._filters_key(filters))
+        if len(values) == 0:
+            return None
+        total = sum(weights)
+        return weighted_select(values, weights, [step * total / steps for step in range(steps + 1)])
+
+    def get_at(self, target_feature, rank, filters = {}):
+        """Get the (approximate) value of the target_feature at the given (weighted) rank in the window
+
+        :param target_feature: The feature to get the value from
+        :param rank: The rank of the value to get
+        :param filters: The filters to apply to the data
+        :type target_feature: str
+        :type rank: int
+        :type filters: dict
+        :return: The value of the target_feature at the given rank, None if nothing is in the window for the filters
+        :rtype: int"""
+        if self.now is None:
+            return None
+        values, weights = self._weighted_items(target_feature, self._filters_key(filters))
+        return weighted_select(values, weights, [rank])[0] if len(values) else None
+
+    def _percentile_list(self, bucket_feat_name, current_filters):
+        values = self._select(bucket_feat_name, current_filters, int(100 / self.quantile_gap))
+        if values is None:
+            return [None] * (int(100 / self.quantile_gap) + 1)
+        return values
+
+    def _quantile_values(self, bucket_feat_name, current_filters, steps):
+        return self._select(bucket_feat_name, current_filters, steps)
@@ -0,0 +1,40 @@
+import random
+
+KEYWORDS = ["company", "category", "tags"]
+
+def random_data(seed, n=200):
+    """Random products to compare the engines with each other"""
+    rng = random.Random(seed)
+    data = []
+    for i in range(n):
+        data.append({
+            "company": rng.choice(["NIKE", "ADIDAS", "PUMA", "REEBOK"]),
+            "category": rng.choice(["Shoes", "Clothes", "Bracelets"]),
+            "tags": rng.sample(["sale", "new", "eco", "limited"], rng.randint(0, 2)),
+            "listPrice": rng.randint(1, 2000),
+            "rating": round(rng.uniform(0, 5), 1),
+        })
+    return data
+
+def small_data():
+    """Six products whose percentile lists are worked out by hand in SMALL_INDEX"""
+    return [
+        {"company": "NIKE", "category": "Shoes", "tags": ["sale"], "listPrice": 10},
+        {"company": "NIKE", "category": "Shoes", "tags": [], "listPrice": 20},
+        {"company": "NIKE", "category": "Clothes", "tags": ["new"], "listPrice": 30},
+        {"company": "PUMA", "category": "Shoes", "tags": ["sale", "new"], "listPrice": 40},
+        {"company": "PUMA", "category": "Clothes", "tags": [], "listPrice": 50},
+        {"company": "PUMA", "category": "Clothes", "tags": ["sale"], "listPrice": 60},
+    ]
+
+# The index of small_data with KEYWORDS, ["listPrice"], a quantile gap of 50 and a max depth of 2: the values at
+# ranks 0, n // 2 and n - 1 of the prices of every single filter
+SMALL_INDEX = {
+    "listPrice#": [10, 40, 60],
+    "listPrice#company_=NIKE": [10, 20, 30],
+    "listPrice#company_=PUMA": [40, 50, 60],
+    "listPrice#category_=Shoes": [10, 20, 40],
+    "listPrice#category_=Clothes": [30, 50, 60],
+    "listPrice#tags_=sale": [10, 40, 60],
+    "listPrice#tags_=new": [30, 40, 40],
+}
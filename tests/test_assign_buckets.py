@@ -0,0 +1,80 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+import numpy as np
+from neurobcl.cli import assign_jsonl, main, record_filters
+from neurobcl.main import train_from_dictionary
+from tests.helpers import random_data
+
+BUCKETS = [10, 20, 30, 40]
+
+def expected_bucket(classifier, value, filters, buckets):
+    # Smallest bucket whose upper bound is not below the value
+    for bucket in range(1, len(buckets)):
+        if value <= classifier.get("listPrice", bucket, '<', filters, buckets):
+            return bucket
+    return len(buckets)
+
+class TestAssignBuckets(TestCase):
+    def setUp(self):
+        self.data = random_data(21, 400)
+        self.classifier = train_from_dictionary(self.data, ["company", "category"], ["listPrice", "rating"], 10, 3, min_support=5)
+
+    def test_same_as_get(self):
+        filters = [{"category": item["category"], "company": item["company"]} for item in self.data]
+        filters[0] = {"company": "UNKNOWN"}
+        values = [item["listPrice"] for item in self.data]
+        assigned = self.classifier.assign_buckets("listPrice", values, filters, BUCKETS)
+        self.assertEqual(assigned.dtype, np.int64)
+        for value, item_filters, bucket in zip(values, filters, assigned.tolist()):
+            self.assertEqual(bucket, expected_bucket(self.classifier, value, item_filters, BUCKETS))
+
+        # Every value of the unfiltered data lands in a bucket of about the expected size
+        counts = np.bincount(self.classifier.assign_buckets("listPrice", np.array(values), buckets=BUCKETS), minlength=5)
+        self.assertEqual(counts[0], 0)
+        self.assertTrue(np.all(np.abs(counts[1:] - np.array(BUCKETS) * 4) <= 5))
+
+    def test_missing_values(self):
+        assigned = self.classifier.assign_buckets("listPrice", [None, -1, 10**6], {"company": "NIKE"})
+        self.assertEqual(assigned.tolist(), [0, 1, 4])
+        self.assertEqual(self.classifier.assign_buckets("listPrice", []).tolist(), [])
+        with self.assertRaises(ValueError):
+            self.classifier.assign_buckets("listPrice", [1, 2], [{}])
+        with self.assertRaises(ValueError):
+            self.classifier.assign_buckets("unknown", [1])
+
+    def test_cli(self):
+        lines = "".join(json.dumps(item) + "\n" for item in self.data)
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, "model.nbcl")
+            self.classifier.toBinary(model_path)
+            json_path = os.path.join(tmp, "model.json")
+            with open(json_path, "w") as f:
+                f.write(self.classifier.toJson())
+
+            serial = io.StringIO()
+            assign_jsonl(json_path, io.StringIO(lines), serial, "listPrice", chunk_size=64)
+            parallel = io.StringIO()
+            assign_jsonl(model_path, io.StringIO(lines), parallel, "listPrice", workers=2, chunk_size=64)
+            self.assertEqual(serial.getvalue(), parallel.getvalue())
+
+            records = [json.loads(line) for line in serial.getvalue().splitlines()]
+            self.assertEqual(len(records), len(self.data))
+            for record in records:
+                filters = record_filters(self.classifier, record)
+                self.assertEqual(record["listPrice_bucket"], expected_bucket(self.classifier, record["listPrice"], filters, [25, 25, 25, 25]))
+
+            input_path = os.path.join(tmp, "items.jsonl")
+            output_path = os.path.join(tmp, "labelled.jsonl")
+            with open(input_path, "w") as f:
+                f.write(lines)
+            self.assertEqual(main(["assign", "--model", model_path, "--target", "listPrice", "--input", input_path, "--output", output_path, "--field", "bucket", "--buckets", "10,20,30,40"]), 0)
+            with open(output_path) as f:
+                buckets = [json.loads(line)["bucket"] for line in f]
+            self.assertEqual(buckets, self.classifier.assign_buckets("listPrice", [item["listPrice"] for item in self.data], [record_filters(self.classifier, item) for item in self.data], BUCKETS).tolist())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from unittest import TestCase
+from benchmarks.compare import compare
+from benchmarks.generators import generate, generate_queries
+from benchmarks.run import BASE_CASE, preset_cases, run_case
+
+class TestBenchmarks(TestCase):
+    def test_generators_are_seeded(self):
+        items = generate(300, 3, 5, skew=1.5, list_valued=1, seed=4)
+        self.assertEqual(items, generate(300, 3, 5, skew=1.5, list_valued=1, seed=4))
+        self.assertNotEqual(items, generate(300, 3, 5, skew=1.5, list_valued=1, seed=5))
+        self.assertTrue(all(type(item["k2"]) == list and type(item["k0"]) == str for item in items))
+        self.assertEqual(len(generate_queries(items, 50, 2)), 50)
+
+    def test_run_and_compare(self):
+        case = dict(BASE_CASE, rows=300)
+        result = run_case(case, n_queries=50)
+        for metric in ["train_seconds", "train_peak_bytes", "model_binary_bytes", "load_binary_seconds", "query_us_per_query", "assign_seconds"]:
+            self.assertGreater(result[metric], 0)
+        for metric in ["load_binary_peak_bytes", "query_peak_bytes", "query_binary_peak_bytes", "get_many_peak_bytes", "assign_peak_bytes"]:
+            self.assertGreater(result[metric], 0)
+
+        baseline = {"results": [result]}
+        slower = {"results": [dict(result, train_seconds=result["train_seconds"] * 2)]}
+        self.assertEqual(compare(baseline, baseline), [])
+        self.assertEqual([regression[1] for regression in compare(baseline, slower)], ["train_seconds"])
+
+        self.assertEqual(preset_cases("quick")[0], BASE_CASE)
+
+if __name__ == "__main__":
+    unittest.main()
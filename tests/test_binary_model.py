@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+from neurobcl.base.binary import MappedIndex
+from neurobcl.base.model import NeuroBucketClassifier
+from neurobcl.main import train_from_dictionary
+from tests.helpers import random_data
+
+class TestBinaryModel(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "model.nbcl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        classifier = train_from_dictionary(random_data(16, 200), ["company", "category", "tags"], ["listPrice", "rating"], max_depth=3)
+        classifier.toBinary(self.path)
+        loaded = NeuroBucketClassifier.fromBinary(self.path)
+
+        self.assertEqual(dict(loaded.indexer_hash), classifier.indexer_hash)
+        self.assertEqual(loaded.filter_features, classifier.filter_features)
+        self.assertEqual(loaded.bucket_features, classifier.bucket_features)
+        self.assertEqual(json.loads(loaded.toJson()), json.loads(classifier.toJson()))
+
+        for filters in [{}, {"company": "NIKE"}, {"category": "Shoes", "tags": "eco"}, {"company": "UNKNOWN"}]:
+            self.assertEqual(loaded.get("listPrice", 2, '<', filters=filters), classifier.get("listPrice", 2, '<', filters=filters))
+            self.assertEqual(loaded.get("rating", 1, '>', filters=filters), classifier.get("rating", 1, '>', filters=filters))
+        self.assertIs(type(loaded.get("listPrice", 4, '<')), int)
+
+    def test_missing_values(self):
+        classifier = train_from_dictionary([
+            {"color": "red", "price": 100},
+            {"color": "blue", "price": 200.5},
+        ], ["color"], ["price"], min_support=0)
+        classifier.indexer_hash["price#color_=green"] = [None] * 11
+        classifier.toBinary(self.path)
+
+        loaded = NeuroBucketClassifier.fromBinary(self.path)
+        self.assertEqual(loaded.indexer_hash["price#color_=green"], [None] * 11)
+        self.assertEqual(loaded.get("price", 4, '<'), 200.5)
+        self.assertNotIn("price#color_=black", loaded.indexer_hash)
+
+    def test_string_table(self):
+        indexer_hash = {
+            "price#": [1] * 3,
+            "price#color_=red": [2] * 3,
+            "price#color_=red&size_=~1": [3] * 3,
+            "price#color_=a&b": [4] * 3,
+            "rating#color_=red": [5] * 3,
+        }
+        NeuroBucketClassifier(50, 3, indexer_hash, ["color", "size"], ["price", "rating"]).toBinary(self.path)
+        loaded = MappedIndex.open(self.path)
+
+        # Every feature and "&" separated part is written once, keys are rows of their ids
+        self.assertEqual(loaded.n_strings, 6)
+        self.assertEqual(loaded.key_width, 3)
+        self.assertEqual(dict(loaded), indexer_hash)
+        for key in ["price#color_=blue", "price#size_=~1", "price#size_=~1&color_=red", "rating#", "price", "stock#color_=red"]:
+            self.assertNotIn(key, loaded)
+
+    def test_not_a_model(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\0" * 200)
+        with self.assertRaises(ValueError):
+            NeuroBucketClassifier.fromBinary(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+import numpy as np
+from neurobcl.base import cdf
+from neurobcl.base.model import NeuroBucketClassifier
+from neurobcl.trainers.columnar_trainer import ColumnarBucketTrainer
+from neurobcl.trainers.dictionary_trainer import DictionaryBucketTrainer
+from tests.helpers import random_data
+
+KEYWORDS = ["company", "category"]
+BUCKETS = ["listPrice", "rating"]
+
+def exact(values, percentile):
+    values = sorted(values)
+    return values[min(int(percentile * len(values) // 100), len(values) - 1)]
+
+class TestCDFStorage(TestCase):
+    def test_compress(self):
+        percentiles = np.arange(1001) / 10
+        values = [exact([1, 5, 9], percentile) for percentile in percentiles]
+        knots = cdf.compress(percentiles, values, max_knots=8)
+        # A step function is kept exactly with the ends of its steps
+        self.assertEqual(knots, [0.0, 1, 33.3, 1, 33.4, 5, 66.6, 5, 66.7, 9, 100.0, 9])
+        self.assertEqual(cdf.evaluate(knots, 50), 5)
+        self.assertAlmostEqual(cdf.evaluate(knots, 33.35), 3.0)
+        self.assertEqual(cdf.evaluate_many(knots, np.array([0, 50, 100])).tolist(), [1, 5, 9])
+        self.assertEqual(len(cdf.compress(percentiles, np.sqrt(percentiles), max_knots=5)), 10)
+        self.assertEqual(len(cdf.compress(percentiles, percentiles * 2, max_knots=5)), 4)
+        self.assertIsNone(cdf.evaluate([], 50))
+
+    def test_same_for_every_trainer(self):
+        data = random_data(30, 300)
+        expected = DictionaryBucketTrainer(data, KEYWORDS, BUCKETS, 25, 3).enable_cdf(12).index()
+        self.assertEqual(expected.storage, "cdf")
+        for trainer in [
+            ColumnarBucketTrainer(data, KEYWORDS, BUCKETS, 25, 3, index_mode="recursive").enable_cdf(12),
+            ColumnarBucketTrainer(data, KEYWORDS, BUCKETS, 25, 3).enable_cdf(12),
+        ]:
+            self.assertEqual(trainer.index().indexer_hash, expected.indexer_hash)
+        parallel = ColumnarBucketTrainer(data, KEYWORDS, BUCKETS, 25, 3, min_support=0).enable_cdf(12)
+        self.assertEqual(parallel.index(2).indexer_hash, ColumnarBucketTrainer(data, KEYWORDS, BUCKETS, 25, 3, min_support=0, index_mode="recursive").enable_cdf(12).index().indexer_hash)
+
+    def test_any_bucket_layout(self):
+        data = random_data(31, 2000)
+        classifier = ColumnarBucketTrainer(data, KEYWORDS, BUCKETS, 25, 3).enable_cdf(max_knots=128, max_error=0.01).index()
+        grid = ColumnarBucketTrainer(data, KEYWORDS, BUCKETS, 1, 3).index()
+        # Far fewer cells than the 1001 values of the sampled quantile function
+        self.assertLessEqual(max(len(knots) for knots in classifier.indexer_hash.values()), 256)
+        self.assertLess(sum(len(knots) for knots in classifier.indexer_hash.values()), 1001 * len(classifier.indexer_hash) / 4)
+
+        layout = [33, 33, 34]
+        for filters in [{}, {"company": "NIKE"}, {"company": "PUMA", "category": "Shoes"}]:
+            rows = [item for item in data if all(item[key] == value for key, value in filters.items())]
+            for feature in BUCKETS:
+                values = [item[feature] for item in rows]
+                tolerance = 0.01 * (max(values) - min(values))
+                for bucket in [1, 2, 3]:
+                    value = classifier.get(feature, bucket, '<', filters, layout)
+                    self.assertLessEqual(abs(value - exact(values, sum(layout[:bucket]))), tolerance)
+                    self.assertLessEqual(abs(value - grid.get(feature, bucket, '<', filters, layout)), tolerance)
+
+        # Batch queries use the same evaluation
+        filters = [{"company": item["company"]} for item in data[:50]]
+        many = classifier.get_many("listPrice", [2] * 50, '<', filters, layout)
+        for value, f in zip(many.tolist(), filters):
+            self.assertAlmostEqual(value, classifier.get("listPrice", 2, '<', f, layout))
+        values = [item["listPrice"] for item in data[:50]]
+        assigned = classifier.assign_buckets("listPrice", values, filters, layout)
+        for value, f, bucket in zip(values, filters, assigned.tolist()):
+            bounds = [classifier.get("listPrice", b, '<', f, layout) for b in [1, 2]]
+            self.assertEqual(bucket, 1 + sum(bound < value for bound in bounds))
+
+    def test_save_and_load(self):
+        classifier = ColumnarBucketTrainer(random_data(32, 300), KEYWORDS, BUCKETS, 10, 2, min_support=0).enable_cdf(10).index()
+        loaded = NeuroBucketClassifier.fromJson(classifier.toJson())
+        self.assertEqual(loaded.storage, "cdf")
+        self.assertEqual(loaded.get("listPrice", 2, '<', {"company": "NIKE"}, [33, 33, 34]), classifier.get("listPrice", 2, '<', {"company": "NIKE"}, [33, 33, 34]))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.nbcl")
+            classifier.toBinary(path)
+            mapped = NeuroBucketClassifier.fromBinary(path)
+            self.assertEqual(mapped.storage, "cdf")
+            for filters in [{}, {"company": "NIKE"}, {"category": "Shoes", "company": "PUMA"}]:
+                for bucket in [1, 2, 3]:
+                    self.assertAlmostEqual(mapped.get("rating", bucket, '<', filters, [33, 33, 34]), classifier.get("rating", bucket, '<', filters, [33, 33, 34]))
+
+        # Models saved before the storage option load as grid models
+        data = json.loads(ColumnarBucketTrainer(random_data(32, 50), KEYWORDS, BUCKETS).index().toJson())
+        del data["storage"]
+        self.assertEqual(NeuroBucketClassifier.fromJson(json.dumps(data)).storage, "grid")
+
+if __name__ == "__main__":
+    unittest.main()
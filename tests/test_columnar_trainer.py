@@ -0,0 +1,78 @@
+import unittest
+from unittest import TestCase, mock
+import numpy as np
+from neurobcl.main import train_from_dictionary
+from neurobcl.trainers.columnar_trainer import ColumnarBucketTrainer
+from neurobcl.trainers.dictionary_trainer import DictionaryBucketTrainer
+from tests.helpers import KEYWORDS, SMALL_INDEX, random_data, small_data
+
+class TestColumnarTrainer(TestCase):
+    def test_same_as_dictionary(self):
+        data = random_data(7)
+        for max_depth, min_support in [(1, 1), (2, 1), (3, 1), (3, 0), (3, 5)]:
+            args = (data, ["company", "category", "tags"], ["listPrice", "rating"], 10, max_depth, min_support)
+            expected = DictionaryBucketTrainer(*args).index()
+            actual = ColumnarBucketTrainer(*args).index()
+            self.assertEqual(actual.indexer_hash, expected.indexer_hash)
+            self.assertEqual(actual.filter_features, expected.filter_features)
+            self.assertEqual(actual.bucket_features, expected.bucket_features)
+
+    def test_groupby_same_as_recursive(self):
+        data = random_data(11, 300)
+        data.append({"company": "NIKE", "category": "Shoes", "tags": ["eco", "eco"], "listPrice": 5, "rating": 1.0})
+        for max_depth in [1, 2, 3, 5]:
+            for min_support in [0, 1, 10]:
+                args = (data, ["company", "category", "tags"], ["listPrice", "rating"], 5, max_depth, min_support)
+                expected = ColumnarBucketTrainer(*args, index_mode="recursive").index()
+                actual = ColumnarBucketTrainer(*args, index_mode="groupby").index()
+                self.assertEqual(actual.indexer_hash, expected.indexer_hash)
+
+        for min_support in [0, 1]:
+            empty = ColumnarBucketTrainer([], ["company"], ["listPrice"], min_support=min_support)
+            self.assertEqual(empty.index().indexer_hash, ColumnarBucketTrainer([], ["company"], ["listPrice"], min_support=min_support, index_mode="recursive").index().indexer_hash)
+
+        with self.assertRaises(ValueError):
+            ColumnarBucketTrainer(data, ["company"], ["listPrice"], index_mode="unknown")
+
+    def test_small_fixture(self):
+        for index_mode in ["groupby", "recursive"]:
+            classifier = ColumnarBucketTrainer(small_data(), KEYWORDS, ["listPrice"], 50, 2, index_mode=index_mode).index()
+            self.assertEqual(classifier.indexer_hash, SMALL_INDEX)
+
+    def test_one_sort_per_depth(self):
+        trainer = ColumnarBucketTrainer(random_data(5, 100), ["company", "category", "tags"], ["listPrice", "rating"], max_depth=3)
+        with mock.patch.object(np, "lexsort", wraps=np.lexsort) as lexsort:
+            classifier = trainer.index()
+        # Per bucket feature: the root, then depth 1 and depth 2 of the tasks led by company and category, and only
+        # depth 1 of the one led by tags
+        self.assertEqual(lexsort.call_count, 2 * 6)
+        self.assertEqual(classifier.indexer_hash, ColumnarBucketTrainer(random_data(5, 100), ["company", "category", "tags"], ["listPrice", "rating"], max_depth=3, index_mode="recursive").index().indexer_hash)
+
+    def test_interface(self):
+        trainer = ColumnarBucketTrainer(random_data(3, 50), ["company", "tags"], ["listPrice"])
+        reference = DictionaryBucketTrainer(random_data(3, 50), ["company", "tags"], ["listPrice"])
+        for filters in [{}, {"company": "NIKE"}, {"tags": "eco", "company": "PUMA"}, {"company": "UNKNOWN"}]:
+            self.assertEqual(trainer.total_items(filters), reference.total_items(filters))
+            if reference.total_items(filters) > 0:
+                self.assertEqual(trainer.get_at("listPrice", 0, filters), reference.get_at("listPrice", 0, filters))
+            else:
+                self.assertIsNone(trainer.get_at("listPrice", 0, filters))
+
+    def test_engine_option(self):
+        classifier = train_from_dictionary([
+            {"color": "red", "size": "small", "price": 100},
+            {"color": "blue", "size": "small", "price": 200},
+            {"color": "red", "size": "large", "price": 300},
+            {"color": "blue", "size": "large", "price": 400},
+        ], ["color", "size"], ["price"], engine="columnar")
+
+        self.assertEqual(classifier.get("price", 1, '>'), 100)
+        self.assertEqual(classifier.get("price", 4, '<'), 400)
+        self.assertEqual(classifier.get("price", 1, '>', filters={"color": "blue"}), 200)
+        self.assertIs(type(classifier.get("price", 4, '<')), int)
+
+        with self.assertRaises(ValueError):
+            train_from_dictionary([], ["color"], ["price"], engine="unknown")
+
+if __name__ == '__main__':
+    unittest.main()
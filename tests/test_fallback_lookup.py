@@ -0,0 +1,121 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest import TestCase
+from neurobcl.base.binary import write_binary
+from neurobcl.base.model import KEY_FORMAT, NeuroBucketClassifier, order_invariant
+from neurobcl.main import train_from_dictionary
+from neurobcl.trainers.incremental_trainer import IncrementalBucketTrainer
+
+def reference_lookup(indexer_hash, target_key, filters):
+    """The original recursive lookup dropping one filter at a time"""
+    percentile_list = indexer_hash.get(order_invariant(target_key, filters), None)
+    if percentile_list is not None:
+        return percentile_list
+    for key in filters:
+        new_filters = filters.copy()
+        del new_filters[key]
+        percentile_list = reference_lookup(indexer_hash, target_key, new_filters)
+        if percentile_list is not None:
+            return percentile_list
+    return None
+
+class TestFallbackLookup(TestCase):
+    def test_same_as_recursive(self):
+        rng = random.Random(4)
+        keys = ["a", "b", "c", "d", "e"]
+        for _ in range(30):
+            indexer_hash = {}
+            for _ in range(40):
+                filters = {key: rng.choice(["x", "y"]) for key in rng.sample(keys, rng.randint(0, 5))}
+                indexer_hash[order_invariant("price", filters)] = [rng.random()] * 11
+            classifier = NeuroBucketClassifier(10, 6, indexer_hash, keys, ["price"])
+
+            for _ in range(30):
+                filters = {key: rng.choice(["x", "y"]) for key in rng.sample(keys, rng.randint(0, 5))}
+                self.assertIs(classifier._get_best_percentile_list("price", filters), reference_lookup(indexer_hash, "price", filters))
+                # Second time comes from the cache
+                self.assertIs(classifier._get_best_percentile_list("price", filters), reference_lookup(indexer_hash, "price", filters))
+
+    def test_non_string_values(self):
+        classifier = train_from_dictionary([
+            {"year": 2020, "size": 1, "price": 100},
+            {"year": 2021, "size": 2, "price": 200},
+            {"year": 2021, "size": 1, "price": 300},
+        ], ["year", "size"], ["price"])
+        self.assertEqual(classifier.get("price", 1, '>', filters={"year": 2021}), 200)
+        self.assertEqual(classifier.get("price", 1, '>', filters={"size": 3, "year": 2021}), 200)
+
+    def test_values_keep_their_type(self):
+        data = [
+            {"size": 1, "price": 100},
+            {"size": "1", "price": 900},
+            {"size": 2.0, "price": 300},
+            {"size": "~2", "price": 500},
+        ]
+        for engine in ["dictionary", "columnar"]:
+            classifier = train_from_dictionary(data, ["size"], ["price"], engine=engine)
+            # 1 and "1" are two combinations, "~2" does not clash with the tagged code of 2
+            self.assertEqual(len(classifier.indexer_hash), 5)
+            self.assertEqual(classifier.get("price", 4, '<', filters={"size": 1}), 100)
+            self.assertEqual(classifier.get("price", 4, '<', filters={"size": "1"}), 900)
+            self.assertEqual(classifier.get("price", 4, '<', filters={"size": "~2"}), 500)
+            # Equal numbers are one value, whatever their type
+            self.assertEqual(classifier.get("price", 4, '<', filters={"size": 2}), 300)
+            self.assertEqual(classifier.get("price", 4, '<', filters={"size": 1.0}), 100)
+        self.assertEqual(order_invariant("price", {"b": 2.0, "a": "x", "c": 0.5}), "price#a_=x&b_=~2&c_=~0.5")
+
+    def test_cache_bounded_and_invalidated(self):
+        trainer = IncrementalBucketTrainer([{"color": "red", "price": 100}], ["color"], ["price"])
+        classifier = trainer.index()
+        classifier._lookup_cache.maxsize = 2
+        for color in ["red", "blue", "green"]:
+            classifier.get("price", 1, '>', filters={"color": color})
+        self.assertEqual(len(classifier._lookup_cache), 2)
+
+        self.assertEqual(classifier.get("price", 1, '>', filters={"color": "blue"}), 100)
+        classifier.add_items([{"color": "blue", "price": 50}])
+        self.assertEqual(classifier.get("price", 1, '>', filters={"color": "blue"}), 50)
+
+    def test_only_key_shapes_looked_up(self):
+        indexer_hash = {"price#a_=x": [2] * 11, "price#b_=x&c_=x": [3] * 11}
+        classifier = NeuroBucketClassifier(10, 3, indexer_hash, ["a", "b", "c", "d", "e", "f"], ["price"])
+        looked_up = []
+        lookup = classifier._lookup
+        classifier._lookup = lambda key, *args: looked_up.append(key) or lookup(key, *args)
+
+        filters = {key: "y" for key in ["a", "b", "c", "d", "e", "f"]}
+        self.assertIsNone(classifier._get_best_percentile_list("price", filters))
+        # The keys are made of {a} and {b, c}, so only those 2 of the 22 subsets with up to 2 filters are tried
+        self.assertEqual(sorted(looked_up), ["price#a_=y", "price#b_=y&c_=y"])
+
+        looked_up.clear()
+        self.assertEqual(classifier._get_best_percentile_list("price", {"c": "x", "b": "x"}), [3] * 11)
+        self.assertEqual(looked_up, ["price#b_=x&c_=x"])
+        # A target key without keys is not searched at all
+        self.assertIsNone(classifier._get_best_percentile_list("rating", filters))
+
+    def test_old_key_format(self):
+        # Key format 1 wrote the values with str() and had no key_format field
+        data = {"quantile_gap": 50, "max_depth": 2, "filter_features": ["size", "color"], "bucket_features": ["price"], "indexer_hash": {
+            "price#": [1, 2, 3],
+            "price#size_=1": [4, 5, 6],
+            "price#color_=~red": [7, 8, 9],
+        }}
+        classifier = NeuroBucketClassifier.fromJson(json.dumps(data))
+        self.assertEqual(classifier._get_best_percentile_list("price", {"size": 1}), [4, 5, 6])
+        self.assertEqual(classifier._get_best_percentile_list("price", {"size": "1"}), [4, 5, 6])
+        self.assertEqual(classifier._get_best_percentile_list("price", {"color": "~red"}), [7, 8, 9])
+        self.assertEqual(json.loads(classifier.toJson())["key_format"], KEY_FORMAT)
+        self.assertEqual(NeuroBucketClassifier.fromJson(classifier.toJson()).indexer_hash, classifier.indexer_hash)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.nbcl")
+            write_binary(path, 50, 2, data["indexer_hash"], {"filter_features": data["filter_features"], "bucket_features": ["price"]})
+            classifier = NeuroBucketClassifier.fromBinary(path)
+            self.assertEqual(list(classifier._get_best_percentile_list("price", {"size": 1.0})), [4, 5, 6])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import pickle
+import threading
+import unittest
+from unittest import TestCase
+import numpy as np
+from neurobcl.base.cache import LRUCache, sizeof
+from neurobcl.trainers.dictionary_trainer import DictionaryBucketTrainer
+from tests.helpers import KEYWORDS, SMALL_INDEX, random_data, small_data
+
+class TestLRUCache(TestCase):
+    def test_byte_budget(self):
+        cache = LRUCache(maxsize=None, max_bytes=1000)
+        for i in range(5):
+            cache.put(i, np.zeros(50, dtype=np.int32))
+        self.assertEqual(len(cache), 5)
+        self.assertEqual(cache.nbytes, 1000)
+
+        cache.get(0)
+        cache.put(5, np.zeros(50, dtype=np.int32))
+        self.assertIn(0, cache)
+        self.assertNotIn(1, cache)
+        self.assertEqual(cache.evictions, 1)
+
+        # Too large for the whole budget, never cached
+        cache.put(6, np.zeros(1000, dtype=np.int32))
+        self.assertNotIn(6, cache)
+        self.assertEqual(cache.stats(), {"entries": 5, "bytes": 1000, "hits": 1, "misses": 0, "evictions": 1})
+
+    def test_threads(self):
+        cache = LRUCache(4)
+        errors = []
+
+        def work(seed):
+            try:
+                for i in range(20000):
+                    key = (seed * 7 + i) % 13
+                    if cache.get(key, None) is None:
+                        cache.put(key, key)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(cache), 4)
+        self.assertEqual(cache.nbytes, sum(sizeof(key) for key in range(13) if key in cache))
+
+        # The lock is not pickled, eg when a trainer is sent to the index workers
+        copy = pickle.loads(pickle.dumps(cache))
+        copy.put("x", 1)
+        self.assertIn("x", copy)
+
+class TestDictionaryFilterCache(TestCase):
+    def test_bounded_cache_same_model(self):
+        data = random_data(18, 300)
+        args = (data, ["company", "category", "tags"], ["listPrice", "rating"], 10, 3)
+        unbounded = DictionaryBucketTrainer(*args, cache_bytes=None)
+        bounded = DictionaryBucketTrainer(*args, cache_bytes=2048)
+        self.assertEqual(bounded.index().indexer_hash, unbounded.index().indexer_hash)
+
+        stats = bounded.cache_stats()
+        self.assertLessEqual(stats["filter_cache"]["bytes"], 2048)
+        self.assertGreater(stats["filter_cache"]["evictions"], 0)
+        self.assertGreater(stats["filter_cache"]["hits"], 0)
+        self.assertEqual(stats["sort_bytes"], 2 * 2 * 300 * 4)
+
+    def test_small_fixture(self):
+        trainer = DictionaryBucketTrainer(small_data(), KEYWORDS, ["listPrice"], 50, 2, cache_bytes=64)
+        self.assertEqual(trainer.index().indexer_hash, SMALL_INDEX)
+        self.assertLessEqual(trainer.cache_stats()["filter_cache"]["bytes"], 64)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+from unittest import TestCase
+import numpy as np
+from neurobcl.main import train_from_arrow, train_from_dataframe, train_from_dictionary
+from tests.helpers import SMALL_INDEX, random_data, small_data
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+KEYWORDS = ["company", "category"]
+BUCKETS = ["listPrice", "rating"]
+
+def structured(data):
+    return np.array(
+        [(item["company"], item["category"], item["listPrice"], item["rating"]) for item in data],
+        dtype=[("company", "U16"), ("category", "U16"), ("listPrice", "i8"), ("rating", "f8")],
+    )
+
+class TestFrameTrainer(TestCase):
+    def setUp(self):
+        self.data = random_data(3, 300)
+
+    def assertSameModel(self, model, expected):
+        self.assertEqual(model.indexer_hash, expected.indexer_hash)
+        self.assertEqual(sorted(model.filter_features), sorted(expected.filter_features))
+        self.assertEqual(model.bucket_features, expected.bucket_features)
+
+    def test_small_fixture(self):
+        columns = {key: np.array([item[key] for item in small_data()]) for key in KEYWORDS + ["listPrice"]}
+        model = train_from_dataframe(columns, KEYWORDS, ["listPrice"], 50, 2)
+        self.assertEqual(model.indexer_hash, {key: value for key, value in SMALL_INDEX.items() if "#tags" not in key})
+
+    def test_structured_array(self):
+        for max_depth, min_support in [(1, 1), (3, 1), (3, 0), (3, 10)]:
+            expected = train_from_dictionary(self.data, KEYWORDS, BUCKETS, 10, max_depth, min_support=min_support)
+            model = train_from_dataframe(structured(self.data), KEYWORDS, BUCKETS, 10, max_depth, min_support)
+            self.assertSameModel(model, expected)
+
+        columns = {key: np.array([item[key] for item in self.data]) for key in KEYWORDS + BUCKETS}
+        model = train_from_dataframe(columns, KEYWORDS, BUCKETS, 10, 3)
+        self.assertSameModel(model, train_from_dictionary(self.data, KEYWORDS, BUCKETS, 10, 3))
+
+    def test_missing_values(self):
+        rating = np.array([item["rating"] for item in self.data])
+        rating[::7] = np.nan
+        columns = {
+            "company": np.array([item["company"] for item in self.data], dtype=object),
+            "category": np.array([item["category"] for item in self.data], dtype=object),
+            "listPrice": np.array([item["listPrice"] for item in self.data]),
+            "rating": rating,
+        }
+        columns["company"][::5] = None
+        model = train_from_dataframe(columns, KEYWORDS, BUCKETS, 10, 3)
+
+        # A missing keyword is like an empty list of values
+        records = [dict(item, company=[] if i % 5 == 0 else item["company"]) for i, item in enumerate(self.data)]
+        self.assertSameModel(train_from_dataframe(columns, KEYWORDS, ["listPrice"], 10, 3), train_from_dictionary(records, KEYWORDS, ["listPrice"], 10, 3))
+
+        # Missing bucket values only leave the percentiles of their own feature
+        present = [item for i, item in enumerate(records) if i % 7 != 0]
+        expected = train_from_dictionary(present, KEYWORDS, ["rating"], 10, 3)
+        empty = [None] * 11
+        for key, percentile_list in model.indexer_hash.items():
+            if key.startswith("rating#"):
+                self.assertEqual(percentile_list, expected.indexer_hash.get(key, empty))
+
+    def test_rejects_non_numeric_buckets(self):
+        with self.assertRaises(TypeError):
+            train_from_dataframe({"company": np.array(["A"]), "listPrice": np.array(["1"])}, ["company"], ["listPrice"])
+
+    @unittest.skipUnless(pd is not None, "pandas is not installed")
+    def test_dataframe(self):
+        data = random_data(4, 300)
+        frame = pd.DataFrame(data)
+        frame["category"] = frame["category"].astype(pd.CategoricalDtype(["Shoes", "Clothes", "Bracelets", "Unused"]))
+
+        keywords = KEYWORDS + ["tags"]
+        expected = train_from_dictionary(data, keywords, BUCKETS, 10, 3)
+        self.assertSameModel(train_from_dataframe(frame, keywords, BUCKETS, 10, 3), expected)
+
+        frame["listPrice"] = frame["listPrice"].astype("Int64")
+        frame.loc[0, "listPrice"] = pd.NA
+        frame.loc[1, "company"] = None
+        model = train_from_dataframe(frame, keywords, BUCKETS, 10, 3)
+        self.assertNotIn("listPrice#company_=None", model.indexer_hash)
+        self.assertTrue(all(type(value) == int for value in model.indexer_hash["listPrice#"]))
+
+    @unittest.skipUnless(pa is not None, "pyarrow is not installed")
+    def test_arrow(self):
+        data = random_data(6, 300)
+        keywords = KEYWORDS + ["tags"]
+        table = pa.Table.from_pylist(data)
+        table = table.set_column(0, "company", table.column("company").dictionary_encode())
+
+        expected = train_from_dictionary(data, keywords, BUCKETS, 10, 3)
+        self.assertSameModel(train_from_arrow(table, keywords, BUCKETS, 10, 3), expected)
+
+        # Several chunks and a sliced list column
+        sliced = pa.concat_tables([table.slice(0, 100), table.slice(100)])
+        self.assertSameModel(train_from_arrow(sliced, keywords, BUCKETS, 10, 3), expected)
+        self.assertSameModel(train_from_arrow(table.slice(50, 100), keywords, BUCKETS, 10, 3), train_from_dictionary(data[50:150], keywords, BUCKETS, 10, 3))
+
+        records = [dict(item, company=None if i % 3 == 0 else item["company"], rating=None if i % 4 == 0 else item["rating"]) for i, item in enumerate(data)]
+        model = train_from_arrow(pa.Table.from_pylist(records), keywords, BUCKETS, 10, 3)
+        self.assertEqual(model.indexer_hash["listPrice#"], expected.indexer_hash["listPrice#"])
+        self.assertNotIn("listPrice#company_=None", model.indexer_hash)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import random
+import unittest
+from unittest import TestCase
+import numpy as np
+from neurobcl.main import train_from_dictionary
+from tests.helpers import random_data, small_data
+
+class TestGetMany(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.classifier = train_from_dictionary(random_data(17, 300), ["company", "category", "tags"], ["listPrice", "rating"], max_depth=3)
+
+    def test_small_fixture(self):
+        classifier = train_from_dictionary(small_data(), ["company", "category", "tags"], ["listPrice"], 50, 2)
+        self.assertEqual(classifier.get_many("listPrice", [1, 2], '<', {"category": "Clothes"}, [50, 50]).tolist(), [50, 60])
+        self.assertEqual(classifier.get_many("listPrice", [1, 2], '>', {"category": "Clothes"}, [50, 50]).tolist(), [30, 50])
+
+    def test_same_as_get(self):
+        rng = random.Random(3)
+        targets, bucket_ids, operators, filters = [], [], [], []
+        for _ in range(500):
+            targets.append(rng.choice(["listPrice", "rating"]))
+            bucket_ids.append(rng.randint(1, 3))
+            operators.append(rng.choice(['<', '>']))
+            filters.append(rng.choice([{}, {"company": "NIKE"}, {"category": "Shoes", "company": "PUMA"}, {"tags": "eco"}, {"company": "UNKNOWN"}]))
+
+        actual = self.classifier.get_many(targets, np.array(bucket_ids), operators, filters, buckets=[20, 30, 50])
+        expected = [self.classifier.get(t, b, o, f, buckets=[20, 30, 50]) for t, b, o, f in zip(targets, bucket_ids, operators, filters)]
+        self.assertEqual(actual.tolist(), expected)
+
+    def test_broadcast(self):
+        actual = self.classifier.get_many("listPrice", [1, 2, 3, 4], '<', {"company": "NIKE"})
+        expected = [self.classifier.get("listPrice", b, '<', {"company": "NIKE"}) for b in [1, 2, 3, 4]]
+        self.assertEqual(actual.tolist(), expected)
+        self.assertEqual(self.classifier.get_many("listPrice", 4).tolist(), [self.classifier.get("listPrice", 4)])
+        self.assertEqual(len(self.classifier.get_many("listPrice", [])), 0)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.classifier.get_many("listPrice", [1, 5])
+        with self.assertRaises(ValueError):
+            self.classifier.get_many("unknown", [1])
+        with self.assertRaises(ValueError):
+            self.classifier.get_many("listPrice", [1], buckets=[50, 40])
+        with self.assertRaises(ValueError):
+            self.classifier.get_many(["listPrice", "rating"], [1, 2, 3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from unittest import TestCase
+from neurobcl.base.model import NeuroBucketClassifier
+from neurobcl.trainers.dictionary_trainer import DictionaryBucketTrainer
+from neurobcl.trainers.incremental_trainer import IncrementalBucketTrainer
+from tests.helpers import SMALL_INDEX, random_data, small_data
+
+FEATURES = (["company", "category", "tags"], ["listPrice", "rating"], 10, 3)
+
+class TestIncrementalTrainer(TestCase):
+    def test_same_as_full_index(self):
+        data = random_data(12, 120)
+        expected = DictionaryBucketTrainer(data, *FEATURES).index()
+        self.assertEqual(IncrementalBucketTrainer(data, *FEATURES).index().indexer_hash, expected.indexer_hash)
+
+    def test_add_and_remove(self):
+        data = random_data(13, 150)
+        classifier = IncrementalBucketTrainer(data[:100], *FEATURES).index()
+
+        classifier.add_items(data[100:])
+        self.assertEqual(classifier.indexer_hash, DictionaryBucketTrainer(data, *FEATURES).index().indexer_hash)
+
+        classifier.remove_items(data[:60])
+        self.assertEqual(classifier.indexer_hash, DictionaryBucketTrainer(data[60:], *FEATURES).index().indexer_hash)
+
+        with self.assertRaises(ValueError):
+            classifier.remove_items([{"company": "NIKE", "category": "Shoes", "tags": [], "listPrice": -1, "rating": 0}])
+
+    def test_small_fixture(self):
+        data = small_data()
+        classifier = IncrementalBucketTrainer(data[:4], ["company", "category", "tags"], ["listPrice"], 50, 2).index()
+        classifier.add_items(data[4:])
+        self.assertEqual(classifier.indexer_hash, SMALL_INDEX)
+
+        # Only the combinations of the removed product change
+        classifier.remove_items([data[5]])
+        self.assertEqual(classifier.indexer_hash["listPrice#company_=PUMA"], [40, 50, 50])
+        self.assertEqual(classifier.indexer_hash["listPrice#tags_=sale"], [10, 40, 40])
+        self.assertEqual(classifier.indexer_hash["listPrice#company_=NIKE"], [10, 20, 30])
+
+    def test_failed_remove_changes_nothing(self):
+        data = random_data(15, 80)
+        trainer = IncrementalBucketTrainer(data, *FEATURES)
+        classifier = trainer.index()
+        expected = dict(classifier.indexer_hash)
+
+        bad = dict(data[1], listPrice=-1)
+        for batch in [[data[0], bad], [data[0], data[0]]]:
+            with self.assertRaises(ValueError):
+                trainer.remove_items(batch)
+            self.assertEqual(trainer.total_items(), 80)
+            self.assertEqual(classifier.indexer_hash, expected)
+
+    def test_trainer_changes_clear_lookup_caches(self):
+        data = [{"c": "A", "p": 10}, {"c": "A", "p": 20}, {"c": "B", "p": 30}]
+        trainer = IncrementalBucketTrainer(data, ["c"], ["p"])
+        classifier = trainer.index()
+        lazy = trainer.index_lazy()
+        for model in [classifier, lazy]:
+            self.assertEqual(model.get("p", 4, '<', {"c": "C"}), 30)
+
+        # Changed through the trainer rather than the classifier
+        trainer.add_items([{"c": "C", "p": 999}])
+        for model in [classifier, lazy]:
+            self.assertEqual(model.get("p", 4, '<', {"c": "C"}), 999)
+        trainer.remove_items([{"c": "A", "p": 10}])
+        for model in [classifier, lazy]:
+            self.assertEqual(model.get("p", 1, '<', {"c": "A"}), 20)
+
+    def test_serialization_without_trainer(self):
+        classifier = IncrementalBucketTrainer(random_data(14, 20), *FEATURES).index()
+        loaded = NeuroBucketClassifier.fromJson(classifier.toJson())
+        self.assertEqual(loaded.indexer_hash, classifier.indexer_hash)
+
+        with self.assertRaises(ValueError):
+            loaded.add_items(random_data(15, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import random
+import unittest
+from unittest import TestCase
+import numpy as np
+from neurobcl.base.columns import ColumnStoreBuilder
+from neurobcl.base.inverted_index import InvertedIndex
+from tests.helpers import random_data, small_data
+
+class TestInvertedIndex(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = random_data(19, 2000)
+        # A rare value so both sorted arrays and bitmaps are exercised
+        cls.data[5]["company"] = "RARE"
+        builder = ColumnStoreBuilder(["company", "category", "tags"], ["listPrice"])
+        builder.extend(cls.data)
+        cls.store = builder.build()
+        cls.index = InvertedIndex(cls.store)
+
+    def expected(self, filters):
+        rows = []
+        for i, item in enumerate(self.data):
+            if all(filters[key] in item[key] if type(item[key]) == list else item[key] == filters[key] for key in filters):
+                rows.append(i)
+        return rows
+
+    def test_same_as_scan(self):
+        rng = random.Random(8)
+        for _ in range(100):
+            filters = {}
+            for key, values in [("company", ["NIKE", "PUMA", "RARE", "UNKNOWN"]), ("category", ["Shoes", "Clothes"]), ("tags", ["eco", "sale", "limited"])]:
+                if rng.random() < 0.6:
+                    filters[key] = rng.choice(values)
+            rows = self.index.lookup(filters)
+            if len(filters) == 0:
+                self.assertIsNone(rows)
+            else:
+                self.assertEqual(rows.tolist(), self.expected(filters))
+
+    def test_small_fixture(self):
+        builder = ColumnStoreBuilder(["company", "category", "tags"], ["listPrice"])
+        builder.extend(small_data())
+        index = InvertedIndex(builder.build())
+        self.assertEqual(index.lookup({"tags": "sale"}).tolist(), [0, 3, 5])
+        self.assertEqual(index.lookup({"company": "PUMA", "tags": "new"}).tolist(), [3])
+        self.assertEqual(index.lookup({"category": "Clothes", "tags": "eco"}).tolist(), [])
+
+    def test_compressed(self):
+        # Frequent values are bitmaps (a bit per row), rare ones sorted row ids
+        self.assertEqual(self.index.postings["company"][self.store.keywords["company"].lookup["NIKE"]].dtype, np.uint8)
+        self.assertEqual(self.index.postings["company"][self.store.keywords["company"].lookup["RARE"]].tolist(), [5])
+        self.assertLess(self.index.nbytes, 3 * len(self.data))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import random
+import unittest
+from unittest import TestCase
+from neurobcl.base.model import LazyBucketClassifier
+from neurobcl.trainers.columnar_trainer import ColumnarBucketTrainer
+from neurobcl.trainers.dictionary_trainer import DictionaryBucketTrainer
+from tests.helpers import random_data, small_data
+
+KEYWORDS = ["company", "category", "tags"]
+BUCKETS = ["listPrice", "rating"]
+
+def random_queries(seed, n=300):
+    rng = random.Random(seed)
+    values = {
+        "company": ["NIKE", "ADIDAS", "PUMA", "REEBOK", "UNKNOWN"],
+        "category": ["Shoes", "Clothes", "Bracelets"],
+        "tags": ["sale", "new", "eco", "limited"],
+    }
+    queries = []
+    for _ in range(n):
+        keys = rng.sample(KEYWORDS, rng.randint(0, 3))
+        queries.append((rng.choice(BUCKETS), {key: rng.choice(values[key]) for key in keys}))
+    return queries
+
+class TestLazyClassifier(TestCase):
+    def test_same_as_eager(self):
+        data = random_data(12, 400)
+        for trainer_class in [ColumnarBucketTrainer, DictionaryBucketTrainer]:
+            for max_depth, min_support in [(1, 1), (2, 1), (3, 0), (3, 20), (5, 1)]:
+                trainer = trainer_class(data, KEYWORDS, BUCKETS, 10, max_depth, min_support)
+                eager = trainer.index()
+                lazy = trainer.index_lazy()
+                self.assertIsInstance(lazy, LazyBucketClassifier)
+                for target_key, filters in random_queries(max_depth):
+                    for bucket in [1, 2, 3, 4]:
+                        self.assertEqual(lazy.get(target_key, bucket, '<', filters), eager.get(target_key, bucket, '<', filters))
+                # Only the visited combinations are computed
+                self.assertLessEqual(len(lazy.percentile_cache), len(eager.indexer_hash))
+
+    def test_small_fixture(self):
+        lazy = ColumnarBucketTrainer(small_data(), KEYWORDS, ["listPrice"], 50, 2).index_lazy()
+        # The unknown tag is dropped first, only the list of the company is computed
+        self.assertEqual(lazy.get("listPrice", 1, '<', {"tags": "eco", "company": "NIKE"}, [50, 50]), 20)
+        self.assertEqual(len(lazy.percentile_cache), 1)
+        self.assertEqual(lazy.percentile_cache.get("listPrice#company_=NIKE"), [10, 20, 30])
+
+    def test_bounded_cache_and_warm(self):
+        trainer = ColumnarBucketTrainer(random_data(13, 300), KEYWORDS, BUCKETS, 10, 3)
+        eager = trainer.index()
+        lazy = trainer.index_lazy(cache_size=5)
+
+        queries = random_queries(1, 100)
+        for target_key, filters in queries:
+            self.assertEqual(lazy.get_many(target_key, [1, 2, 3, 4], filters=filters).tolist(), eager.get_many(target_key, [1, 2, 3, 4], filters=filters).tolist())
+        self.assertLessEqual(len(lazy.percentile_cache), 5)
+        self.assertGreater(lazy.percentile_cache.evictions, 0)
+
+        lazy.clear_lookup_cache()
+        log = [("listPrice", {"company": "NIKE"})] * 3 + [("rating", {"category": "Shoes"})] * 2 + [("listPrice", {})]
+        self.assertEqual(lazy.warm(log, limit=2), 2)
+        self.assertIn("listPrice#company_=NIKE", lazy.percentile_cache)
+        self.assertIn("rating#category_=Shoes", lazy.percentile_cache)
+        self.assertNotIn("listPrice#", lazy.percentile_cache)
+
+        with self.assertRaises(ValueError):
+            lazy.toJson()
+        self.assertIn('"cached": 2', str(lazy))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from unittest import TestCase
+from neurobcl.main import train_from_dictionary
+
+class TestMinSupport(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = [
+            {"productName": "product" + str(i), "category": "cat" + str(i % 2), "price": i * 10}
+            for i in range(1, 41)
+        ]
+
+    def test_only_observed_combinations(self):
+        for engine in ["dictionary", "columnar"]:
+            classifier = train_from_dictionary(self.data, ["productName", "category"], ["price"], max_depth=3, engine=engine)
+
+            # Root, 40 products, 2 categories and only the 40 (product, category) pairs that exist
+            self.assertEqual(len(classifier.indexer_hash), 1 + 40 + 2 + 40)
+            for percentile_list in classifier.indexer_hash.values():
+                self.assertNotIn(None, percentile_list)
+
+    def test_legacy_every_combination(self):
+        classifier = train_from_dictionary(self.data, ["productName", "category"], ["price"], max_depth=3, min_support=0)
+        self.assertEqual(len(classifier.indexer_hash), 1 + 40 + 2 + 40 * 2)
+
+    def test_threshold_falls_back(self):
+        for engine in ["dictionary", "columnar"]:
+            classifier = train_from_dictionary(self.data, ["productName", "category"], ["price"], max_depth=3, engine=engine, min_support=2)
+
+            # Single products are below the threshold, the lookup falls back to the category
+            self.assertNotIn("price#productName_=product3", classifier.indexer_hash)
+            self.assertEqual(classifier.get("price", 1, '>', filters={"productName": "product3", "category": "cat1"}), 10)
+            self.assertEqual(classifier.get("price", 4, '<', filters={"productName": "product3", "category": "cat1"}), 390)
+
+    def test_negative_threshold(self):
+        with self.assertRaises(ValueError):
+            train_from_dictionary(self.data, ["category"], ["price"], min_support=-1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import unittest
+from unittest import TestCase
+from neurobcl.main import train_from_dictionary
+from neurobcl.trainers.columnar_trainer import ColumnarBucketTrainer
+from neurobcl.trainers.dictionary_trainer import DictionaryBucketTrainer
+from tests.helpers import KEYWORDS, SMALL_INDEX, random_data, small_data
+
+FEATURES = (["company", "category", "tags"], ["listPrice", "rating"], 10)
+
+class TestParallelIndex(TestCase):
+    def test_same_as_serial(self):
+        data = random_data(5, 300)
+        for engine in ["dictionary", "columnar"]:
+            for max_depth in [1, 3]:
+                args = (data, ["company", "category", "tags"], ["listPrice", "rating"], 10, max_depth)
+                serial = train_from_dictionary(*args, engine=engine)
+                parallel = train_from_dictionary(*args, engine=engine, workers=3)
+                self.assertEqual(parallel.toJson(), serial.toJson())
+
+    def test_small_fixture(self):
+        for engine in ["dictionary", "columnar"]:
+            classifier = train_from_dictionary(small_data(), KEYWORDS, ["listPrice"], 50, 2, engine=engine, workers=2)
+            self.assertEqual(classifier.indexer_hash, SMALL_INDEX)
+
+    def test_spawned_workers(self):
+        # Spawned workers hash strings with their own seed, the model should not depend on it
+        data = random_data(7, 200)
+        context = multiprocessing.get_context("spawn")
+        for trainer_class in [DictionaryBucketTrainer, ColumnarBucketTrainer]:
+            serial = trainer_class(data, *FEATURES, 3, 0).index()
+            parallel = trainer_class(data, *FEATURES, 3, 0).index(3, context)
+            self.assertEqual(parallel.toJson(), serial.toJson())
+
+    def test_independent_of_hash_seed(self):
+        script = "from neurobcl.main import train_from_dictionary; from tests.helpers import random_data; print(train_from_dictionary(random_data(8, 100), ['company', 'category', 'tags'], ['listPrice'], 10, 3, min_support=0).toJson())"
+        outputs = set()
+        for seed in ["1", "2", "3"]:
+            env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=os.pathsep.join(sys.path))
+            outputs.add(subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, check=True).stdout)
+        self.assertEqual(len(outputs), 1)
+
+    def test_single_worker(self):
+        data = random_data(6, 20)
+        serial = train_from_dictionary(data, ["company"], ["listPrice"])
+        self.assertEqual(train_from_dictionary(data, ["company"], ["listPrice"], workers=1).toJson(), serial.toJson())
+
+if __name__ == '__main__':
+    unittest.main()
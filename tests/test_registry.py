@@ -0,0 +1,146 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import TestCase
+from neurobcl.base.cache import LRUCache
+from neurobcl.registry import ModelRegistry
+from neurobcl.trainers.columnar_trainer import ColumnarBucketTrainer
+from tests.helpers import SMALL_INDEX, random_data, small_data
+
+KEYWORDS = ["company", "category"]
+BUCKETS = ["listPrice", "rating"]
+QUERIES = [
+    ("listPrice", 1, '<', {}),
+    ("listPrice", 3, '>', {"company": "NIKE"}),
+    ("rating", 2, '<', {"company": "PUMA", "category": "Shoes"}),
+    ("rating", 4, '>', {"company": "UNKNOWN"}),
+]
+
+class TestModelRegistry(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.first = ColumnarBucketTrainer(random_data(50, 300), KEYWORDS, BUCKETS, 10, 3).index()
+        self.second = ColumnarBucketTrainer(random_data(51, 300), KEYWORDS, BUCKETS, 10, 3).index()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_answers(self):
+        registry = ModelRegistry(self.root)
+        version = registry.publish("shop", self.first)
+        self.assertEqual(registry.current_version("shop"), version)
+        self.assertEqual(registry.versions("shop"), [version])
+        for target_key, bucket, operator, filters in QUERIES:
+            self.assertEqual(registry.get("shop", target_key, bucket, operator, filters), self.first.get(target_key, bucket, operator, filters))
+        self.assertEqual(dict(registry.model("shop").indexer_hash), self.first.indexer_hash)
+
+        cdf = ColumnarBucketTrainer(random_data(52, 300), KEYWORDS, BUCKETS, 10, 3).enable_cdf(10).index()
+        registry.publish("cdf-shop", cdf)
+        self.assertEqual(registry.get("cdf-shop", "rating", 2, '<', {"company": "NIKE"}, [33, 33, 34]), cdf.get("rating", 2, '<', {"company": "NIKE"}, [33, 33, 34]))
+
+    def test_small_fixture(self):
+        registry = ModelRegistry(self.root)
+        registry.publish("small", ColumnarBucketTrainer(small_data(), ["company", "category", "tags"], ["listPrice"], 50, 2).index())
+        self.assertEqual(dict(registry.model("small").indexer_hash), SMALL_INDEX)
+        self.assertEqual(registry.get("small", "listPrice", 1, '<', {"company": "PUMA"}, [50, 50]), 50)
+        # The unknown tag is dropped first
+        self.assertEqual(registry.get("small", "listPrice", 2, '<', {"tags": "eco", "category": "Shoes"}, [50, 50]), 40)
+
+    def test_lazy_shards(self):
+        registry = ModelRegistry(self.root, max_shards=2)
+        registry.publish("a", self.first)
+        registry.publish("b", self.second)
+
+        # Only the queried feature is mapped
+        registry.get("a", "listPrice", 1, '<')
+        self.assertEqual(len(registry.shards), 1)
+        self.assertIn(("a", registry.current_version("a"), "listPrice"), registry.shards)
+
+        # The shard cache is shared by the tenants, the least recently used shard goes first
+        registry.get("b", "listPrice", 1, '<')
+        registry.get("b", "rating", 1, '<')
+        self.assertEqual(len(registry.shards), 2)
+        self.assertEqual(registry.cache_stats()["shards"]["evictions"], 1)
+        self.assertEqual(registry.get("a", "listPrice", 2, '>', {"company": "NIKE"}), self.first.get("listPrice", 2, '>', {"company": "NIKE"}))
+
+    def test_swap(self):
+        registry = ModelRegistry(self.root)
+        old_version = registry.publish("shop", self.first, "v1")
+        pinned = registry.model("shop")
+        registry.publish("shop", self.second, "v2")
+
+        # Queries holding the old classifier keep answering from it
+        self.assertEqual(pinned.get("listPrice", 2, '<', {"company": "NIKE"}), self.first.get("listPrice", 2, '<', {"company": "NIKE"}))
+        self.assertEqual(registry.get("shop", "listPrice", 2, '<', {"company": "NIKE"}), self.second.get("listPrice", 2, '<', {"company": "NIKE"}))
+        self.assertEqual(registry.versions("shop"), ["v1", "v2"])
+
+        # Another process sees the new version after a refresh and can roll back
+        other = ModelRegistry(self.root)
+        self.assertEqual(other.model("shop").indexer_hash.version, "v2")
+        registry.activate("shop", old_version)
+        self.assertTrue(other.refresh("shop"))
+        self.assertFalse(other.refresh("shop"))
+        self.assertEqual(other.get("shop", "rating", 1, '<'), self.first.get("rating", 1, '<'))
+
+        with self.assertRaises(ValueError):
+            registry.publish("shop", self.second, "v2")
+        with self.assertRaises(ValueError):
+            registry.activate("shop", "v3")
+        with self.assertRaises(KeyError):
+            registry.model("unknown")
+        with self.assertRaises(ValueError):
+            registry.publish("../shop", self.first)
+        self.assertFalse(any(name.endswith(".tmp") for name in os.listdir(os.path.join(self.root, "shop"))))
+
+    def test_concurrent_swap(self):
+        registry = ModelRegistry(self.root, max_shards=1)
+        registry.publish("shop", self.first)
+        answers = {self.first.get("listPrice", 2, '<'), self.second.get("listPrice", 2, '<')}
+        errors = []
+
+        def query():
+            for _ in range(300):
+                try:
+                    self.assertIn(registry.get("shop", "listPrice", 2, '<'), answers)
+                    registry.get("shop", "rating", 2, '<', {"company": "NIKE"})
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=query) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for position in range(5):
+            registry.publish("shop", [self.second, self.first][position % 2])
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_concurrent_lookups(self):
+        registry = ModelRegistry(self.root, max_shards=1)
+        registry.publish("shop", self.first)
+        # A tiny lookup cache so the threads keep evicting each other's entries
+        registry.model("shop")._lookup_cache = LRUCache(4)
+        filters = [{}, {"company": "NIKE"}, {"company": "PUMA", "category": "Shoes"}, {"category": "Bracelets"}, {"company": "ADIDAS"}, {"company": "UNKNOWN"}]
+        expected = {(target_key, i): self.first.get(target_key, 2, '<', f) for target_key in BUCKETS for i, f in enumerate(filters)}
+        errors = []
+
+        def query(seed):
+            try:
+                for i in range(2000):
+                    target_key = BUCKETS[(seed + i) % 2]
+                    position = (seed * 5 + i) % len(filters)
+                    self.assertEqual(registry.get("shop", target_key, 2, '<', filters[position]), expected[target_key, position])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=query, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+if __name__ == "__main__":
+    unittest.main()
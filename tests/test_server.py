@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import TestCase
+from neurobcl.server import QueryClient, QueryServer
+from neurobcl.trainers.columnar_trainer import ColumnarBucketTrainer
+from tests.helpers import random_data
+
+KEYWORDS = ["company", "category"]
+BUCKETS = ["listPrice", "rating"]
+
+class ServerThread:
+    """Runs a query server on its own event loop in a background thread"""
+    def __init__(self, classifier, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.server = QueryServer(classifier, **kwargs)
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def start(self, **kwargs):
+        return asyncio.run_coroutine_threadsafe(self.server.start(**kwargs), self.loop).result(5)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+class TestQueryServer(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = random_data(60, 300)
+        cls.classifier = ColumnarBucketTrainer(cls.data, KEYWORDS, BUCKETS, 10, 3).index()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = ServerThread(self.classifier, max_delay=0.005)
+        self.path = self.server.start(path=os.path.join(self.tmp.name, "neurobcl.sock"))
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def test_same_answers(self):
+        with QueryClient(path=self.path) as client:
+            for bucket in [1, 2, 3, 4]:
+                for operator in ['<', '>']:
+                    for filters in [{}, {"company": "NIKE"}, {"company": "PUMA", "category": "Shoes"}, {"company": "UNKNOWN"}]:
+                        self.assertEqual(client.get("listPrice", bucket, operator, filters), self.classifier.get("listPrice", bucket, operator, filters))
+            self.assertEqual(client.get("rating", 1, '<', buckets=[10, 90]), self.classifier.get("rating", 1, '<', buckets=[10, 90]))
+
+            filters = [{"company": item["company"], "category": item["category"]} for item in self.data]
+            values = [item["listPrice"] for item in self.data]
+            self.assertEqual(client.assign_buckets("listPrice", values, filters), self.classifier.assign_buckets("listPrice", values, filters).tolist())
+            self.assertEqual(client.get_many("rating", [1, 2, 3] * 10, '<', filters[:30]), self.classifier.get_many("rating", [1, 2, 3] * 10, '<', filters[:30]).tolist())
+
+    def test_micro_batching(self):
+        client = QueryClient(path=self.path, pool_size=4)
+        results = {}
+
+        def query(position):
+            filters = {"company": self.data[position]["company"]}
+            results[position] = client.get("listPrice", 1 + position % 4, '<', filters)
+
+        threads = [threading.Thread(target=query, args=(position,)) for position in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for position, result in results.items():
+            self.assertEqual(result, self.classifier.get("listPrice", 1 + position % 4, '<', {"company": self.data[position]["company"]}))
+
+        # A batch call is evaluated together, concurrent calls share batches
+        batches = self.server.server.batcher.batches
+        client.get_many("listPrice", [1] * 300, '<', [{"company": item["company"]} for item in self.data])
+        self.assertEqual(self.server.server.batcher.batches, batches + 1)
+        self.assertLess(self.server.server.batcher.batches, self.server.server.batcher.requests)
+        self.assertLessEqual(len(client._idle), 4)
+        client.close()
+
+    def test_errors(self):
+        with QueryClient(path=self.path) as client:
+            with self.assertRaises(ValueError):
+                client.get("unknown", 1, '<')
+            with self.assertRaises(ValueError):
+                client.get("listPrice", 9, '<')
+            with self.assertRaises(ValueError):
+                client.get("listPrice", 1, '<', buckets=[50, 40])
+            self.assertEqual(client.request([{"op": "drop"}])[0]["error"], "Unknown op 'drop'")
+
+            # Only the bad request of a batch fails
+            answers = client.request([
+                {"op": "get", "target": "listPrice", "bucket": 1},
+                {"op": "get", "target": "listPrice", "bucket": 7},
+                {"op": "assign", "target": "listPrice", "value": 100},
+            ])
+            self.assertEqual(answers[0]["result"], self.classifier.get("listPrice", 1, '<'))
+            self.assertIn("error", answers[1])
+            self.assertEqual(answers[2]["result"], self.classifier.assign_buckets("listPrice", [100]).tolist()[0])
+
+            # Errors other than ValueError are answered too and do not hold up the rest of the batch
+            answers = client.request([
+                {"op": "get", "target": "listPrice", "bucket": 10**30},
+                {"op": "assign", "target": "listPrice", "value": 10**400},
+                {"op": "assign", "target": "listPrice", "value": 100},
+                {"op": "get", "target": "listPrice", "bucket": 2, "buckets": [10**30, 50]},
+                {"op": "get", "target": "listPrice", "bucket": 2},
+            ])
+            self.assertEqual(answers[0]["error"], "Bucket out of range")
+            self.assertIn("error", answers[1])
+            self.assertEqual(answers[2]["result"], self.classifier.assign_buckets("listPrice", [100]).tolist()[0])
+            self.assertIn("error", answers[3])
+            self.assertEqual(answers[4]["result"], self.classifier.get("listPrice", 2, '<'))
+
+    def test_half_closed_client(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.path)
+            sock.sendall(b"".join(json.dumps({"id": i, "op": "get", "target": "listPrice", "bucket": 1 + i % 4}).encode("utf-8") + b"\n" for i in range(20)))
+            sock.shutdown(socket.SHUT_WR)
+            with sock.makefile("rb") as stream:
+                answers = [json.loads(line) for line in stream]
+
+        self.assertEqual(sorted(answer["id"] for answer in answers), list(range(20)))
+        for answer in answers:
+            self.assertEqual(answer["result"], self.classifier.get("listPrice", 1 + answer["id"] % 4, '<'))
+
+    def test_tcp(self):
+        server = ServerThread(self.classifier)
+        host, port = server.start(host="127.0.0.1", port=0)
+        try:
+            with QueryClient(host=host, port=port) as client:
+                self.assertEqual(client.get("rating", 2, '>', {"category": "Shoes"}), self.classifier.get("rating", 2, '>', {"category": "Shoes"}))
+        finally:
+            server.stop()
+
+    def test_cli(self):
+        model_path = os.path.join(self.tmp.name, "model.nbcl")
+        socket_path = os.path.join(self.tmp.name, "cli.sock")
+        self.classifier.toBinary(model_path)
+
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        process = subprocess.Popen([sys.executable, "-m", "neurobcl.cli", "serve", "--model", model_path, "--socket", socket_path], stderr=subprocess.PIPE, env=env)
+        try:
+            self.assertIn(b"Listening on", process.stderr.readline())
+            with QueryClient(path=socket_path) as client:
+                self.assertEqual(client.get("listPrice", 3, '<', {"company": "NIKE"}), self.classifier.get("listPrice", 3, '<', {"company": "NIKE"}))
+        finally:
+            process.terminate()
+            process.wait(5)
+            process.stderr.close()
+
+if __name__ == "__main__":
+    unittest.main()
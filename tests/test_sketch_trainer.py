@@ -0,0 +1,78 @@
+import random
+import unittest
+from unittest import TestCase
+from neurobcl.base.sketch import KLLSketch
+from neurobcl.trainers.dictionary_trainer import DictionaryBucketTrainer
+from neurobcl.trainers.sketch_trainer import SketchBucketTrainer
+from tests.helpers import KEYWORDS, SMALL_INDEX, random_data, small_data
+
+class TestKLLSketch(TestCase):
+    def test_exact_while_small(self):
+        sketch = KLLSketch(k=200)
+        values = [random.Random(1).random() for _ in range(100)]
+        for value in values:
+            sketch.update(value)
+        self.assertTrue(sketch.exact)
+        self.assertEqual(sketch.select(list(range(100))), sorted(values))
+
+    def test_bounded_error(self):
+        rng = random.Random(2)
+        shards = [KLLSketch(k=200) for _ in range(4)]
+        values = []
+        for shard in shards:
+            for _ in range(20000):
+                value = rng.random()
+                values.append(value)
+                shard.update(value)
+        for shard in shards[1:]:
+            shards[0].merge(shard)
+
+        sketch = shards[0]
+        self.assertEqual(sketch.count, len(values))
+        self.assertLess(sum(len(items) for items in sketch.levels), 1000)
+
+        values.sort()
+        for rank in range(0, len(values), 4000):
+            true_rank = values.index(sketch.rank_select(rank))
+            self.assertLess(abs(true_rank - rank), 0.02 * len(values))
+
+class TestSketchTrainer(TestCase):
+    def test_same_as_dictionary(self):
+        data = random_data(9, 150)
+        for max_depth in [1, 2, 3]:
+            expected = DictionaryBucketTrainer(data, ["company", "category", "tags"], ["listPrice", "rating"], 10, max_depth).index()
+
+            trainer = SketchBucketTrainer(["company", "category", "tags"], ["listPrice", "rating"], 10, max_depth)
+            trainer.consume(data)
+            self.assertEqual(trainer.index().indexer_hash, expected.indexer_hash)
+
+    def test_small_fixture(self):
+        first = SketchBucketTrainer(KEYWORDS, ["listPrice"], 50, 2)
+        first.consume(small_data()[:3])
+        second = SketchBucketTrainer(KEYWORDS, ["listPrice"], 50, 2)
+        second.consume(small_data()[3:])
+        first.merge(second)
+        self.assertEqual(first.index().indexer_hash, SMALL_INDEX)
+
+    def test_sharded_merge(self):
+        data = random_data(10, 160)
+        single = SketchBucketTrainer(["company", "tags"], ["listPrice"], 10, 3)
+        single.consume(data)
+
+        shards = []
+        for start in range(0, 160, 40):
+            shard = SketchBucketTrainer(["company", "tags"], ["listPrice"], 10, 3)
+            shard.consume(data[start:start + 40])
+            # Shards travel between processes as JSON
+            shards.append(SketchBucketTrainer.fromJson(shard.toJson()))
+
+        merged = shards[0]
+        for shard in shards[1:]:
+            merged.merge(shard)
+        self.assertEqual(merged.index().indexer_hash, single.index().indexer_hash)
+
+        with self.assertRaises(ValueError):
+            merged.merge(SketchBucketTrainer(["company"], ["listPrice"], 10, 3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from unittest import TestCase
+from neurobcl.base.cache import LRUCache
+from neurobcl.base.stats import LatencyHistogram
+from neurobcl.trainers.columnar_trainer import ColumnarBucketTrainer
+from neurobcl.trainers.dictionary_trainer import DictionaryBucketTrainer
+from tests.helpers import random_data, small_data
+
+KEYWORDS = ["company", "category", "tags"]
+BUCKETS = ["listPrice", "rating"]
+
+def counts(stats):
+    return {feature: {depth: (phase["combinations"], phase["empty"]) for depth, phase in by_depth.items()} for feature, by_depth in stats.features.items()}
+
+class TestStats(TestCase):
+    def test_training_stats(self):
+        data = random_data(8, 30)
+        reference = None
+        for trainer_class, kwargs, workers in [
+            (DictionaryBucketTrainer, {}, None),
+            (ColumnarBucketTrainer, {"index_mode": "recursive"}, None),
+            (ColumnarBucketTrainer, {"index_mode": "groupby"}, None),
+            (ColumnarBucketTrainer, {"index_mode": "groupby"}, 2),
+        ]:
+            trainer = trainer_class(data, KEYWORDS, BUCKETS, 10, 3, 0, **kwargs)
+            self.assertIsNone(trainer.stats)
+            stats = trainer.enable_stats()
+            classifier = trainer.index(workers)
+
+            self.assertEqual(stats.combinations, len(classifier.indexer_hash))
+            self.assertEqual(sorted(stats.features["listPrice"]), [0, 1, 2])
+            self.assertGreater(stats.features["rating"][2]["empty"], 0)
+            self.assertGreater(stats.index_seconds, 0)
+            self.assertEqual(stats.workers, workers or 1)
+            self.assertIn(2, stats.filter_seconds)
+            # Caches are nested by name, the other structures are plain sizes
+            for name, value in trainer.cache_stats().items():
+                if name.endswith("_bytes"):
+                    self.assertIsInstance(value, int)
+                else:
+                    self.assertEqual(set(value), set(LRUCache(1).stats()))
+            if reference is None:
+                reference = counts(stats)
+            self.assertEqual(counts(stats), reference)
+
+        self.assertIn("store_bytes", stats.to_dict()["caches"])
+
+    def test_small_fixture(self):
+        trainer = DictionaryBucketTrainer(small_data(), KEYWORDS, ["listPrice"], 50, 2)
+        stats = trainer.enable_stats()
+        trainer.index()
+        # The root, then company, category and tags with two values each
+        self.assertEqual(counts(stats), {"listPrice": {0: (1, 0), 1: (6, 0)}})
+
+    def test_query_stats(self):
+        trainer = ColumnarBucketTrainer(random_data(9, 200), KEYWORDS, BUCKETS, 10, 2, 5)
+        classifier = trainer.index()
+        self.assertIsNone(classifier.stats)
+        classifier.get("listPrice", 1, '>', {"company": "NIKE"})
+
+        stats = classifier.enable_stats()
+        classifier.get("listPrice", 1, '>', {"company": "NIKE"})
+        classifier.get("listPrice", 1, '>', {"company": "NIKE"})
+        classifier.get("listPrice", 1, '>', {"company": "NIKE", "category": "Shoes"})
+        classifier.get("rating", 1, '>', {"company": "UNKNOWN", "category": "Hats"})
+        classifier.get_many("listPrice", [1, 2, 3], filters={"category": "Shoes"})
+        classifier.assign_buckets("listPrice", [10, 20])
+
+        report = stats.to_dict()
+        self.assertEqual(report["latency"]["get"]["count"], 4)
+        self.assertEqual(report["latency"]["get_many"]["count"], 1)
+        self.assertEqual(report["latency"]["assign_buckets"]["count"], 1)
+        self.assertEqual(report["fallback_depth"], {0: 4, 1: 1, 2: 1})
+        self.assertGreater(report["caches"]["lookup_cache"]["hits"], 0)
+
+        classifier.disable_stats()
+        classifier.get("listPrice", 1, '>')
+        self.assertEqual(report["latency"]["get"]["count"], stats.to_dict()["latency"]["get"]["count"])
+
+    def test_histogram(self):
+        histogram = LatencyHistogram()
+        for seconds in [0.000001, 0.00003, 0.00004, 0.5]:
+            histogram.record(seconds)
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.percentile(50), 50)
+        self.assertEqual(histogram.to_dict()["buckets"], {"<=1us": 1, "<=50us": 2, "<=1000000us": 1})
+
+if __name__ == "__main__":
+    unittest.main()
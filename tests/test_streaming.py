@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+import numpy as np
+from neurobcl.main import train_from_csv, train_from_dataframe, train_from_dictionary, train_from_jsonl, train_from_records
+from neurobcl.trainers.incremental_trainer import IncrementalBucketTrainer
+from neurobcl.trainers.sketch_trainer import SketchBucketTrainer
+from tests.helpers import random_data
+
+KEYWORDS = ["company", "category", "tags"]
+BUCKETS = ["listPrice", "rating"]
+
+class TestStreaming(TestCase):
+    def setUp(self):
+        self.data = random_data(5, 250)
+        self.expected = train_from_dictionary(self.data, KEYWORDS, BUCKETS, 10, 3)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_jsonl(self):
+        path = os.path.join(self.tmp.name, "data.jsonl")
+        with open(path, "w") as f:
+            for item in self.data:
+                f.write(json.dumps(dict(item, description="not indexed")) + "\n")
+            f.write("\n")
+
+        model = train_from_jsonl(path, KEYWORDS, BUCKETS, 10, 3)
+        self.assertEqual(model.indexer_hash, self.expected.indexer_hash)
+        self.assertEqual(model.filter_features, self.expected.filter_features)
+
+    def test_csv(self):
+        path = os.path.join(self.tmp.name, "data.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["listPrice", "company", "description", "category", "tags", "rating"])
+            for item in self.data:
+                writer.writerow([item["listPrice"], item["company"], "a, b", item["category"], "|".join(item["tags"]), item["rating"]])
+
+        model = train_from_csv(path, KEYWORDS, BUCKETS, 10, 3, list_separator="|")
+        self.assertEqual(model.indexer_hash, self.expected.indexer_hash)
+
+        with self.assertRaises(ValueError):
+            train_from_csv(path, ["brand"], BUCKETS)
+
+    def test_missing_buckets(self):
+        rows = [dict(item, rating=None) if i % 7 == 0 else item for i, item in enumerate(self.data)]
+        present = [item for i, item in enumerate(self.data) if i % 7 != 0]
+        expected = train_from_dictionary(present, KEYWORDS, ["rating"], 10, 3)
+        empty = [None] * 11
+
+        path = os.path.join(self.tmp.name, "data.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["listPrice", "company", "category", "tags", "rating"])
+            for item in rows:
+                rating = "" if item["rating"] is None else item["rating"]
+                writer.writerow([item["listPrice"], item["company"], item["category"], "|".join(item["tags"]), rating])
+
+        lines = io.StringIO("".join(json.dumps(item) + "\n" for item in rows))
+        models = [train_from_jsonl(lines, KEYWORDS, BUCKETS, 10, 3), train_from_csv(path, KEYWORDS, BUCKETS, 10, 3, list_separator="|")]
+        for model in models:
+            # Missing bucket values only leave the percentiles of their own feature
+            for key, percentile_list in model.indexer_hash.items():
+                if key.startswith("rating#"):
+                    self.assertEqual(percentile_list, expected.indexer_hash.get(key, empty))
+                else:
+                    self.assertEqual(percentile_list, self.expected.indexer_hash[key])
+
+    def test_engines_agree_on_missing_buckets(self):
+        records = [
+            {"c": "a", "p": 1, "r": 0.5},
+            {"c": "a", "p": None, "r": 1.5},
+            {"c": "b", "p": 3, "r": float("nan")},
+            {"c": "b", "p": 7, "r": 2.5},
+            {"c": "a", "p": 5, "r": None},
+        ]
+        expected = train_from_records(records, ["c"], ["p", "r"], 25, 2)
+        self.assertEqual(expected.indexer_hash["p#c_=a"], [1, 1, 5, 5, 5])
+        self.assertEqual(expected.indexer_hash["r#c_=b"], [2.5] * 5)
+
+        incremental = IncrementalBucketTrainer([], ["c"], ["p", "r"], 25, 2)
+        incremental.add_items(records)
+        incremental.remove_items(records[1:2])
+        incremental.add_items(records[1:2])
+        sketch = SketchBucketTrainer(["c"], ["p", "r"], 25, 2)
+        sketch.consume(records)
+        models = [train_from_dictionary(records, ["c"], ["p", "r"], 25, 2, engine) for engine in ["dictionary", "columnar"]]
+        models += [incremental.index(), sketch.index()]
+        columns = {key: np.array([np.nan if record[key] is None else record[key] for record in records]) for key in ["p", "r"]}
+        models.append(train_from_dataframe(dict(columns, c=np.array([record["c"] for record in records])), ["c"], ["p", "r"], 25, 2))
+        for model in models:
+            self.assertEqual(model.indexer_hash, expected.indexer_hash)
+
+    def test_invalid_buckets(self):
+        lines = io.StringIO(json.dumps(self.data[0]) + "\n" + json.dumps(dict(self.data[1], rating="high")) + "\n")
+        with self.assertRaisesRegex(TypeError, "rating of record 2"):
+            train_from_jsonl(lines, KEYWORDS, BUCKETS)
+
+        lines = io.StringIO("company,listPrice\nNIKE,300\nADIDAS,cheap\n")
+        with self.assertRaisesRegex(ValueError, "listPrice on line 3"):
+            train_from_csv(lines, ["company"], ["listPrice"])
+
+    def test_iterators(self):
+        model = train_from_records((item for item in self.data), KEYWORDS, BUCKETS, 10, 3)
+        self.assertEqual(model.indexer_hash, self.expected.indexer_hash)
+
+        lines = io.StringIO("".join(json.dumps(item) + "\n" for item in self.data))
+        model = train_from_jsonl(lines, KEYWORDS, BUCKETS, 10, 3)
+        self.assertEqual(model.indexer_hash, self.expected.indexer_hash)
+
+if __name__ == "__main__":
+    unittest.main()
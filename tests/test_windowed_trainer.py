@@ -0,0 +1,97 @@
+import unittest
+from unittest import TestCase
+from neurobcl.trainers.dictionary_trainer import DictionaryBucketTrainer
+from neurobcl.trainers.windowed_trainer import WindowedBucketTrainer
+from tests.helpers import SMALL_INDEX, random_data, small_data
+
+KEYWORDS = ["company", "category", "tags"]
+BUCKETS = ["listPrice", "rating"]
+
+def timed(data, start, step):
+    return [dict(item, timestamp=start + i * step) for i, item in enumerate(data)]
+
+class TestWindowedTrainer(TestCase):
+    def test_same_as_dictionary_inside_window(self):
+        data = random_data(40, 300)
+        trainer = WindowedBucketTrainer(KEYWORDS, BUCKETS, 10, 3, window=1000, pane=10)
+        trainer.consume(timed(data, 0, 1))
+        expected = DictionaryBucketTrainer(data, KEYWORDS, BUCKETS, 10, 3).index()
+        actual = trainer.publish()
+        self.assertEqual(actual.indexer_hash, expected.indexer_hash)
+        self.assertEqual(actual.filter_features, expected.filter_features)
+        self.assertEqual(trainer.enable_cdf(12).publish().indexer_hash, DictionaryBucketTrainer(data, KEYWORDS, BUCKETS, 10, 3).enable_cdf(12).index().indexer_hash)
+
+    def test_small_fixture(self):
+        trainer = WindowedBucketTrainer(KEYWORDS, ["listPrice"], 50, 2, window=100, pane=10)
+        trainer.consume(timed(small_data(), 0, 5))
+        self.assertEqual(trainer.publish().indexer_hash, SMALL_INDEX)
+
+    def test_sliding_window(self):
+        old = random_data(41, 200)
+        new = [dict(item, listPrice=item["listPrice"] + 5000) for item in random_data(42, 200)]
+        trainer = WindowedBucketTrainer(KEYWORDS, BUCKETS, 10, 2, window=100, pane=10)
+        trainer.consume(timed(old, 0, 0.5))
+        trainer.consume(timed(new, 100, 0.5))
+
+        # Only the panes of the last 100 seconds are left, all of them holding new items
+        self.assertEqual(len(trainer.panes), 10)
+        self.assertEqual(trainer.total_items(), 200)
+        expected = DictionaryBucketTrainer(new, KEYWORDS, BUCKETS, 10, 2).index()
+        self.assertEqual(trainer.publish().indexer_hash, expected.indexer_hash)
+
+        # Records from before the window are dropped
+        trainer.update(old[0], 50)
+        self.assertEqual(trainer.late, 1)
+        self.assertEqual(trainer.total_items(), 200)
+
+    def test_keywords_follow_window(self):
+        trainer = WindowedBucketTrainer(["company"], ["listPrice"], window=20, pane=10)
+        trainer.update({"company": "OLD", "listPrice": 1}, 0)
+        trainer.update({"company": "KEPT", "listPrice": 2}, 15)
+        # Merged once and reused while indexing
+        self.assertIs(trainer.keywords, trainer.keywords)
+        self.assertEqual(list(trainer.keywords["company"]), ["OLD", "KEPT"])
+
+        trainer.update({"company": "NEW", "listPrice": 3}, 25)
+        self.assertEqual(list(trainer.keywords["company"]), ["KEPT", "NEW"])
+        self.assertEqual(trainer.get_non_bucket_features(), {"company": ["KEPT", "NEW"]})
+
+    def test_decay(self):
+        old = [dict(item, listPrice=100) for item in random_data(43, 100)]
+        new = [dict(item, listPrice=200) for item in random_data(44, 100)]
+        trainer = WindowedBucketTrainer(["company"], ["listPrice"], 10, 2, window=1000, pane=10, half_life=30)
+        trainer.consume(timed(old, 0, 0.05))
+        trainer.consume(timed(new, 90, 0.05))
+
+        # The old items are 90 seconds (three half lives) older and count 1/8
+        self.assertAlmostEqual(trainer.total_items(), 112.5)
+        classifier = trainer.publish()
+        self.assertEqual(classifier.get("listPrice", 1, '<', buckets=[20, 80]), 200)
+        self.assertEqual(classifier.get("listPrice", 1, '<', buckets=[10, 90]), 100)
+        self.assertEqual(trainer.get_at("listPrice", 5), 100)
+        self.assertEqual(trainer.get_at("listPrice", 20), 200)
+
+    def test_publish_interval(self):
+        published = []
+        trainer = WindowedBucketTrainer(["company"], ["listPrice"], window=60, pane=5, publish_interval=30)
+        trainer.on_publish = published.append
+        trainer.consume(timed(random_data(45, 100), 0, 1))
+        self.assertEqual(len(published), 3)
+        self.assertIs(trainer.snapshot, published[-1])
+        # Snapshots are independent of each other
+        self.assertIsNot(published[0].indexer_hash, published[1].indexer_hash)
+        self.assertEqual(published[0].bucket_features, ["listPrice"])
+
+        trainer.advance(170)
+        self.assertEqual(len(published), 4)
+        self.assertEqual(trainer.total_items(), 0)
+        self.assertEqual(len(trainer.panes), 0)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            WindowedBucketTrainer(["company"], ["listPrice"], window=10, pane=20)
+        with self.assertRaises(ValueError):
+            WindowedBucketTrainer(["company"], ["listPrice"], half_life=0)
+
+if __name__ == "__main__":
+    unittest.main()